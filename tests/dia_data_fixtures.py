@@ -0,0 +1,84 @@
+"""This module provides small acquisitions shared by the timspeak unit tests"""
+
+
+def get_dia_data(frame_count: int = 31, scan_count: int = 4, cycle_length: int = 3):
+	import types
+	import numpy as np
+	dia_data = types.SimpleNamespace()
+	dia_data.cycle = np.zeros((1, cycle_length, scan_count, 2))
+	dia_data.im_values = np.linspace(1.5, 0.6, scan_count)
+	dia_data.rt_values = np.arange(frame_count) * 0.1
+	dia_data.mz_values = np.linspace(100, 1700, 1000)
+	ion_counts = np.arange(frame_count * scan_count) % 3
+	ion_counts[:scan_count] = 0
+	dia_data.tof_indptr = np.concatenate([[0], np.cumsum(ion_counts)])
+	dia_data.tof_indices = np.arange(dia_data.tof_indptr[-1], dtype=np.uint32) % 1000
+	dia_data.intensity_values = np.arange(dia_data.tof_indptr[-1], dtype=np.float32)
+	return dia_data
+
+
+def get_single_ion_dia_data(frame_count: int = 13, scan_count: int = 4, cycle_length: int = 1):
+	# every other scan holds a single ion, all with the same tof index and intensity
+	import types
+	import numpy as np
+	dia_data = types.SimpleNamespace()
+	dia_data.cycle = np.zeros((1, cycle_length, scan_count, 2))
+	dia_data.im_values = np.linspace(1.5, 0.6, scan_count)
+	dia_data.rt_values = np.arange(frame_count) * 0.1
+	dia_data.mz_values = np.linspace(100, 1700, 1000)
+	ion_counts = np.ones(frame_count * scan_count, dtype=np.int64)
+	ion_counts[:scan_count] = 0
+	ion_counts[scan_count::2] = 0
+	dia_data.tof_indptr = np.concatenate([[0], np.cumsum(ion_counts)])
+	dia_data.tof_indices = np.full(dia_data.tof_indptr[-1], 500, dtype=np.uint32)
+	dia_data.intensity_values = np.ones(dia_data.tof_indptr[-1], dtype=np.float32)
+	return dia_data
+
+
+def get_synthetic_dia_data(gradient_length: float = 6.0):
+	import timspeak.data_handlers.synthetic_data
+	return timspeak.data_handlers.synthetic_data.generate_sample(
+		gradient_length=gradient_length,
+		scan_count=50,
+		precursors_per_second=20.0,
+	).dia_data
+
+
+def get_config_file_content(**config_file_content) -> dict:
+	# smoothing and clustering tolerances that fit the synthetic acquisitions
+	return {
+		'smoothing': {
+			'algorithm_name': 'smoothing_algorithm_1',
+			'im_sigma': 0.01,
+			'im_tolerance': 0.03,
+			'ppm_tolerance': 20.0,
+			'rt_sigma': 0.5,
+			'rt_tolerance': 1.0,
+		},
+		'clustering': {
+			'algorithm_name': 'clustering_algorithm_1',
+			'im_tolerance': 0.03,
+			'ppm_tolerance': 20.0,
+			'rt_tolerance': 1.0,
+			'clustering_threshold': 2,
+		},
+		**config_file_content
+	}
+
+
+def get_logger():
+	import types
+	import logging
+	return types.SimpleNamespace(root_logger=logging.getLogger('timspeak_tests'))
+
+
+def get_pipeline(dia_data, **config_file_content):
+	import timspeak.execution_pipeline.main_pipeline
+	pipeline = timspeak.execution_pipeline.main_pipeline.MainPipeline(None)
+	pipeline.logger = get_logger()
+	pipeline.config_file_content = get_config_file_content(**config_file_content)
+	pipeline.dia_data = dia_data
+	pipeline.get_cycle_lenght()
+	pipeline.rt_windows = None
+	pipeline.set_shards()
+	return pipeline
@@ -4,4 +4,17 @@ clear
 eval "$(conda shell.bash hook)"
 conda activate timspeak
 python -m unittest -v test_input
+python -m unittest -v test_stage_graph
+python -m unittest -v test_background_writer
+python -m unittest -v test_memory
+python -m unittest -v test_rt_windows
+python -m unittest -v test_frame_groups
+python -m unittest -v test_frame_stream
+python -m unittest -v test_stage_performance
+python -m unittest -v test_tracing
+python -m unittest -v test_neighbor_work
+python -m unittest -v test_memory_sampler
+python -m unittest -v test_benchmark
+python -m unittest -v test_estimate
+python -m unittest -v test_multiprocessing
 conda deactivate
@@ -0,0 +1,101 @@
+"""This module provides unit tests for the timspeak background output writer"""
+
+import unittest
+
+
+def add_timspeak_path() -> None:
+	import os
+	import sys
+	sys.path.append(os.path.dirname(os.getcwd()))
+
+
+add_timspeak_path()
+
+
+def get_smoothing_parameters() -> dict:
+	return {
+		'algorithm_name': 'smoothing_algorithm_1',
+		'im_sigma': 0.012,
+		'im_tolerance': 0.004,
+		'ppm_tolerance': 30.0,
+		'rt_sigma': 1.5,
+		'rt_tolerance': 1.5
+	}
+
+
+class TestBackgroundWriter(unittest.TestCase):
+
+	def setUp(self) -> None:
+		import os
+		import tempfile
+		self.directory = tempfile.TemporaryDirectory()
+		self.output_file_name = os.path.join(self.directory.name, 'output.hdf')
+
+	def tearDown(self) -> None:
+		self.directory.cleanup()
+
+	def get_writer(self, **kwargs):
+		import timspeak.io_interface.output.out_formats.hdf
+		import timspeak.io_interface.output.background_writer
+		output_format_object = timspeak.io_interface.output.out_formats.hdf.HDFFormat(self.output_file_name)
+		return timspeak.io_interface.output.background_writer.BackgroundWriter(output_format_object, **kwargs)
+
+	def test_write_and_read(self) -> None:
+		import numpy as np
+		writer = self.get_writer(max_memory_gb=0)
+		for index in range(3):
+			values = np.arange(10, dtype=np.float32) * index
+			writer.print_smoothing_data(get_smoothing_parameters(), values)
+			array = writer.read_mem_map(
+				file_name=self.output_file_name,
+				mmap_name='/smoothing/smooth_intensity_values'
+			)
+			self.assertTrue(np.array_equal(array, values))
+		writer.record_stage_completion('smoothing', 'signature')
+		writer.close()
+		self.assertTrue(writer.read_completed_stages(file_name=self.output_file_name) == {'smoothing': 'signature'})
+
+	def test_in_memory(self) -> None:
+		import numpy as np
+		import timspeak.io_interface.output.in_memory
+		writer = timspeak.io_interface.output.in_memory.InMemoryOutput(self.get_writer())
+		values = np.arange(10, dtype=np.float32)
+		writer.print_smoothing_data(get_smoothing_parameters(), values)
+		array = writer.read_mem_map(
+			file_name=self.output_file_name,
+			mmap_name='/smoothing/smooth_intensity_values'
+		)
+		self.assertTrue(array is values)
+		writer.close()
+		array = writer.output_format_object.read_mem_map(
+			file_name=self.output_file_name,
+			mmap_name='/smoothing/smooth_intensity_values'
+		)
+		self.assertTrue(np.array_equal(array, values))
+
+	def test_append(self) -> None:
+		import numpy as np
+		import timspeak.io_interface.output.in_memory
+		writer = timspeak.io_interface.output.in_memory.InMemoryOutput(self.get_writer(max_memory_gb=0))
+		for index in range(3):
+			writer.append_smoothing_data(get_smoothing_parameters(), np.arange(10, dtype=np.float32) * index)
+		values = np.concatenate([np.arange(10, dtype=np.float32) * index for index in range(3)])
+		array = writer.read_mem_map(
+			file_name=self.output_file_name,
+			mmap_name='/smoothing/smooth_intensity_values'
+		)
+		self.assertTrue(np.array_equal(array, values))
+		array = writer.output_format_object.read_mem_map(
+			file_name=self.output_file_name,
+			mmap_name='/smoothing/smooth_intensity_values'
+		)
+		self.assertTrue(np.array_equal(array, values))
+		writer.close()
+
+	def test_exception(self) -> None:
+		import numpy as np
+		writer = self.get_writer()
+		values = np.array([None, 1], dtype=object)
+		writer.print_smoothing_data(get_smoothing_parameters(), values)
+		with self.assertRaises(RuntimeError):
+			writer.close()
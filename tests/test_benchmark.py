@@ -0,0 +1,234 @@
+"""This module provides unit tests for the timspeak benchmark"""
+
+import unittest
+
+
+def add_timspeak_path() -> None:
+	import os
+	import sys
+	sys.path.append(os.path.dirname(os.getcwd()))
+
+
+add_timspeak_path()
+
+
+class TestBenchmark(unittest.TestCase):
+
+	def test_synthetic_dia_data(self) -> None:
+		import numpy as np
+		import timspeak.data_handlers.synthetic_data
+		sample = timspeak.data_handlers.synthetic_data.generate_sample(
+			gradient_length=4.0,
+			scan_count=100,
+			precursors_per_second=10.0,
+		)
+		dia_data = sample.dia_data
+		self.assertEqual(len(dia_data.rt_values), 41)
+		self.assertEqual(len(dia_data.tof_indptr), 41 * 100 + 1)
+		self.assertEqual(dia_data.tof_indptr[100], 0)
+		self.assertEqual(dia_data.tof_indptr[-1], len(dia_data.intensity_values))
+		self.assertEqual(len(dia_data.tof_indices), len(dia_data.intensity_values))
+		self.assertEqual(dia_data.intensity_values.dtype, np.float32)
+		self.assertTrue(np.all(dia_data.tof_indices < len(dia_data.mz_values)))
+		for scan_index in range(len(dia_data.tof_indptr) - 1):
+			tof_indices = dia_data.tof_indices[dia_data.tof_indptr[scan_index]:dia_data.tof_indptr[scan_index + 1]]
+			self.assertTrue(np.all(np.diff(tof_indices.astype(np.int64)) > 0))
+
+	def test_synthetic_ground_truth(self) -> None:
+		import numpy as np
+		import timspeak.data_handlers.synthetic_data
+		sample = timspeak.data_handlers.synthetic_data.generate_sample(
+			gradient_length=4.0,
+			scan_count=100,
+			precursors_per_second=10.0,
+			noise_ions_per_scan=0.0,
+			isotope_count=2,
+			fragments_per_precursor=3,
+		)
+		precursors = sample.precursors
+		features = sample.features
+		self.assertEqual(len(precursors), 40)
+		self.assertEqual(len(features), 40 * (2 + 3))
+		self.assertTrue(set(precursors['charge']) <= {2, 3})
+		self.assertTrue(np.all(precursors['fragment_frame_groups'].between(1, 3)))
+		isotopes = features[features['isotopes'] >= 0]
+		self.assertTrue(np.all(isotopes['frame_groups'] == 0))
+		fragments = features[features['isotopes'] == -1]
+		self.assertTrue(
+			np.array_equal(
+				fragments['frame_groups'].values,
+				precursors['fragment_frame_groups'].values[fragments['precursor_indices'].values]
+			)
+		)
+		# without noise, all intensity belongs to a feature
+		self.assertAlmostEqual(
+			features['summed_intensity_values'].sum() / sample.dia_data.intensity_values.sum(),
+			1,
+			places=4
+		)
+
+	def test_synthetic_data_is_reproducible(self) -> None:
+		import numpy as np
+		import timspeak.data_handlers.synthetic_data
+		sample_1 = timspeak.data_handlers.synthetic_data.generate_sample(gradient_length=2.0, scan_count=50)
+		sample_2 = timspeak.data_handlers.synthetic_data.generate_sample(gradient_length=2.0, scan_count=50)
+		self.assertTrue(np.array_equal(sample_1.dia_data.intensity_values, sample_2.dia_data.intensity_values))
+		self.assertTrue(sample_1.features.equals(sample_2.features))
+
+	def test_recall(self) -> None:
+		import types
+		import numpy as np
+		import timspeak.data_handlers.synthetic_data
+		sample = timspeak.data_handlers.synthetic_data.generate_sample(
+			gradient_length=4.0,
+			scan_count=100,
+			precursors_per_second=2.0,
+			charge_3_fraction=0.0,
+			isotope_count=3,
+			fragments_per_precursor=1,
+		)
+		features = sample.features
+		# every feature is found, except the first one
+		cluster3d_stats = types.SimpleNamespace(
+			**{
+				name: features[name].values[1:]
+				for name in ('mz_values', 'rt_values', 'im_values', 'frame_groups')
+			},
+			intensity_values=features['summed_intensity_values'].values[1:],
+		)
+		feature_clusters = timspeak.data_handlers.synthetic_data.match_features(features, cluster3d_stats)
+		self.assertEqual(feature_clusters[0], -1)
+		self.assertTrue(np.array_equal(feature_clusters[1:], np.arange(len(features) - 1)))
+		precursor_indices = np.flatnonzero(cluster3d_stats.frame_groups == 0)
+		isotopic_pairs = np.full(len(precursor_indices), -1)
+		# pair the isotopes of the second precursor (clusters 2, 3 and 4)
+		isotopic_pairs[[2, 3]] = [3, 4]
+		recall = timspeak.data_handlers.synthetic_data.get_isotope_pair_recall(
+			features,
+			feature_clusters,
+			sample.precursors,
+			2,
+			precursor_indices,
+			isotopic_pairs
+		)
+		self.assertAlmostEqual(recall, 2 / (2 * len(sample.precursors)))
+
+	def test_regressions(self) -> None:
+		import timspeak.execution_pipeline.benchmark_pipeline
+		baseline = {'sizes': {'small': {'smoother': {'seconds': 1.0}, 'clusterer': {'seconds': 2.0}}}}
+		results = {
+			'sizes': {
+				'small': {'smoother': {'seconds': 1.2}, 'clusterer': {'seconds': 3.0}, 'ks_tester': {'seconds': 9.0}},
+				'large': {'smoother': {'seconds': 9.0}},
+			}
+		}
+		regressions = timspeak.execution_pipeline.benchmark_pipeline.get_regressions(results, baseline, 0.25)
+		self.assertEqual(len(regressions), 1)
+		self.assertTrue(regressions[0].startswith('small clusterer'))
+
+	def test_parallel_profile(self) -> None:
+		import numba
+		import numpy as np
+		import timspeak.performance_utilities.multiprocessing
+
+		@timspeak.performance_utilities.multiprocessing.parallel(include_progress_callback=False)
+		@numba.njit(nogil=True)
+		def double(index, values):
+			values[index] *= 2
+
+		values = np.ones(10)
+		double(range(10), values)
+		with timspeak.performance_utilities.multiprocessing.profile_parallel() as profiles:
+			double(range(10), values)
+		double(range(10), values)
+		self.assertTrue(np.all(values == 8))
+		self.assertEqual(len(profiles), 1)
+		self.assertEqual(profiles[0]['name'], 'double')
+		self.assertEqual(sum(profiles[0]['work_items']), 10)
+		self.assertEqual(len(profiles[0]['finish_times_s']), profiles[0]['threads'])
+		self.assertLessEqual(max(profiles[0]['finish_times_s']), profiles[0]['wall_time_s'])
+
+	def test_load_imbalance(self) -> None:
+		import timspeak.execution_pipeline.benchmark_pipeline
+		profiles = [
+			{'finish_times_s': [1.0, 1.0]},
+			{'finish_times_s': [1.0, 3.0]},
+		]
+		load_imbalance = timspeak.execution_pipeline.benchmark_pipeline.get_load_imbalance(profiles)
+		self.assertEqual(load_imbalance['parallel_calls'], 2)
+		self.assertAlmostEqual(load_imbalance['imbalance'], 4 / 3 - 1)
+		self.assertAlmostEqual(load_imbalance['finish_time_spread_s'], 2.0)
+		self.assertEqual(timspeak.execution_pipeline.benchmark_pipeline.get_load_imbalance([])['imbalance'], 0)
+
+	def test_time_kernel(self) -> None:
+		import timspeak.execution_pipeline.benchmark_pipeline
+		calls = []
+		wall_times = timspeak.execution_pipeline.benchmark_pipeline.time_kernel(lambda: calls.append(1), 3)
+		self.assertEqual(len(wall_times), 3)
+		self.assertEqual(len(calls), 3)
+
+	def test_profile_compilation(self) -> None:
+		import dataclasses
+		import numba
+		import timspeak.performance_utilities.compiling
+
+		@timspeak.performance_utilities.compiling.njit_class
+		@dataclasses.dataclass(frozen=True)
+		class Adder:
+			offset: int
+
+			def __post_init__(self):
+				pass
+
+			@numba.njit
+			def add(self, value):
+				return value + self.offset
+
+		with timspeak.performance_utilities.compiling.profile_compilation() as profile:
+			adder = Adder(1)
+			self.assertEqual(adder.add(1), 2)
+		self.assertEqual(profile['Adder']['instances'], 1)
+		self.assertEqual(profile['Adder']['compilations'], 1)
+		self.assertGreater(profile['Adder']['compile_time_s'], 0)
+		self.assertIsNone(timspeak.performance_utilities.compiling.COMPILE_PROFILE)
+
+	def test_appended_clusters(self) -> None:
+		import os
+		import tempfile
+		import types
+		import numpy as np
+		import timspeak.io_interface.output.out_formats.hdf
+		import timspeak.execution_pipeline.io_benchmark_pipeline
+		cluster_index = types.SimpleNamespace(
+			indptr=np.array([0, 2, 3, 6, 7, 10]),
+			values=np.arange(10)[::-1].copy()
+		)
+		cluster3d_stats = types.SimpleNamespace(**{
+			name: np.arange(5) for name in (
+				'apex_indices', 'sizes', 'frame_groups', 'mz_values', 'im_values', 'rt_values', 'intensity_values'
+			)
+		})
+		chunks = timspeak.execution_pipeline.io_benchmark_pipeline.split_clusters(cluster_index, cluster3d_stats, 2)
+		self.assertEqual(len(chunks), 2)
+		clustering_parameters = {
+			'algorithm_name': 'test',
+			'ppm_tolerance': 1,
+			'rt_tolerance': 1,
+			'im_tolerance': 1,
+			'clustering_threshold': 1,
+		}
+		with tempfile.TemporaryDirectory() as directory:
+			output_file_name = os.path.join(directory, 'appended.hdf')
+			output_format_object = timspeak.io_interface.output.out_formats.hdf.HDFFormat(output_file_name)
+			for chunk in chunks:
+				output_format_object.append_clustering_data(clustering_parameters, chunk)
+			timspeak.execution_pipeline.io_benchmark_pipeline.evict_file(output_file_name)
+			indptr = output_format_object.read_mem_map(file_name=output_file_name, mmap_name='/clustering/raw_pointers/indptr')
+			values = output_format_object.read_mem_map(file_name=output_file_name, mmap_name='/clustering/raw_pointers/indices')
+			self.assertGreater(timspeak.execution_pipeline.io_benchmark_pipeline.get_file_size(output_file_name), values.nbytes)
+		self.assertTrue(np.array_equal(indptr, cluster_index.indptr))
+		self.assertTrue(np.array_equal(values, cluster_index.values))
+
+
+if __name__ == "__main__":
+	unittest.main()
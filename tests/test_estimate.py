@@ -0,0 +1,52 @@
+"""This module provides unit tests for the timspeak cost and memory estimate"""
+
+import unittest
+
+
+def add_timspeak_path() -> None:
+	import os
+	import sys
+	sys.path.append(os.path.dirname(os.getcwd()))
+
+
+add_timspeak_path()
+
+
+class TestEstimate(unittest.TestCase):
+
+	def test_sampled_scans(self) -> None:
+		import numpy as np
+		import timspeak.execution_pipeline.estimate_pipeline
+		scan_indices = timspeak.execution_pipeline.estimate_pipeline.get_sampled_scans(101, 4, 0.1)
+		self.assertEqual(len(scan_indices), 10 * 4)
+		frames, scans = np.divmod(scan_indices, 4)
+		self.assertTrue(np.all(np.diff(scan_indices) > 0))
+		self.assertTrue(np.all(frames > 0))
+		self.assertTrue(np.all(np.bincount(frames)[np.unique(frames)] == 4))
+		self.assertEqual(len(timspeak.execution_pipeline.estimate_pipeline.get_sampled_scans(101, 4, 0.0)), 4)
+		self.assertEqual(len(timspeak.execution_pipeline.estimate_pipeline.get_sampled_scans(3, 4, 1.0)), 2 * 4)
+
+	def test_scale_reference_stages(self) -> None:
+		import timspeak.execution_pipeline.estimate_pipeline
+		reference = {
+			'acquisition': {'ion_count': 100},
+			'stages': {
+				'smoothing': {'wall_time_s': 10.0, 'threads': 4, 'rss_bytes_before': 1000, 'peak_rss_bytes': 1500},
+				'clustering': {
+					'wall_time_s': 20.0,
+					'threads': 4,
+					'rss_bytes_before': 1400,
+					'peak_rss_bytes': 3000,
+					'max_rss_bytes': 2000,
+				},
+			},
+		}
+		stages = timspeak.execution_pipeline.estimate_pipeline.scale_reference_stages(reference, 200, 8)
+		self.assertAlmostEqual(stages['smoothing']['wall_time_s'], 10.0)
+		self.assertAlmostEqual(stages['clustering']['wall_time_s'], 20.0)
+		self.assertEqual(stages['smoothing']['memory_bytes'], 1000)
+		self.assertEqual(stages['clustering']['memory_bytes'], 2000)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,59 @@
+"""This module provides unit tests for the timspeak frame group shards"""
+
+import unittest
+
+
+def add_timspeak_path() -> None:
+	import os
+	import sys
+	sys.path.append(os.path.dirname(os.getcwd()))
+
+
+add_timspeak_path()
+
+import dia_data_fixtures
+
+
+class TestFrameGroups(unittest.TestCase):
+
+	def test_frame_groups_cover_acquisition(self) -> None:
+		import numpy as np
+		import timspeak.data_handlers.frame_groups
+		dia_data = dia_data_fixtures.get_dia_data()
+		ion_indices = np.concatenate(
+			[
+				timspeak.data_handlers.frame_groups.FrameGroupDiaData(
+					dia_data=dia_data,
+					frame_group=frame_group
+				).ion_indices for frame_group in range(dia_data.cycle.shape[1])
+			]
+		)
+		self.assertTrue(np.array_equal(np.sort(ion_indices), np.arange(dia_data.tof_indptr[-1])))
+
+	def test_frame_group_dia_data(self) -> None:
+		import numpy as np
+		import timspeak.data_handlers.frame_groups
+		dia_data = dia_data_fixtures.get_dia_data()
+		scan_count = len(dia_data.im_values)
+		cycle_length = dia_data.cycle.shape[1]
+		frame_group_dia_data = timspeak.data_handlers.frame_groups.FrameGroupDiaData(dia_data=dia_data, frame_group=1)
+		self.assertTrue(frame_group_dia_data.cycle.shape[1] == 1)
+		self.assertTrue(len(frame_group_dia_data.tof_indptr) == len(frame_group_dia_data.rt_values) * scan_count + 1)
+		self.assertTrue(
+			np.array_equal(frame_group_dia_data.intensity_values, dia_data.intensity_values[frame_group_dia_data.ion_indices])
+		)
+		for frame in range(1, len(frame_group_dia_data.rt_values)):
+			global_frame = frame_group_dia_data.get_global_frames(frame)
+			self.assertTrue((global_frame - 1) % cycle_length == 1)
+			self.assertTrue(frame_group_dia_data.rt_values[frame] == dia_data.rt_values[global_frame])
+			start = frame_group_dia_data.tof_indptr[frame * scan_count]
+			end = frame_group_dia_data.tof_indptr[(frame + 1) * scan_count]
+			self.assertTrue(
+				np.array_equal(
+					frame_group_dia_data.get_global_ions(np.arange(start, end)),
+					np.arange(
+						dia_data.tof_indptr[global_frame * scan_count],
+						dia_data.tof_indptr[(global_frame + 1) * scan_count]
+					)
+				)
+			)
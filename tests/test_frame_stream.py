@@ -0,0 +1,127 @@
+"""This module provides unit tests for the timspeak frame stream"""
+
+import unittest
+
+
+def add_timspeak_path() -> None:
+	import os
+	import sys
+	sys.path.append(os.path.dirname(os.getcwd()))
+
+
+add_timspeak_path()
+
+import dia_data_fixtures
+
+
+class TestFrameStream(unittest.TestCase):
+
+	def test_ring_restores_acquisition(self) -> None:
+		import tempfile
+		import numpy as np
+		import timspeak.data_handlers.frame_stream
+		dia_data = dia_data_fixtures.get_dia_data()
+		with tempfile.TemporaryDirectory() as directory:
+			chunk_count = timspeak.data_handlers.frame_stream.write_frame_chunks(dia_data, directory, 7)
+			reader = timspeak.data_handlers.frame_stream.FrameChunkReader(directory, 0.01, 1)
+			frame_ring = timspeak.data_handlers.frame_stream.FrameRing(reader.read_metadata())
+			chunks = list(reader)
+		self.assertEqual(len(chunks), chunk_count)
+		for chunk in chunks:
+			frame_ring.append(chunk)
+		ring_dia_data = frame_ring.get_dia_data()
+		self.assertTrue(np.array_equal(ring_dia_data.tof_indptr, dia_data.tof_indptr))
+		self.assertTrue(np.array_equal(ring_dia_data.rt_values, dia_data.rt_values))
+		self.assertTrue(np.array_equal(ring_dia_data.tof_indices, dia_data.tof_indices))
+		self.assertEqual(ring_dia_data.intensity_values.dtype, dia_data.intensity_values.dtype)
+
+	def test_ring_drops_frames(self) -> None:
+		import tempfile
+		import numpy as np
+		import timspeak.data_handlers.frame_stream
+		dia_data = dia_data_fixtures.get_dia_data()
+		with tempfile.TemporaryDirectory() as directory:
+			timspeak.data_handlers.frame_stream.write_frame_chunks(dia_data, directory, 10)
+			reader = timspeak.data_handlers.frame_stream.FrameChunkReader(directory, 0.01, 1)
+			frame_ring = timspeak.data_handlers.frame_stream.FrameRing(reader.read_metadata())
+			for chunk in reader:
+				frame_ring.append(chunk)
+		frame = frame_ring.get_frame(1.45)
+		self.assertEqual(frame, 13)
+		frame_ring.drop_frames_before(frame)
+		self.assertEqual(frame_ring.first_frame, 13)
+		self.assertEqual(frame_ring.first_ion, dia_data.tof_indptr[13 * len(dia_data.im_values)])
+		self.assertTrue(
+			np.array_equal(
+				frame_ring.intensity_values,
+				dia_data.intensity_values[frame_ring.first_ion:]
+			)
+		)
+
+	def test_same_clusters_as_full_run(self) -> None:
+		import os
+		import tempfile
+		import numpy as np
+		import timspeak.data_handlers.frame_stream
+		import timspeak.execution_pipeline.stream_pipeline
+		import timspeak.io_interface.output.out_formats.hdf
+		dia_data = dia_data_fixtures.get_synthetic_dia_data()
+		pipeline = dia_data_fixtures.get_pipeline(dia_data)
+		smooth_intensity_values = pipeline.smooth_data()
+		pipeline.smooth_intensity_values = smooth_intensity_values
+		index_3d = pipeline.cluster_data()
+		with tempfile.TemporaryDirectory() as directory:
+			stream_directory = os.path.join(directory, 'stream')
+			output_file_name = os.path.join(directory, 'stream.hdf')
+			timspeak.data_handlers.frame_stream.write_frame_chunks(dia_data, stream_directory, 20)
+			stream_pipeline = timspeak.execution_pipeline.stream_pipeline.StreamPipeline(
+				None,
+				stream_directory,
+				poll_interval=0.01,
+				timeout=5
+			)
+			stream_pipeline.logger = dia_data_fixtures.get_logger()
+			stream_pipeline.config_file_content = dia_data_fixtures.get_config_file_content(rt_window_halo=1.0)
+			stream_pipeline.output_format_object = timspeak.io_interface.output.out_formats.hdf.HDFFormat(
+				output_file_name
+			)
+			min_stream_batch_size = timspeak.execution_pipeline.stream_pipeline.MIN_STREAM_BATCH_SIZE
+			# process every chunk as it arrives, to stitch as many batches as possible
+			timspeak.execution_pipeline.stream_pipeline.MIN_STREAM_BATCH_SIZE = 0
+			try:
+				stream_pipeline.set_stream()
+				stream_pipeline.process_stream()
+			finally:
+				timspeak.execution_pipeline.stream_pipeline.MIN_STREAM_BATCH_SIZE = min_stream_batch_size
+			streamed_values = {
+				name: stream_pipeline.output_format_object.read_mem_map(
+					file_name=output_file_name,
+					mmap_name=mmap_name
+				) for name, mmap_name in (
+					('smooth_intensity_values', '/smoothing/smooth_intensity_values'),
+					('indptr', '/clustering/raw_pointers/indptr'),
+					('values', '/clustering/raw_pointers/indices'),
+				)
+			}
+		self.assertTrue(np.array_equal(streamed_values['smooth_intensity_values'], smooth_intensity_values))
+		clusters = {
+			tuple(index_3d.values[start: end]) for start, end in zip(index_3d.indptr[:-1], index_3d.indptr[1:])
+		}
+		indptr = streamed_values['indptr']
+		streamed_clusters = [
+			tuple(streamed_values['values'][start: end]) for start, end in zip(indptr[:-1], indptr[1:])
+		]
+		self.assertEqual(len(streamed_clusters), len(clusters))
+		self.assertEqual(set(streamed_clusters), clusters)
+
+	def test_reader_timeout(self) -> None:
+		import tempfile
+		import timspeak.data_handlers.frame_stream
+		with tempfile.TemporaryDirectory() as directory:
+			reader = timspeak.data_handlers.frame_stream.FrameChunkReader(directory, 0.01, 0.05)
+			with self.assertRaises(TimeoutError):
+				reader.read_metadata()
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,64 @@
+"""This module provides unit tests for the timspeak memory budget"""
+
+import unittest
+
+
+def add_timspeak_path() -> None:
+	import os
+	import sys
+	sys.path.append(os.path.dirname(os.getcwd()))
+
+
+add_timspeak_path()
+
+
+class TestMemory(unittest.TestCase):
+
+	def setUp(self) -> None:
+		import tempfile
+		import timspeak.performance_utilities.memory
+		self.directory = tempfile.TemporaryDirectory()
+		timspeak.performance_utilities.memory.set_scratch_directory(self.directory.name)
+
+	def tearDown(self) -> None:
+		import timspeak.performance_utilities.memory
+		timspeak.performance_utilities.memory.set_max_memory(None)
+		timspeak.performance_utilities.memory.set_scratch_directory(None)
+		self.directory.cleanup()
+
+	def test_without_budget(self) -> None:
+		import numpy as np
+		import timspeak.performance_utilities.memory
+		array = timspeak.performance_utilities.memory.zeros(10, dtype=np.float32)
+		self.assertFalse(isinstance(array.base, np.memmap))
+		self.assertTrue(np.array_equal(array, np.zeros(10, dtype=np.float32)))
+
+	def test_exceeding_budget(self) -> None:
+		import os
+		import numpy as np
+		import timspeak.performance_utilities.memory
+		timspeak.performance_utilities.memory.set_max_memory(0)
+		array = timspeak.performance_utilities.memory.zeros((4, 5), dtype=np.float32)
+		self.assertTrue(isinstance(array.base, np.memmap))
+		self.assertTrue(np.array_equal(array, np.zeros((4, 5), dtype=np.float32)))
+		array[:] = 1
+		self.assertTrue(array.sum() == 20)
+		self.assertTrue(os.listdir(self.directory.name) == [])
+
+	def test_arange(self) -> None:
+		import numpy as np
+		import timspeak.performance_utilities.memory
+		timspeak.performance_utilities.memory.set_max_memory(0)
+		self.assertTrue(np.array_equal(timspeak.performance_utilities.memory.arange(7), np.arange(7)))
+
+	def test_expand_indptr(self) -> None:
+		import numpy as np
+		import timspeak.performance_utilities.memory
+		indptr = np.array([0, 2, 2, 5, 6])
+		expected = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+		self.assertTrue(np.array_equal(timspeak.performance_utilities.memory.expand_indptr(indptr), expected))
+		timspeak.performance_utilities.memory.CHUNK_SIZE = 1
+		try:
+			self.assertTrue(np.array_equal(timspeak.performance_utilities.memory.expand_indptr(indptr), expected))
+		finally:
+			timspeak.performance_utilities.memory.CHUNK_SIZE = 2**24
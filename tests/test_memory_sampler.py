@@ -0,0 +1,66 @@
+"""This module provides unit tests for the timspeak memory sampler"""
+
+import unittest
+
+
+def add_timspeak_path() -> None:
+	import os
+	import sys
+	sys.path.append(os.path.dirname(os.getcwd()))
+
+
+add_timspeak_path()
+
+
+class TestMemorySampler(unittest.TestCase):
+
+	def test_samples_split_resident_memory(self) -> None:
+		import time
+		import timspeak.performance_utilities.memory_sampler
+		sampler = timspeak.performance_utilities.memory_sampler.MemorySampler(0.01)
+		sampler.start()
+		time.sleep(0.05)
+		sampler.stop()
+		timeline = sampler.get_timeline()
+		self.assertGreater(len(timeline), 2)
+		for sample in timeline:
+			self.assertGreater(sample['rss_bytes'], 0)
+			self.assertEqual(sample['anonymous_bytes'] + sample['file_backed_bytes'], sample['rss_bytes'])
+			self.assertGreaterEqual(sample['scratch_disk_bytes'], 0)
+		times = [sample['time_s'] for sample in timeline]
+		self.assertEqual(times, sorted(times))
+		sampler.stop()
+		self.assertEqual(len(sampler.get_timeline()), len(timeline))
+
+	def test_stage_maxima(self) -> None:
+		import numpy as np
+		import timspeak.performance_utilities.memory_sampler
+		sampler = timspeak.performance_utilities.memory_sampler.MemorySampler(10)
+		sampler.start()
+		sampler.start_stage('small')
+		sampler.stop_stage('small')
+		sampler.start_stage('large')
+		values = np.ones(2**25)
+		sampler.stop_stage('large')
+		sampler.stop()
+		small_maxima = sampler.get_stage_maxima('small')
+		large_maxima = sampler.get_stage_maxima('large')
+		self.assertEqual(
+			set(large_maxima),
+			set(timspeak.performance_utilities.memory_sampler.MEMORY_SAMPLE_NAMES)
+		)
+		self.assertGreater(large_maxima['rss_bytes'], small_maxima['rss_bytes'] + values.nbytes // 2)
+		self.assertEqual(sampler.get_stage_maxima('missing'), {})
+		self.assertEqual(sampler.get_timeline()[-1]['stages'], [])
+
+	def test_stage_performance_has_maxima(self) -> None:
+		import timspeak.performance_utilities.stage_performance
+		stage_performance = timspeak.performance_utilities.stage_performance.StagePerformance(
+			memory_maxima={'rss_bytes': 10}
+		)
+		self.assertEqual(stage_performance.as_dict()['max_rss_bytes'], 10)
+		self.assertNotIn('memory_maxima', stage_performance.as_dict())
+
+
+if __name__ == "__main__":
+	unittest.main()
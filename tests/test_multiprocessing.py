@@ -0,0 +1,316 @@
+"""This module provides unit tests for the timspeak parallel functions"""
+
+import unittest
+
+
+def add_timspeak_path() -> None:
+	import os
+	import sys
+	sys.path.append(os.path.dirname(os.getcwd()))
+
+
+add_timspeak_path()
+
+
+def get_indexed_function():
+	import numba
+	import timspeak.performance_utilities.multiprocessing
+
+	@timspeak.performance_utilities.multiprocessing.parallel(thread_count=3, include_progress_callback=False)
+	@numba.njit(nogil=True)
+	def add_index(index, values):
+		values[index] += index + 1
+
+	return add_index
+
+
+def sum_row(row, matrix, sums):
+	import numpy as np
+	sums[row] = matrix[row].sum()
+	return np.full(len(matrix[row]), row)
+
+
+def fail_at_two(row):
+	if row == 2:
+		raise ValueError('two')
+	return row
+
+
+class TestCostBalancedSchedule(unittest.TestCase):
+
+	def test_chunk_borders(self) -> None:
+		import numpy as np
+		import timspeak.performance_utilities.multiprocessing
+		costs = np.array([0, 0, 10, 0, 0, 0, 10, 0, 100, 0])
+		chunk_borders = timspeak.performance_utilities.multiprocessing.get_chunk_borders(costs, 4)
+		self.assertEqual(chunk_borders[0], 0)
+		self.assertEqual(chunk_borders[-1], len(costs))
+		self.assertTrue(np.all(np.diff(chunk_borders) > 0))
+		self.assertIn(8, chunk_borders)
+		self.assertIn(9, chunk_borders)
+		self.assertEqual(
+			list(timspeak.performance_utilities.multiprocessing.get_chunk_borders(np.zeros(0), 4)),
+			[0]
+		)
+
+	def test_every_item_once(self) -> None:
+		import numpy as np
+		import timspeak.performance_utilities.multiprocessing
+		add_index = get_indexed_function()
+		costs = np.random.default_rng(0).integers(0, 1000, 1000)
+		for schedule in timspeak.performance_utilities.multiprocessing.PARALLEL_SCHEDULES:
+			timspeak.performance_utilities.multiprocessing.set_parallel_schedule(schedule)
+			values = np.zeros(1000)
+			add_index(range(1000), values, costs=costs)
+			self.assertTrue(np.array_equal(values, np.arange(1000) + 1))
+			values = np.zeros(1000)
+			add_index(np.arange(0, 1000, 2), values, costs=costs[::2])
+			self.assertTrue(np.array_equal(values[::2], np.arange(0, 1000, 2) + 1))
+			self.assertTrue(np.all(values[1::2] == 0))
+		timspeak.performance_utilities.multiprocessing.set_parallel_schedule('balanced')
+
+	def test_no_items(self) -> None:
+		import numba
+		import numpy as np
+		import timspeak.performance_utilities.multiprocessing
+
+		@timspeak.performance_utilities.multiprocessing.parallel(thread_count=3)
+		@numba.njit(nogil=True)
+		def add_index(index, values):
+			values[index] += index + 1
+
+		progress_interval = timspeak.performance_utilities.multiprocessing.PROGRESS_INTERVAL
+		# report progress before the first call has compiled its workers
+		timspeak.performance_utilities.multiprocessing.PROGRESS_INTERVAL = 0
+		try:
+			for schedule in timspeak.performance_utilities.multiprocessing.PARALLEL_SCHEDULES:
+				timspeak.performance_utilities.multiprocessing.set_parallel_schedule(schedule)
+				add_index(range(0), np.zeros(0))
+				add_index(np.zeros(0, dtype=np.int64), np.zeros(0), costs=np.zeros(0))
+		finally:
+			timspeak.performance_utilities.multiprocessing.PROGRESS_INTERVAL = progress_interval
+			timspeak.performance_utilities.multiprocessing.set_parallel_schedule('balanced')
+
+	def test_costs_must_match_items(self) -> None:
+		import numpy as np
+		import timspeak.performance_utilities.multiprocessing
+		add_index = get_indexed_function()
+		with self.assertRaises(ValueError):
+			add_index(range(10), np.zeros(10), costs=np.ones(9))
+		with self.assertRaises(ValueError):
+			timspeak.performance_utilities.multiprocessing.set_parallel_schedule('random')
+
+
+class TestWorkerPool(unittest.TestCase):
+
+	def test_threads_are_reused(self) -> None:
+		import numpy as np
+		import timspeak.performance_utilities.multiprocessing
+		add_index = get_indexed_function()
+		values = np.zeros(100)
+		add_index(range(100), values)
+		pool = timspeak.performance_utilities.multiprocessing.get_worker_pool()
+		threads = list(pool.threads)
+		for _ in range(10):
+			add_index(range(100), values)
+		self.assertTrue(np.array_equal(values, 11 * (np.arange(100) + 1)))
+		self.assertIs(pool, timspeak.performance_utilities.multiprocessing.get_worker_pool())
+		self.assertEqual(pool.threads, threads)
+
+	def test_concurrent_calls(self) -> None:
+		import numpy as np
+		import timspeak.performance_utilities.multiprocessing
+		add_index = get_indexed_function()
+		values = np.zeros((4, 1000))
+		timspeak.performance_utilities.multiprocessing.threadpool(
+			lambda row: add_index(range(1000), values[row]),
+			thread_count=4,
+		)(range(4))
+		self.assertTrue(np.all(values == np.arange(1000) + 1))
+
+	def test_exceptions_are_raised(self) -> None:
+		import numba
+		import numpy as np
+		import timspeak.performance_utilities.multiprocessing
+
+		@timspeak.performance_utilities.multiprocessing.parallel(include_progress_callback=False)
+		@numba.njit(nogil=True)
+		def fail_at_five(index, values):
+			if index == 5:
+				raise ValueError('five')
+			values[index] = 1
+
+		with self.assertRaises(ValueError):
+			fail_at_five(range(10), np.zeros(10))
+		values = np.zeros(10)
+		fail_at_five(range(5), values)
+		self.assertEqual(values.sum(), 5)
+
+	def test_thread_ids_keep_their_thread(self) -> None:
+		import threading
+		import timspeak.performance_utilities.multiprocessing
+		pool = timspeak.performance_utilities.multiprocessing.get_worker_pool()
+		thread_names = {}
+
+		def record_thread(thread_id):
+			thread_names.setdefault(thread_id, set()).add(threading.current_thread().name)
+
+		for _ in range(5):
+			pool.dispatch(record_thread, [(thread_id,) for thread_id in range(3)]).wait()
+		self.assertTrue(all(len(names) == 1 for names in thread_names.values()))
+		self.assertEqual(len(set.union(*thread_names.values())), 3)
+
+
+class TestThreadPlacement(unittest.TestCase):
+
+	def test_placement_cpus(self) -> None:
+		import timspeak.performance_utilities.multiprocessing
+		nodes = [[0, 1, 2], [4, 5]]
+		self.assertEqual(
+			timspeak.performance_utilities.multiprocessing.get_placement_cpus('compact', nodes),
+			[0, 1, 2, 4, 5]
+		)
+		self.assertEqual(
+			timspeak.performance_utilities.multiprocessing.get_placement_cpus('scatter', nodes),
+			[0, 4, 1, 5, 2]
+		)
+		self.assertEqual(
+			timspeak.performance_utilities.multiprocessing.parse_cpu_list('0-2,8,10-11\n'),
+			[0, 1, 2, 8, 10, 11]
+		)
+
+	def test_threads_are_pinned(self) -> None:
+		import os
+		import numpy as np
+		import timspeak.performance_utilities.memory
+		import timspeak.performance_utilities.multiprocessing
+		if not hasattr(os, 'sched_getaffinity'):
+			self.skipTest('CPU affinity is not supported')
+		pool = timspeak.performance_utilities.multiprocessing.get_worker_pool()
+		affinities = []
+		try:
+			placement_cpus = timspeak.performance_utilities.multiprocessing.set_thread_placement('scatter')
+			pool.dispatch(lambda: affinities.append(os.sched_getaffinity(0)), [()]).wait()
+			stop = timspeak.performance_utilities.memory.FIRST_TOUCH_MIN_BYTES // 8
+			self.assertTrue(np.array_equal(timspeak.performance_utilities.memory.arange(stop), np.arange(stop)))
+			self.assertFalse(np.any(timspeak.performance_utilities.memory.zeros((2, stop // 2))))
+			self.assertFalse(np.any(timspeak.performance_utilities.memory.empty(stop)))
+		finally:
+			timspeak.performance_utilities.multiprocessing.set_thread_placement('none')
+		pool.dispatch(lambda: affinities.append(os.sched_getaffinity(0)), [()]).wait()
+		self.assertEqual(affinities[0], {placement_cpus[0]})
+		self.assertEqual(affinities[1], set(timspeak.performance_utilities.multiprocessing.PROCESS_CPUS))
+
+
+	def test_tasks_are_pinned_by_thread_id(self) -> None:
+		import os
+		import threading
+		import timspeak.performance_utilities.multiprocessing
+		if not hasattr(os, 'sched_getaffinity'):
+			self.skipTest('CPU affinity is not supported')
+		pool = timspeak.performance_utilities.multiprocessing.get_worker_pool()
+		release = threading.Event()
+		affinities = {}
+
+		def record_affinity(thread_id):
+			affinities[thread_id] = os.sched_getaffinity(0)
+
+		try:
+			placement_cpus = timspeak.performance_utilities.multiprocessing.set_thread_placement('compact')
+			# a concurrent call keeps the lowest thread of the pool busy
+			busy_batch = pool.dispatch(release.wait, [()])
+			pool.dispatch(record_affinity, [(thread_id,) for thread_id in range(2)]).wait()
+			release.set()
+			busy_batch.wait()
+		finally:
+			release.set()
+			timspeak.performance_utilities.multiprocessing.set_thread_placement('none')
+		for thread_id in range(2):
+			self.assertEqual(affinities[thread_id], {placement_cpus[thread_id % len(placement_cpus)]})
+
+
+class TestNumbaBackend(unittest.TestCase):
+
+	def test_same_results(self) -> None:
+		import numpy as np
+		import timspeak.performance_utilities.multiprocessing
+		add_index = get_indexed_function()
+		timspeak.performance_utilities.multiprocessing.start_numba_threads()
+		for backend in timspeak.performance_utilities.multiprocessing.PARALLEL_BACKENDS:
+			with timspeak.performance_utilities.multiprocessing.parallel_backend(backend):
+				values = np.zeros(1000)
+				add_index(range(1000), values)
+				add_index(np.arange(0, 1000, 3), values)
+			expected = np.arange(1000) + 1.0
+			expected[::3] *= 2
+			self.assertTrue(np.array_equal(values, expected))
+
+	def test_backend_overrides(self) -> None:
+		import timspeak.performance_utilities.multiprocessing
+		timspeak.performance_utilities.multiprocessing.set_parallel_backend('threads', {'add_index': 'numba'})
+		try:
+			self.assertEqual(timspeak.performance_utilities.multiprocessing.get_parallel_backend('add_index'), 'numba')
+			self.assertEqual(timspeak.performance_utilities.multiprocessing.get_parallel_backend('smooth_scan'), 'threads')
+			with timspeak.performance_utilities.multiprocessing.parallel_backend('threads'):
+				self.assertEqual(timspeak.performance_utilities.multiprocessing.get_parallel_backend('add_index'), 'threads')
+		finally:
+			timspeak.performance_utilities.multiprocessing.set_parallel_backend('threads')
+		with self.assertRaises(ValueError):
+			timspeak.performance_utilities.multiprocessing.set_parallel_backend('threads', {'add_index': 'gpu'})
+		with self.assertRaises(ValueError):
+			timspeak.performance_utilities.multiprocessing.set_numba_threading_layer('pthreads')
+
+
+
+class TestProcessPool(unittest.TestCase):
+
+	def test_shared_arrays(self) -> None:
+		import pickle
+		import numpy as np
+		import timspeak.performance_utilities.multiprocessing
+		shared = timspeak.performance_utilities.multiprocessing.shared_empty((4, 3), dtype=np.int32)
+		shared[:] = np.arange(12).reshape(4, 3)
+		small = np.arange(3)
+		large = np.arange(timspeak.performance_utilities.multiprocessing.SHARED_ARRAY_MIN_BYTES)
+		blocks = []
+		references = timspeak.performance_utilities.multiprocessing.share_arrays(
+			(shared[1:], {'small': small, 'large': large}),
+			blocks=blocks
+		)
+		self.assertEqual(len(blocks), 1)
+		self.assertIs(references[1]['small'], small)
+		view, arrays = timspeak.performance_utilities.multiprocessing.open_shared_arrays(
+			pickle.loads(pickle.dumps(references))
+		)
+		self.assertTrue(np.array_equal(view, shared[1:]))
+		self.assertTrue(np.array_equal(arrays['large'], large))
+		view[0, 0] = -1
+		self.assertEqual(shared[1, 0], -1)
+
+	def test_results_and_shared_output(self) -> None:
+		import numpy as np
+		import timspeak.performance_utilities.multiprocessing
+		matrix = np.random.default_rng(0).random((4, 100000))
+		sums = timspeak.performance_utilities.multiprocessing.shared_empty(4)
+		results = timspeak.performance_utilities.multiprocessing.processpool(
+			sum_row,
+			process_count=2,
+			return_results=True,
+			include_progress_callback=False
+		)(range(4), matrix, sums)
+		self.assertTrue(np.allclose(sums, matrix.sum(axis=1)))
+		self.assertEqual([int(result[0]) for result in results], [0, 1, 2, 3])
+		self.assertEqual(len(results[0]), 100000)
+
+	def test_exceptions_are_raised(self) -> None:
+		import timspeak.performance_utilities.multiprocessing
+		with self.assertRaises(ValueError):
+			timspeak.performance_utilities.multiprocessing.processpool(
+				fail_at_two,
+				process_count=2,
+				include_progress_callback=False
+			)(range(4))
+
+
+if __name__ == '__main__':
+	unittest.main()
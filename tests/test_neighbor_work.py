@@ -0,0 +1,94 @@
+"""This module provides unit tests for the timspeak neighbor work counters"""
+
+import unittest
+
+
+def add_timspeak_path() -> None:
+	import os
+	import sys
+	sys.path.append(os.path.dirname(os.getcwd()))
+
+
+add_timspeak_path()
+
+import dia_data_fixtures
+
+
+class TestNeighborWork(unittest.TestCase):
+
+	def test_counts_match_brute_force(self) -> None:
+		import numpy as np
+		import timspeak.peak_picker_algorithms.smooth.smoothing_algorithm_1
+		import timspeak.performance_utilities.neighbor_work
+		dia_data = dia_data_fixtures.get_single_ion_dia_data()
+		smoother = timspeak.peak_picker_algorithms.smooth.smoothing_algorithm_1.Smoother(
+			dia_data=dia_data,
+			rt_tolerance=0.35,
+			im_tolerance=0.35,
+			ppm_tolerance=10.0,
+		)
+		neighbor_work = timspeak.performance_utilities.neighbor_work.count_neighbor_work(smoother)
+		scan_count = len(dia_data.im_values)
+		frame_count = len(dia_data.rt_values)
+		is_empty = np.diff(dia_data.tof_indptr) == 0
+		for name in timspeak.performance_utilities.neighbor_work.NEIGHBOR_WORK_NAMES:
+			self.assertEqual(neighbor_work[name].shape, (frame_count, scan_count))
+		for frame in range(1, frame_count):
+			for scan in range(scan_count):
+				scan_index = frame * scan_count + scan
+				neighbor_scans = []
+				if not is_empty[scan_index]:
+					for other_frame in range(frame_count):
+						if abs(dia_data.rt_values[other_frame] - dia_data.rt_values[frame]) <= 0.35:
+							for other_scan in range(scan_count):
+								if abs(dia_data.im_values[other_scan] - dia_data.im_values[scan]) <= 0.35:
+									neighbor_scans.append(other_frame * scan_count + other_scan)
+				empty_neighbor_scans = [other for other in neighbor_scans if is_empty[other]]
+				self.assertEqual(neighbor_work['neighbor_scans'][frame, scan], len(neighbor_scans))
+				self.assertEqual(neighbor_work['empty_neighbor_scans'][frame, scan], len(empty_neighbor_scans))
+				# every scan holds at most a single ion, all with the same tof index
+				self.assertEqual(
+					neighbor_work['ion_pairs'][frame, scan],
+					len(neighbor_scans) - len(empty_neighbor_scans)
+				)
+
+	def test_count_rt_windows(self) -> None:
+		import numpy as np
+		pipeline = dia_data_fixtures.get_pipeline(
+			dia_data_fixtures.get_synthetic_dia_data(),
+			count_neighbor_work=True,
+			rt_window_size=3.0
+		)
+		pipeline.set_neighbor_work_counting()
+		pipeline.smooth_data()
+		neighbor_work = pipeline.neighbor_work.pop('smoothing')
+		pipeline.set_rt_windows()
+		self.assertTrue(len(pipeline.rt_windows) > 1)
+		pipeline.smooth_data()
+		window_neighbor_work = pipeline.neighbor_work.pop('smoothing')
+		# the halos of the windows are smoothed as well
+		for name, counts in neighbor_work.items():
+			self.assertTrue(np.all(window_neighbor_work[name] >= counts))
+		self.assertGreater(np.sum(window_neighbor_work['neighbor_scans']), np.sum(neighbor_work['neighbor_scans']))
+
+	def test_count_sampled_scans(self) -> None:
+		import numpy as np
+		import timspeak.peak_picker_algorithms.smooth.smoothing_algorithm_1
+		import timspeak.performance_utilities.neighbor_work
+		smoother = timspeak.peak_picker_algorithms.smooth.smoothing_algorithm_1.Smoother(
+			dia_data=dia_data_fixtures.get_single_ion_dia_data(),
+			rt_tolerance=0.35,
+			im_tolerance=0.35,
+			ppm_tolerance=10.0,
+		)
+		counter = timspeak.performance_utilities.neighbor_work.get_neighbor_work_counter(smoother)
+		scan_indices = np.array([5, 8, 9, 30])
+		all_counts = counter.count_all_scans()
+		sampled_counts = counter.count_scans(scan_indices)
+		for counts, sampled in zip(all_counts, sampled_counts):
+			self.assertTrue(np.array_equal(sampled[scan_indices], counts[scan_indices]))
+			self.assertEqual(np.sum(sampled), np.sum(counts[scan_indices]))
+
+
+if __name__ == "__main__":
+	unittest.main()
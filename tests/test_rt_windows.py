@@ -0,0 +1,118 @@
+"""This module provides unit tests for the timspeak RT windows"""
+
+import unittest
+
+
+def add_timspeak_path() -> None:
+	import os
+	import sys
+	sys.path.append(os.path.dirname(os.getcwd()))
+
+
+add_timspeak_path()
+
+import dia_data_fixtures
+
+
+class TestRtWindows(unittest.TestCase):
+
+	def test_windows_cover_acquisition(self) -> None:
+		import timspeak.data_handlers.rt_windows
+		dia_data = dia_data_fixtures.get_dia_data()
+		windows = timspeak.data_handlers.rt_windows.get_rt_windows(dia_data, 0.7, 0.4)
+		self.assertTrue(windows[0].core_first_frame == 1)
+		self.assertTrue(windows[-1].core_last_frame == len(dia_data.rt_values))
+		for window, next_window in zip(windows[:-1], windows[1:]):
+			self.assertTrue(window.core_last_frame == next_window.core_first_frame)
+		for window in windows:
+			for frame in (window.first_frame, window.core_first_frame, window.core_last_frame):
+				self.assertTrue((frame - 1) % dia_data.cycle.shape[1] == 0 or frame == len(dia_data.rt_values))
+			self.assertTrue(window.first_frame <= window.core_first_frame < window.core_last_frame <= window.last_frame)
+
+	def test_window_dia_data(self) -> None:
+		import numpy as np
+		import timspeak.data_handlers.rt_windows
+		dia_data = dia_data_fixtures.get_dia_data()
+		scan_count = len(dia_data.im_values)
+		window = timspeak.data_handlers.rt_windows.get_rt_windows(dia_data, 0.7, 0.4)[1]
+		window_dia_data = timspeak.data_handlers.rt_windows.WindowDiaData(dia_data=dia_data, window=window)
+		self.assertTrue(len(window_dia_data.rt_values) == window.last_frame - window.first_frame + 1)
+		self.assertTrue(len(window_dia_data.tof_indptr) == len(window_dia_data.rt_values) * scan_count + 1)
+		self.assertTrue(np.all(window_dia_data.tof_indptr[:scan_count + 1] == 0))
+		self.assertTrue(
+			np.array_equal(
+				window_dia_data.intensity_values[window_dia_data.core_first_ion: window_dia_data.core_last_ion],
+				dia_data.intensity_values[
+					dia_data.tof_indptr[window.core_first_frame * scan_count]:
+					dia_data.tof_indptr[window.core_last_frame * scan_count]
+				]
+			)
+		)
+
+	def test_grow_window(self) -> None:
+		import timspeak.data_handlers.rt_windows
+		dia_data = dia_data_fixtures.get_dia_data()
+		window = timspeak.data_handlers.rt_windows.get_rt_windows(dia_data, 0.7, 0.4)[1]
+		grown_window = timspeak.data_handlers.rt_windows.grow_rt_window(dia_data, window, 0.0, True, False)
+		self.assertTrue(grown_window.first_frame == window.first_frame - dia_data.cycle.shape[1])
+		self.assertTrue(grown_window.last_frame == window.last_frame)
+		grown_window = timspeak.data_handlers.rt_windows.grow_rt_window(dia_data, window, 10.0, True, True)
+		self.assertTrue(grown_window.first_frame == 1)
+		self.assertTrue(grown_window.last_frame == len(dia_data.rt_values))
+		self.assertTrue(grown_window.core_first_frame == window.core_first_frame)
+
+	def test_same_clusters_as_without_windows(self) -> None:
+		import numpy as np
+		pipeline = dia_data_fixtures.get_pipeline(
+			dia_data_fixtures.get_synthetic_dia_data(),
+			rt_window_size=3.0,
+			rt_window_halo=0.0
+		)
+		smooth_intensity_values = pipeline.smooth_data()
+		pipeline.smooth_intensity_values = smooth_intensity_values
+		index_3d = pipeline.cluster_data()
+		cluster3d_stats = pipeline.get_cluster_stats(index_3d)
+		pipeline.set_rt_windows()
+		self.assertTrue(len(pipeline.rt_windows) > 1)
+		self.assertTrue(np.array_equal(pipeline.smooth_data(), smooth_intensity_values))
+		window_index_3d, window_cluster3d_stats = pipeline.cluster_data_in_rt_windows()
+		self.assertTrue(np.array_equal(window_index_3d.indptr, index_3d.indptr))
+		self.assertTrue(np.array_equal(window_index_3d.values, index_3d.values))
+		self.assertTrue(np.array_equal(window_cluster3d_stats.apex_indices, cluster3d_stats.apex_indices))
+		self.assertTrue(len(np.unique(window_index_3d.values)) == len(window_index_3d.values))
+
+	def test_shards_same_as_without_windows(self) -> None:
+		import tempfile
+		import numpy as np
+		with tempfile.TemporaryDirectory() as shard_directory:
+			pipeline = dia_data_fixtures.get_pipeline(
+				dia_data_fixtures.get_synthetic_dia_data(),
+				rt_window_size=3.0,
+				rt_window_halo=0.0,
+				sample_file_name='sample.d',
+				shard_directory=shard_directory
+			)
+			smooth_intensity_values = pipeline.smooth_data()
+			pipeline.smooth_intensity_values = smooth_intensity_values
+			index_3d = pipeline.cluster_data()
+			pipeline.config_file_content['shard_partition'] = 'rt_window'
+			pipeline.set_rt_windows()
+			pipeline.set_shards()
+			self.assertTrue(pipeline.shard_count > 1)
+			self.assertTrue(np.array_equal(pipeline.smooth_data(), smooth_intensity_values))
+			shard_index_3d, _ = pipeline.cluster_data_in_shards()
+			self.assertTrue(np.array_equal(shard_index_3d.indptr, index_3d.indptr))
+			self.assertTrue(np.array_equal(shard_index_3d.values, index_3d.values))
+			self.assertTrue(all(pipeline.is_shard_computed(shard_index) for shard_index in range(pipeline.shard_count)))
+			shard_directory = pipeline.shard_directory
+			pipeline.config_file_content['clustering']['clustering_threshold'] = 3
+			pipeline.set_shards()
+			self.assertTrue(pipeline.shard_directory != shard_directory)
+			self.assertFalse(pipeline.is_shard_computed(0))
+			pipeline.shard_directory = shard_directory
+			self.assertFalse(pipeline.is_shard_computed(0))
+
+	def test_invalid_window_size(self) -> None:
+		import timspeak.data_handlers.rt_windows
+		with self.assertRaises(ValueError):
+			timspeak.data_handlers.rt_windows.get_rt_windows(dia_data_fixtures.get_dia_data(), 0, 0.4)
@@ -0,0 +1,112 @@
+"""This module provides unit tests for the timspeak stage graph"""
+
+import unittest
+
+
+def add_timspeak_path() -> None:
+	import os
+	import sys
+	sys.path.append(os.path.dirname(os.getcwd()))
+
+
+add_timspeak_path()
+
+
+def get_stages(calls: list) -> list:
+	import timspeak.execution_pipeline.stage_graph
+	Stage = timspeak.execution_pipeline.stage_graph.Stage
+	return [
+		Stage('merge', lambda: calls.append('merge'), None, inputs=('rt', 'im')),
+		Stage('rt', lambda: calls.append('rt'), None, inputs=('clusters',), outputs=('rt',)),
+		Stage('im', lambda: calls.append('im'), None, inputs=('clusters',), outputs=('im',)),
+		Stage('clustering', lambda: calls.append('clustering'), None, inputs=('dia_data',), outputs=('clusters',)),
+	]
+
+
+class TestStageGraph(unittest.TestCase):
+
+	def test_dependencies(self) -> None:
+		import timspeak.execution_pipeline.stage_graph
+		stage_graph = timspeak.execution_pipeline.stage_graph.StageGraph(get_stages([]))
+		self.assertTrue(stage_graph.dependencies['clustering'] == set())
+		self.assertTrue(stage_graph.dependencies['merge'] == {'rt', 'im'})
+
+	def test_serial_order(self) -> None:
+		import timspeak.execution_pipeline.stage_graph
+		calls = []
+		stage_graph = timspeak.execution_pipeline.stage_graph.StageGraph(get_stages(calls))
+		stage_graph.run(lambda stage: stage.function(), max_concurrent_stages=1, thread_count=1)
+		self.assertTrue(calls == ['clustering', 'rt', 'im', 'merge'])
+
+	def test_concurrent_order(self) -> None:
+		import timspeak.execution_pipeline.stage_graph
+		calls = []
+		stage_graph = timspeak.execution_pipeline.stage_graph.StageGraph(get_stages(calls))
+		stage_graph.run(lambda stage: stage.function(), max_concurrent_stages=4, thread_count=4)
+		self.assertTrue(calls[0] == 'clustering')
+		self.assertTrue(set(calls[1:3]) == {'rt', 'im'})
+		self.assertTrue(calls[3] == 'merge')
+
+	def test_late_ready_stage(self) -> None:
+		import threading
+		import timspeak.execution_pipeline.stage_graph
+		import timspeak.performance_utilities.multiprocessing
+		Stage = timspeak.execution_pipeline.stage_graph.Stage
+		late_started = threading.Event()
+		threads = {}
+		waits = []
+		def stage_runner(stage):
+			threads[stage.name] = timspeak.performance_utilities.multiprocessing.get_threads()
+			if stage.name == 'first':
+				# holds the only thread until the stage that becomes ready later has started
+				waits.append(late_started.wait(10))
+			if stage.name == 'late':
+				late_started.set()
+		stages = [
+			Stage('root', None, None, outputs=('clusters',)),
+			Stage('first', None, None, inputs=('clusters',)),
+			Stage('dependency', None, None, inputs=('clusters',), outputs=('pairs',)),
+			Stage('late', None, None, inputs=('pairs',)),
+		]
+		stage_graph = timspeak.execution_pipeline.stage_graph.StageGraph(stages)
+		stage_graph.run(stage_runner, max_concurrent_stages=2, thread_count=1)
+		self.assertEqual(waits, [True])
+		self.assertEqual(threads, {'root': 1, 'first': 1, 'dependency': 1, 'late': 1})
+
+	def test_cycle(self) -> None:
+		import timspeak.execution_pipeline.stage_graph
+		Stage = timspeak.execution_pipeline.stage_graph.Stage
+		stages = [
+			Stage('a', None, None, inputs=('y',), outputs=('x',)),
+			Stage('b', None, None, inputs=('x',), outputs=('y',)),
+		]
+		with self.assertRaises(ValueError):
+			timspeak.execution_pipeline.stage_graph.StageGraph(stages)
+
+	def test_stage_exception(self) -> None:
+		import timspeak.execution_pipeline.stage_graph
+		def stage_runner(stage):
+			if stage.name == 'rt':
+				raise RuntimeError(stage.name)
+		stage_graph = timspeak.execution_pipeline.stage_graph.StageGraph(get_stages([]))
+		with self.assertRaises(RuntimeError):
+			stage_graph.run(stage_runner, max_concurrent_stages=2, thread_count=2)
+
+	def test_signatures(self) -> None:
+		import timspeak.execution_pipeline.stage_graph
+		Stage = timspeak.execution_pipeline.stage_graph.Stage
+		stages = [
+			Stage('smoothing', None, None, outputs=('smooth',), parameters=('smoothing',)),
+			Stage('clustering', None, None, inputs=('smooth',), outputs=('clusters',), parameters=('clustering.ppm_tolerance',)),
+			Stage('ms2', None, None, inputs=('clusters',), parameters=('ms2',)),
+		]
+		stage_graph = timspeak.execution_pipeline.stage_graph.StageGraph(stages)
+		config = {'smoothing': {'rt_sigma': 1.5}, 'clustering': {'ppm_tolerance': 20.0}, 'ms2': {'min_size': 5}}
+		signatures = stage_graph.get_signatures(config)
+		timspeak.execution_pipeline.stage_graph.set_config_value(config, 'clustering.ppm_tolerance', 10.0)
+		other_signatures = stage_graph.get_signatures(config)
+		self.assertTrue(signatures['smoothing'] == other_signatures['smoothing'])
+		self.assertTrue(signatures['clustering'] != other_signatures['clustering'])
+		self.assertTrue(signatures['ms2'] != other_signatures['ms2'])
+		with self.assertRaises(KeyError):
+			timspeak.execution_pipeline.stage_graph.set_config_value(config, 'clustering.ppm', 10.0)
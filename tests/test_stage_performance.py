@@ -0,0 +1,101 @@
+"""This module provides unit tests for the timspeak stage performance report"""
+
+import unittest
+
+
+def add_timspeak_path() -> None:
+	import os
+	import sys
+	sys.path.append(os.path.dirname(os.getcwd()))
+
+
+add_timspeak_path()
+
+
+class TestStagePerformance(unittest.TestCase):
+
+	def test_measure_stage(self) -> None:
+		import time
+		import timspeak.performance_utilities.stage_performance
+		with timspeak.performance_utilities.stage_performance.measure_stage() as stage_performance:
+			time.sleep(0.05)
+		self.assertGreaterEqual(stage_performance.wall_time_s, 0.05)
+		self.assertGreater(stage_performance.rss_bytes_after, 0)
+		self.assertGreaterEqual(stage_performance.peak_rss_bytes, stage_performance.rss_bytes_after)
+
+	def test_peak_per_stage(self) -> None:
+		import numpy as np
+		import timspeak.performance_utilities.memory
+		import timspeak.performance_utilities.stage_performance
+		if not timspeak.performance_utilities.memory.reset_peak_memory():
+			self.skipTest('the peak memory can only be reset on Linux')
+		nbytes = 2**28
+		measure_stage = timspeak.performance_utilities.stage_performance.measure_stage
+		with measure_stage() as outer_performance:
+			np.ones(nbytes // 8)
+			with measure_stage() as inner_performance:
+				pass
+		self.assertLess(inner_performance.peak_rss_bytes, inner_performance.rss_bytes_before + nbytes // 2)
+		self.assertGreaterEqual(outer_performance.peak_rss_bytes, outer_performance.rss_bytes_before + nbytes // 2)
+
+	def test_flat_dictionary(self) -> None:
+		import timspeak.performance_utilities.stage_performance
+		stage_performance = timspeak.performance_utilities.stage_performance.StagePerformance(
+			wall_time_s=1.5,
+			item_counts={'ion': 10, 'cluster_index': 2}
+		)
+		performance = stage_performance.as_dict()
+		self.assertEqual(performance['wall_time_s'], 1.5)
+		self.assertEqual(performance['ion_count'], 10)
+		self.assertEqual(performance['cluster_index_count'], 2)
+		self.assertNotIn('item_counts', performance)
+
+	def test_bytes_written_by_innermost_group(self) -> None:
+		import timspeak.performance_utilities.stage_performance
+		bytes_written = timspeak.performance_utilities.stage_performance.get_bytes_written(
+			{
+				'clustering/raw_pointers/indptr': 8,
+				'clustering/rt_projection/xics': 16,
+				'smoothing/smooth_intensity_values': 32,
+				'acquisition/cycle': 64,
+			},
+			{
+				'smoothing': ('smoothing',),
+				'clustering': ('clustering',),
+				'clustering_rt_projections': ('clustering/rt_projection',),
+			}
+		)
+		self.assertEqual(
+			bytes_written,
+			{'smoothing': 32, 'clustering': 8, 'clustering_rt_projections': 16}
+		)
+
+	def test_bytes_written_by_dataset_owners(self):
+		import timspeak.execution_pipeline.main_pipeline
+		import timspeak.performance_utilities.stage_performance
+		MainPipeline = timspeak.execution_pipeline.main_pipeline.MainPipeline
+		stages = MainPipeline.__new__(MainPipeline).get_stages()
+		bytes_written = timspeak.performance_utilities.stage_performance.get_bytes_written(
+			{
+				'ms1/isotopes/charge_2/metrics/ks_distance_im': 8,
+				'ms1/isotopes/charge_2/metrics/ks_distance_rt': 8,
+				'ms1/isotopes/charge_2/metrics/ks_distance_im_rt': 16,
+				'ms1/isotopes/charge_2/lower_isotope_pointers': 32,
+			},
+			{stage.name: stage.groups for stage in stages}
+		)
+		self.assertEqual(bytes_written['metrics_for_1d_projections'], 16)
+		self.assertEqual(bytes_written['ks_testing'], 16)
+		self.assertEqual(bytes_written['deisotoping_charge_2'], 32)
+
+	def test_bytes_written_with_duplicate_owners(self):
+		import timspeak.performance_utilities.stage_performance
+		with self.assertRaises(ValueError):
+			timspeak.performance_utilities.stage_performance.get_bytes_written(
+				{},
+				{'metrics': ('ms1/metrics',), 'ks_testing': ('ms1/metrics',)}
+			)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,69 @@
+"""This module provides unit tests for the timspeak tracer"""
+
+import unittest
+
+
+def add_timspeak_path() -> None:
+	import os
+	import sys
+	sys.path.append(os.path.dirname(os.getcwd()))
+
+
+add_timspeak_path()
+
+
+class TestTracing(unittest.TestCase):
+
+	def test_spans_are_saved(self) -> None:
+		import os
+		import json
+		import tempfile
+		import timspeak.performance_utilities.tracing
+		timspeak.performance_utilities.tracing.start_tracing()
+		with timspeak.performance_utilities.tracing.span('outer', 'stage', size=3):
+			with timspeak.performance_utilities.tracing.span('inner', 'output'):
+				pass
+		with tempfile.TemporaryDirectory() as directory:
+			file_name = os.path.join(directory, 'trace.json')
+			timspeak.performance_utilities.tracing.stop_tracing(file_name)
+			with open(file_name) as trace_file:
+				trace_events = json.load(trace_file)['traceEvents']
+		self.assertEqual([event['name'] for event in trace_events], ['inner', 'outer'])
+		inner, outer = trace_events
+		self.assertEqual(outer['args'], {'size': 3})
+		self.assertLessEqual(outer['ts'], inner['ts'])
+		self.assertGreaterEqual(outer['ts'] + outer['dur'], inner['ts'] + inner['dur'])
+
+	def test_no_spans_without_tracing(self) -> None:
+		import timspeak.performance_utilities.tracing
+		with timspeak.performance_utilities.tracing.span('ignored', 'stage'):
+			pass
+		self.assertEqual(timspeak.performance_utilities.tracing.stop_tracing(), [])
+
+	def test_parallel_worker_spans(self) -> None:
+		import numba
+		import numpy as np
+		import timspeak.performance_utilities.tracing
+		import timspeak.performance_utilities.multiprocessing
+
+		@timspeak.performance_utilities.multiprocessing.parallel(thread_count=2, include_progress_callback=False)
+		@numba.njit(nogil=True)
+		def double(index, values):
+			values[index] *= 2
+
+		values = np.ones(10)
+		timspeak.performance_utilities.tracing.start_tracing()
+		double(range(10), values)
+		trace_events = timspeak.performance_utilities.tracing.stop_tracing()
+		self.assertTrue(np.all(values == 2))
+		parallel_spans = [event for event in trace_events if event.get('cat') == 'parallel']
+		self.assertEqual(len(parallel_spans), 1)
+		self.assertEqual(parallel_spans[0]['args']['work_items'], 10)
+		worker_spans = [event for event in trace_events if event.get('cat') == 'worker']
+		# the number of threads is limited to the number of CPUs
+		self.assertEqual(len(worker_spans), parallel_spans[0]['args']['threads'])
+		self.assertEqual(sum(event['args']['work_items'] for event in worker_spans), 10)
+
+
+if __name__ == "__main__":
+	unittest.main()
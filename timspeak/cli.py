@@ -35,10 +35,12 @@ def gui():
 @click.argument("configfile", type=click.Path(exists=True, file_okay=True, dir_okay=False), default=None, required=True)
 @click.argument("samplefile", type=click.Path(exists=True, file_okay=False, dir_okay=True), default=None, required=False)
 @click.argument("outputfile", type=click.Path(exists=False, file_okay=True, dir_okay=False), default=None, required=False)
+@click.option("--resume", is_flag=True, default=False, help="Resume from the stages already completed in the output file.")
 def run_pipeline(
     configfile: str,
     samplefile: str = None,
     outputfile: str = None,
+    resume: bool = False,
 ):
     import os
     configfile = os.path.abspath(configfile)
@@ -47,8 +49,220 @@ def run_pipeline(
     if outputfile is not None:
         outputfile = os.path.abspath(outputfile)
     import timspeak.main
-    timspeak.main.main(configfile, samplefile, outputfile)
+    timspeak.main.main(configfile, samplefile, outputfile, resume)
 
 
+@run.command("run_batch", help="Run timspeak execution_pipeline for multiple samples in one process.", no_args_is_help=True)
+@click.argument("configfile", type=click.Path(exists=True, file_okay=True, dir_okay=False), default=None, required=True)
+@click.argument("samplefiles", type=str, nargs=-1, required=True)
+@click.option("--output-directory", "-o", type=click.Path(exists=False, file_okay=False, dir_okay=True), default=None, help="Directory for the output files, which are named after the samples.")
+@click.option("--concurrent-samples", "-n", type=int, default=1, show_default=True, help="Number of samples processed at the same time, sharing number_of_threads.")
+@click.option("--resume", is_flag=True, default=False, help="Resume every sample from the stages already completed in its output file.")
+@click.option("--processes", is_flag=True, default=False, help="Process every sample in a worker process instead of a thread.")
+def run_batch(
+    configfile: str,
+    samplefiles: tuple,
+    output_directory: str = None,
+    concurrent_samples: int = 1,
+    resume: bool = False,
+    processes: bool = False,
+):
+    import os
+    configfile = os.path.abspath(configfile)
+    if output_directory is not None:
+        output_directory = os.path.abspath(output_directory)
+    import timspeak.main
+    timspeak.main.batch(configfile, list(samplefiles), output_directory, concurrent_samples, resume, processes)
+
+
+@run.command("run_sweep", help="Run timspeak execution_pipeline for every point of a parameter grid.", no_args_is_help=True)
+@click.argument("configfile", type=click.Path(exists=True, file_okay=True, dir_okay=False), default=None, required=True)
+@click.argument("gridfile", type=click.Path(exists=True, file_okay=True, dir_okay=False), default=None, required=True)
+@click.argument("samplefile", type=click.Path(exists=True, file_okay=False, dir_okay=True), default=None, required=False)
+@click.option("--output-directory", "-o", type=click.Path(exists=False, file_okay=False, dir_okay=True), default=None, help="Directory for the output and configuration file of every grid point.")
+def run_sweep(
+    configfile: str,
+    gridfile: str,
+    samplefile: str = None,
+    output_directory: str = None,
+):
+    import os
+    configfile = os.path.abspath(configfile)
+    gridfile = os.path.abspath(gridfile)
+    if samplefile is not None:
+        samplefile = os.path.abspath(samplefile)
+    if output_directory is not None:
+        output_directory = os.path.abspath(output_directory)
+    import timspeak.main
+    timspeak.main.sweep(configfile, gridfile, samplefile, output_directory)
+
+
+
+@run.command("run_shard", help="Smooth and cluster a single shard of a sample, e.g. on another host.", no_args_is_help=True)
+@click.argument("configfile", type=click.Path(exists=True, file_okay=True, dir_okay=False), default=None, required=True)
+@click.argument("shardindex", type=int, required=True)
+@click.argument("samplefile", type=click.Path(exists=True, file_okay=False, dir_okay=True), default=None, required=False)
+@click.argument("outputfile", type=click.Path(exists=False, file_okay=True, dir_okay=False), default=None, required=False)
+def run_shard(
+    configfile: str,
+    shardindex: int,
+    samplefile: str = None,
+    outputfile: str = None,
+):
+    import os
+    configfile = os.path.abspath(configfile)
+    if samplefile is not None:
+        samplefile = os.path.abspath(samplefile)
+    if outputfile is not None:
+        outputfile = os.path.abspath(outputfile)
+    import timspeak.main
+    timspeak.main.shard(configfile, shardindex, samplefile, outputfile)
+
+
+@run.command("run_stream", help="Smooth and cluster a sample while it is acquired, from a directory of frame chunks.", no_args_is_help=True)
+@click.argument("configfile", type=click.Path(exists=True, file_okay=True, dir_okay=False), default=None, required=True)
+@click.argument("streamdirectory", type=click.Path(exists=False, file_okay=False, dir_okay=True), default=None, required=True)
+@click.argument("outputfile", type=click.Path(exists=False, file_okay=True, dir_okay=False), default=None, required=False)
+@click.option("--poll-interval", type=float, default=1.0, show_default=True, help="Seconds to wait before looking for new frame chunks again.")
+@click.option("--timeout", type=float, default=None, help="Seconds without new frame chunks after which the stream fails. By default the stream waits indefinitely.")
+def run_stream(
+    configfile: str,
+    streamdirectory: str,
+    outputfile: str = None,
+    poll_interval: float = 1.0,
+    timeout: float = None,
+):
+    import os
+    configfile = os.path.abspath(configfile)
+    streamdirectory = os.path.abspath(streamdirectory)
+    if outputfile is not None:
+        outputfile = os.path.abspath(outputfile)
+    import timspeak.main
+    timspeak.main.stream(configfile, streamdirectory, outputfile, poll_interval, timeout)
+
+
+@run.command("estimate", help="Estimate the time and memory of a run from a sample of its scans.", no_args_is_help=True)
+@click.argument("configfile", type=click.Path(exists=True, file_okay=True, dir_okay=False), default=None, required=True)
+@click.argument("samplefile", type=click.Path(exists=True, file_okay=False, dir_okay=True), default=None, required=False)
+@click.option("--threads", "-t", type=int, default=None, help="Number of threads of the run. By default number_of_threads of the configuration file.")
+@click.option("--sample-fraction", type=float, default=0.01, show_default=True, help="Fraction of frames whose scans are sampled.")
+@click.option("--reference", "-r", type=click.Path(exists=True, file_okay=True, dir_okay=False), default=None, help="Performance report of an earlier run, to scale the other stages and the memory from.")
+@click.option("--output-file", "-o", type=click.Path(exists=False, file_okay=True, dir_okay=False), default="timspeak_estimate.json", show_default=True, help="JSON file for the estimate.")
+def estimate(
+    configfile: str,
+    samplefile: str = None,
+    threads: int = None,
+    sample_fraction: float = 0.01,
+    reference: str = None,
+    output_file: str = "timspeak_estimate.json",
+):
+    import os
+    configfile = os.path.abspath(configfile)
+    if samplefile is not None:
+        samplefile = os.path.abspath(samplefile)
+    import timspeak.main
+    timspeak.main.estimate(configfile, samplefile, threads, sample_fraction, reference, output_file)
+
+
+@run.command("benchmark", help="Time the kernels of all stages on generated acquisitions and compare them with a baseline.")
+@click.argument("configfile", type=click.Path(exists=True, file_okay=True, dir_okay=False), default=None, required=False)
+@click.option("--size", "-s", "sizes", type=click.Choice(["small", "medium", "large"]), multiple=True, help="Size of the generated acquisition, can be given several times. By default small and medium.")
+@click.option("--repeats", "-r", type=int, default=3, show_default=True, help="Number of times every kernel is timed, of which the fastest counts.")
+@click.option("--output-file", "-o", type=click.Path(exists=False, file_okay=True, dir_okay=False), default="timspeak_benchmark.json", show_default=True, help="JSON file for the results.")
+@click.option("--baseline", "-b", type=click.Path(exists=False, file_okay=True, dir_okay=False), default=None, help="JSON file with earlier results. The benchmark fails if a kernel is slower than in it.")
+@click.option("--save-baseline", is_flag=True, default=False, help="Save the results as the baseline instead of comparing with it.")
+@click.option("--tolerance", type=float, default=0.25, show_default=True, help="Fraction by which a kernel may be slower than in the baseline.")
+@click.option("--threads", "-t", "thread_counts", type=int, multiple=True, help="Also time every kernel at this number of threads, can be given several times, to measure speedup, efficiency and load imbalance.")
+@click.option("--imbalance-threshold", type=float, default=0.2, show_default=True, help="Load imbalance above which a kernel is flagged.")
+@click.option("--backend", "backends", type=click.Choice(["threads", "numba"]), multiple=True, help="Also time every kernel with this parallel backend, can be given several times, to find the fastest backend of every kernel.")
+def benchmark(
+    configfile: str = None,
+    sizes: tuple = (),
+    repeats: int = 3,
+    output_file: str = "timspeak_benchmark.json",
+    baseline: str = None,
+    save_baseline: bool = False,
+    tolerance: float = 0.25,
+    thread_counts: tuple = (),
+    imbalance_threshold: float = 0.2,
+    backends: tuple = (),
+):
+    import os
+    if configfile is not None:
+        configfile = os.path.abspath(configfile)
+    if save_baseline and baseline is None:
+        raise click.UsageError("--save-baseline needs --baseline.")
+    import timspeak.main
+    try:
+        timspeak.main.benchmark(
+            configfile,
+            list(sizes),
+            repeats,
+            output_file,
+            baseline,
+            save_baseline,
+            tolerance,
+            list(thread_counts),
+            imbalance_threshold,
+            list(backends),
+        )
+    except RuntimeError as error:
+        raise click.ClickException(str(error))
+
+
+@run.command("benchmark_startup", help="Time the imports, the compilation and the first calls of all kernels in new processes, with cold and warm caches.")
+@click.argument("configfile", type=click.Path(exists=True, file_okay=True, dir_okay=False), default=None, required=False)
+@click.option("--output-file", "-o", type=click.Path(exists=False, file_okay=True, dir_okay=False), default="timspeak_startup.json", show_default=True, help="JSON file for the results.")
+@click.option("--cache-directory", type=click.Path(exists=False, file_okay=False, dir_okay=True), default=None, help="Directory of the bytecode cache, kept between invocations. By default a temporary directory.")
+@click.option("--run", "runs", type=click.Choice(["cold", "warm"]), multiple=True, help="Run with emptied (cold) or kept (warm) caches, can be given several times. By default cold, then warm.")
+def benchmark_startup(
+    configfile: str = None,
+    output_file: str = "timspeak_startup.json",
+    cache_directory: str = None,
+    runs: tuple = (),
+):
+    import os
+    if configfile is not None:
+        configfile = os.path.abspath(configfile)
+    if cache_directory is not None:
+        cache_directory = os.path.abspath(cache_directory)
+    import timspeak.main
+    timspeak.main.benchmark_startup(configfile, output_file, cache_directory, list(runs))
+
+
+@run.command("benchmark_io", help="Write and read back the arrays of a run on a generated acquisition with every output format.")
+@click.argument("configfile", type=click.Path(exists=True, file_okay=True, dir_okay=False), default=None, required=False)
+@click.option("--size", "-s", type=click.Choice(["small", "medium", "large"]), default="medium", show_default=True, help="Size of the generated acquisition.")
+@click.option("--format", "-f", "output_formats", type=click.Choice(["hdf", "zarr"]), multiple=True, help="Output format, can be given several times. By default all.")
+@click.option("--setting", "settings", type=click.Choice(["contiguous", "appended"]), multiple=True, help="Write every array at once (contiguous) or append the smoothed intensities and clusters in chunks as the stream pipeline does (appended), can be given several times. By default all.")
+@click.option("--repeats", "-r", type=int, default=3, show_default=True, help="Number of output files written with every format and setting.")
+@click.option("--output-file", "-o", type=click.Path(exists=False, file_okay=True, dir_okay=False), default="timspeak_io_benchmark.json", show_default=True, help="JSON file for the results.")
+@click.option("--directory", "-d", type=click.Path(exists=True, file_okay=False, dir_okay=True), default=None, help="Directory on the disk to measure. By default the temporary directory of the system.")
+@click.option("--no-evict", is_flag=True, default=False, help="Read the output files from the page cache instead of evicting them first.")
+def benchmark_io(
+    configfile: str = None,
+    size: str = "medium",
+    output_formats: tuple = (),
+    settings: tuple = (),
+    repeats: int = 3,
+    output_file: str = "timspeak_io_benchmark.json",
+    directory: str = None,
+    no_evict: bool = False,
+):
+    import os
+    if configfile is not None:
+        configfile = os.path.abspath(configfile)
+    import timspeak.main
+    timspeak.main.benchmark_io(
+        configfile,
+        size,
+        list(output_formats),
+        list(settings),
+        repeats,
+        output_file,
+        directory,
+        not no_evict,
+    )
+
 if __name__ == "__main__":
     run()
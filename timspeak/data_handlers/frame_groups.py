@@ -0,0 +1,89 @@
+# builtin
+import dataclasses
+
+# external
+import numpy as np
+import alphatims.dia_data
+
+
+@dataclasses.dataclass(kw_only=True, frozen=True)
+class FrameGroupDiaData:
+    """
+    The frames of a single DIA frame group of a DiaData object, as an
+    acquisition with a cycle of one frame and an empty zeroth frame in front.
+    Smoothing and clustering only combine frames of the same frame group,
+    so a frame group can be processed on its own without a halo.
+
+    Parameters:
+    - dia_data: alphatims.dia_data.DiaData
+        The full acquisition.
+    - frame_group: int
+        The frame group.
+    """
+
+    cycle: np.ndarray
+    im_values: np.ndarray
+    rt_values: np.ndarray
+    mz_values: np.ndarray
+    tof_indptr: np.ndarray
+    tof_indices: np.ndarray
+    intensity_values: np.ndarray
+    frame_group: int
+    cycle_length: int
+    ion_indices: np.ndarray
+
+    def __init__(
+        self,
+        *,
+        dia_data: alphatims.dia_data.DiaData,
+        frame_group: int,
+    ):
+        scans_per_frame = len(dia_data.im_values)
+        cycle_length = dia_data.cycle.shape[1]
+        frames = np.arange(1 + frame_group, len(dia_data.rt_values), cycle_length)
+        scan_indices = (
+            frames[:, np.newaxis] * scans_per_frame + np.arange(scans_per_frame)
+        ).ravel()
+        scan_starts = dia_data.tof_indptr[scan_indices]
+        scan_sizes = dia_data.tof_indptr[scan_indices + 1] - scan_starts
+        tof_indptr = np.zeros(
+            (len(frames) + 1) * scans_per_frame + 1,
+            dtype=dia_data.tof_indptr.dtype
+        )
+        tof_indptr[scans_per_frame + 1:] = np.cumsum(scan_sizes)
+        ion_indices = np.repeat(
+            scan_starts - tof_indptr[scans_per_frame: -1],
+            scan_sizes
+        ) + np.arange(tof_indptr[-1])
+        object.__setattr__(self, "cycle", dia_data.cycle[:, frame_group: frame_group + 1])
+        object.__setattr__(self, "im_values", dia_data.im_values)
+        object.__setattr__(
+            self,
+            "rt_values",
+            np.concatenate([dia_data.rt_values[:1], dia_data.rt_values[frames]])
+        )
+        object.__setattr__(self, "mz_values", dia_data.mz_values)
+        object.__setattr__(self, "tof_indptr", tof_indptr)
+        object.__setattr__(self, "tof_indices", dia_data.tof_indices[ion_indices])
+        object.__setattr__(self, "intensity_values", dia_data.intensity_values[ion_indices])
+        object.__setattr__(self, "frame_group", frame_group)
+        object.__setattr__(self, "cycle_length", cycle_length)
+        object.__setattr__(self, "ion_indices", ion_indices)
+
+    def get_core_ions(self) -> slice:
+        return slice(None)
+
+    def get_global_ions(self, ion_indices: np.ndarray) -> np.ndarray:
+        return self.ion_indices[ion_indices]
+
+    def get_global_frames(self, frame_indices: np.ndarray) -> np.ndarray:
+        return 1 + self.frame_group + (frame_indices - 1) * self.cycle_length
+
+    def get_global_frame_groups(self, frame_groups: np.ndarray) -> np.ndarray:
+        return np.full_like(frame_groups, self.frame_group)
+
+    def get_values(self, values: np.ndarray) -> np.ndarray:
+        return values[self.ion_indices]
+
+    def set_core_values(self, values: np.ndarray, frame_group_values: np.ndarray) -> None:
+        values[self.ion_indices] = frame_group_values
@@ -0,0 +1,218 @@
+# builtin
+import os
+import time
+import dataclasses
+
+# external
+import numpy as np
+import alphatims.dia_data
+
+# local
+import timspeak.data_handlers.rt_windows
+
+
+METADATA_FILE_NAME = "acquisition.npz"
+DONE_FILE_NAME = "acquisition_done"
+
+
+def get_chunk_file_name(directory: str, chunk_index: int) -> str:
+    return os.path.join(directory, f"frames_{chunk_index:06}.npz")
+
+
+def save_npz(file_name: str, **arrays) -> None:
+    # readers only see complete files
+    temporary_file_name = f"{file_name}.tmp"
+    with open(temporary_file_name, "wb") as npz_file:
+        np.savez(npz_file, **arrays)
+    os.replace(temporary_file_name, file_name)
+
+
+def write_frame_chunks(
+    dia_data: alphatims.dia_data.DiaData,
+    directory: str,
+    frames_per_chunk: int = 100,
+    delay: float = 0.0,
+) -> int:
+    """
+    Replay a finished acquisition as a growing directory of frame chunks,
+    as a stand-in for an instrument that is still acquiring.
+
+    Parameters:
+    - dia_data: alphatims.dia_data.DiaData
+        The acquisition.
+    - directory: str
+        The directory in which the frame chunks are written.
+    - frames_per_chunk: int
+        (Default: 100)
+        The number of frames in every chunk.
+    - delay: float
+        (Default: 0.0)
+        The time (in seconds) to wait between chunks.
+
+    Returns:
+    - int: The number of chunks.
+    """
+    os.makedirs(directory, exist_ok=True)
+    save_npz(
+        os.path.join(directory, METADATA_FILE_NAME),
+        cycle=dia_data.cycle,
+        im_values=dia_data.im_values,
+        mz_values=dia_data.mz_values,
+        # empty arrays that only record the data types
+        tof_indices=dia_data.tof_indices[:0],
+        intensity_values=dia_data.intensity_values[:0],
+    )
+    scans_per_frame = len(dia_data.im_values)
+    frame_count = len(dia_data.rt_values)
+    chunk_count = 0
+    for first_frame in range(1, frame_count, frames_per_chunk):
+        last_frame = min(first_frame + frames_per_chunk, frame_count)
+        tof_indptr = dia_data.tof_indptr[first_frame * scans_per_frame: last_frame * scans_per_frame + 1]
+        save_npz(
+            get_chunk_file_name(directory, chunk_count),
+            rt_values=dia_data.rt_values[first_frame: last_frame],
+            scan_sizes=np.diff(tof_indptr),
+            tof_indices=dia_data.tof_indices[tof_indptr[0]: tof_indptr[-1]],
+            intensity_values=dia_data.intensity_values[tof_indptr[0]: tof_indptr[-1]],
+        )
+        chunk_count += 1
+        time.sleep(delay)
+    open(os.path.join(directory, DONE_FILE_NAME), "w").close()
+    return chunk_count
+
+
+class FrameChunkReader:
+    """
+    Read the frame chunks of a directory in order while they are written,
+    until the acquisition is marked as done.
+
+    Parameters:
+    - directory: str
+        The directory with the frame chunks.
+    - poll_interval: float
+        (Default: 1.0)
+        The time (in seconds) to wait before looking for a new chunk again.
+    - timeout: float
+        (Default: None)
+        The time (in seconds) without new chunks after which reading fails.
+        None means waiting indefinitely.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        poll_interval: float = 1.0,
+        timeout: float = None,
+    ) -> None:
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+    def wait_for_file(self, file_name: str) -> bool:
+        start_time = time.time()
+        while not os.path.exists(file_name):
+            if os.path.exists(os.path.join(self.directory, DONE_FILE_NAME)):
+                # a chunk can be written just before the acquisition is marked as done
+                return os.path.exists(file_name)
+            if (self.timeout is not None) and (time.time() - start_time > self.timeout):
+                raise TimeoutError(f"No new data in {self.directory} for {self.timeout} seconds.")
+            time.sleep(self.poll_interval)
+        return True
+
+    def read_metadata(self) -> dict:
+        file_name = os.path.join(self.directory, METADATA_FILE_NAME)
+        if not self.wait_for_file(file_name):
+            raise FileNotFoundError(f"{self.directory} has no {METADATA_FILE_NAME}.")
+        with np.load(file_name) as npz_file:
+            return {name: npz_file[name] for name in npz_file.files}
+
+    def __iter__(self):
+        chunk_index = 0
+        while self.wait_for_file(get_chunk_file_name(self.directory, chunk_index)):
+            with np.load(get_chunk_file_name(self.directory, chunk_index)) as npz_file:
+                yield {name: npz_file[name] for name in npz_file.files}
+            chunk_index += 1
+
+
+@dataclasses.dataclass(kw_only=True, frozen=True)
+class RingDiaData:
+    """
+    The frames in a FrameRing as an acquisition of its own, with an empty
+    zeroth frame in front.
+    """
+
+    cycle: np.ndarray
+    im_values: np.ndarray
+    rt_values: np.ndarray
+    mz_values: np.ndarray
+    tof_indptr: np.ndarray
+    tof_indices: np.ndarray
+    intensity_values: np.ndarray
+
+
+class FrameRing:
+    """
+    The most recent frames of a growing acquisition. Frames are appended as
+    they are acquired and dropped once no frame that is still to be processed
+    can have them as neighbour.
+
+    Parameters:
+    - metadata: dict
+        The cycle, im_values and mz_values of the acquisition, and empty
+        tof_indices and intensity_values with their data types.
+    """
+
+    def __init__(self, metadata: dict) -> None:
+        self.cycle = metadata["cycle"]
+        self.im_values = metadata["im_values"]
+        self.mz_values = metadata["mz_values"]
+        self.cycle_length = self.cycle.shape[1]
+        self.scans_per_frame = len(self.im_values)
+        self.first_frame = 1
+        self.first_ion = 0
+        self.rt_values = np.empty(0, dtype=np.float64)
+        self.scan_sizes = np.empty(0, dtype=np.int64)
+        self.tof_indices = metadata["tof_indices"]
+        self.intensity_values = metadata["intensity_values"]
+
+    def append(self, chunk: dict) -> None:
+        self.rt_values = np.concatenate([self.rt_values, chunk["rt_values"]])
+        self.scan_sizes = np.concatenate([self.scan_sizes, chunk["scan_sizes"]])
+        self.tof_indices = np.concatenate([self.tof_indices, chunk["tof_indices"]])
+        self.intensity_values = np.concatenate([self.intensity_values, chunk["intensity_values"]])
+
+    def get_frame(self, rt_value: float, side: str = "left") -> int:
+        """
+        Get the first frame (in frames of the full acquisition) with a
+        retention time after rt_value, aligned down to the start of a cycle.
+        """
+        frame = self.first_frame + np.searchsorted(self.rt_values, rt_value, side)
+        return timspeak.data_handlers.rt_windows.align_frame(frame, self.cycle_length, round_up=False)
+
+    def get_dia_data(self) -> RingDiaData:
+        tof_indptr = np.zeros(
+            (len(self.rt_values) + 1) * self.scans_per_frame + 1,
+            dtype=np.int64
+        )
+        tof_indptr[self.scans_per_frame + 1:] = np.cumsum(self.scan_sizes)
+        return RingDiaData(
+            cycle=self.cycle,
+            im_values=self.im_values,
+            rt_values=np.concatenate([[0.0], self.rt_values]),
+            mz_values=self.mz_values,
+            tof_indptr=tof_indptr,
+            tof_indices=self.tof_indices,
+            intensity_values=self.intensity_values,
+        )
+
+    def drop_frames_before(self, frame: int) -> None:
+        frame_count = frame - self.first_frame
+        if frame_count <= 0:
+            return
+        ion_count = np.sum(self.scan_sizes[:frame_count * self.scans_per_frame])
+        self.rt_values = self.rt_values[frame_count:]
+        self.scan_sizes = self.scan_sizes[frame_count * self.scans_per_frame:]
+        self.tof_indices = self.tof_indices[ion_count:]
+        self.intensity_values = self.intensity_values[ion_count:]
+        self.first_frame = frame
+        self.first_ion += ion_count
@@ -7,6 +7,7 @@ import numpy as np
 
 # local
 import timspeak.performance_utilities.compiling
+import timspeak.performance_utilities.memory
 
 
 @timspeak.performance_utilities.compiling.njit_class
@@ -147,7 +148,7 @@ class SparseIndex:
         new_indptr = np.zeros(len(indices) + 1, dtype=self.indptr.dtype)
         new_indptr[1:] = self.indptr[indices + 1] - self.indptr[indices]
         new_indptr = np.cumsum(new_indptr)
-        new_values = np.empty(new_indptr[-1], dtype=self.values.dtype)
+        new_values = timspeak.performance_utilities.memory.empty(new_indptr[-1], dtype=self.values.dtype)
         timspeak.performance_utilities.multiprocessing.parallel(
             self._set_new_values_after_filtering,
         )(
@@ -155,6 +156,7 @@ class SparseIndex:
             indices,
             new_indptr,
             new_values,
+            costs=np.diff(new_indptr),
         )
         return type(self)(indptr=new_indptr, values=new_values)
 
@@ -0,0 +1,444 @@
+# builtin
+import dataclasses
+
+# external
+import numpy as np
+import alphatims.dia_data
+
+# local
+import timspeak.data_handlers.indexing
+import timspeak.peak_picker_algorithms.cluster.clusters_stats
+
+
+CLUSTER_STATS_NAMES = (
+    "rt_values",
+    "im_values",
+    "mz_values",
+    "intensity_values",
+    "apex_indices",
+    "frame_groups",
+    "rt_lower_boundaries",
+    "rt_upper_boundaries",
+    "im_lower_boundaries",
+    "im_upper_boundaries",
+    "sizes",
+)
+
+
+@dataclasses.dataclass(kw_only=True, frozen=True)
+class RtWindow:
+    """
+    A range of frames that is processed on its own. Frames are aligned to
+    the start of a cycle, so frame groups are the same as in the full
+    acquisition.
+
+    Parameters:
+    - first_frame: int
+        The first frame of the window, including the halo.
+    - last_frame: int
+        The frame after the window, including the halo.
+    - core_first_frame: int
+        The first frame owned by the window.
+    - core_last_frame: int
+        The frame after the frames owned by the window.
+    """
+
+    first_frame: int
+    last_frame: int
+    core_first_frame: int
+    core_last_frame: int
+
+
+@dataclasses.dataclass(kw_only=True, frozen=True)
+class WindowDiaData:
+    """
+    The part of a DiaData object that falls in an RT window, with an empty
+    zeroth frame in front like the full acquisition. Apart from tof_indptr,
+    all arrays are views on the full acquisition.
+
+    Parameters:
+    - dia_data: alphatims.dia_data.DiaData
+        The full acquisition.
+    - window: RtWindow
+        The RT window.
+    """
+
+    cycle: np.ndarray
+    im_values: np.ndarray
+    rt_values: np.ndarray
+    mz_values: np.ndarray
+    tof_indptr: np.ndarray
+    tof_indices: np.ndarray
+    intensity_values: np.ndarray
+    frame_offset: int
+    ion_offset: int
+    core_first_ion: int
+    core_last_ion: int
+
+    def __init__(
+        self,
+        *,
+        dia_data: alphatims.dia_data.DiaData,
+        window: RtWindow,
+    ):
+        scans_per_frame = len(dia_data.im_values)
+        ion_offset = dia_data.tof_indptr[window.first_frame * scans_per_frame]
+        ion_end = dia_data.tof_indptr[window.last_frame * scans_per_frame]
+        tof_indptr = np.zeros(
+            (window.last_frame - window.first_frame + 1) * scans_per_frame + 1,
+            dtype=dia_data.tof_indptr.dtype
+        )
+        tof_indptr[scans_per_frame:] = dia_data.tof_indptr[
+            window.first_frame * scans_per_frame: window.last_frame * scans_per_frame + 1
+        ] - ion_offset
+        object.__setattr__(self, "cycle", dia_data.cycle)
+        object.__setattr__(self, "im_values", dia_data.im_values)
+        object.__setattr__(
+            self,
+            "rt_values",
+            np.concatenate(
+                [
+                    dia_data.rt_values[:1],
+                    dia_data.rt_values[window.first_frame: window.last_frame],
+                ]
+            )
+        )
+        object.__setattr__(self, "mz_values", dia_data.mz_values)
+        object.__setattr__(self, "tof_indptr", tof_indptr)
+        object.__setattr__(self, "tof_indices", dia_data.tof_indices[ion_offset: ion_end])
+        object.__setattr__(self, "intensity_values", dia_data.intensity_values[ion_offset: ion_end])
+        object.__setattr__(self, "frame_offset", window.first_frame - 1)
+        object.__setattr__(self, "ion_offset", ion_offset)
+        object.__setattr__(
+            self,
+            "core_first_ion",
+            dia_data.tof_indptr[window.core_first_frame * scans_per_frame] - ion_offset
+        )
+        object.__setattr__(
+            self,
+            "core_last_ion",
+            dia_data.tof_indptr[window.core_last_frame * scans_per_frame] - ion_offset
+        )
+
+    def get_core_ions(self) -> slice:
+        return slice(self.core_first_ion, self.core_last_ion)
+
+    def get_global_ions(self, ion_indices: np.ndarray) -> np.ndarray:
+        return ion_indices + self.ion_offset
+
+    def get_global_frames(self, frame_indices: np.ndarray) -> np.ndarray:
+        return frame_indices + self.frame_offset
+
+    def get_global_frame_groups(self, frame_groups: np.ndarray) -> np.ndarray:
+        return frame_groups
+
+    def get_values(self, values: np.ndarray) -> np.ndarray:
+        return values[self.ion_offset: self.ion_offset + len(self.intensity_values)]
+
+    def set_core_values(self, values: np.ndarray, window_values: np.ndarray) -> None:
+        values[
+            self.ion_offset + self.core_first_ion: self.ion_offset + self.core_last_ion
+        ] = window_values[self.core_first_ion: self.core_last_ion]
+
+
+def align_frame(frame: int, cycle_length: int, round_up: bool) -> int:
+    if round_up:
+        return 1 + -(-(frame - 1) // cycle_length) * cycle_length
+    return 1 + (frame - 1) // cycle_length * cycle_length
+
+
+def get_rt_windows(
+    dia_data: alphatims.dia_data.DiaData,
+    window_size: float,
+    halo: float,
+) -> list:
+    """
+    Split an acquisition into consecutive RT windows that each own the
+    frames of window_size seconds, with a halo of halo seconds on both sides.
+
+    Parameters:
+    - dia_data: alphatims.dia_data.DiaData
+        The acquisition.
+    - window_size: float
+        The RT range (in seconds) owned by a window.
+    - halo: float
+        The RT range (in seconds) added on both sides of a window.
+
+    Returns:
+    - list: The RtWindow objects.
+    """
+    if window_size <= 0:
+        raise ValueError(f"RT window size must be positive, not {window_size}.")
+    cycle_length = dia_data.cycle.shape[1]
+    rt_values = dia_data.rt_values
+    frame_count = len(rt_values)
+    windows = []
+    core_first_frame = 1
+    while core_first_frame < frame_count:
+        core_last_frame = np.searchsorted(rt_values, rt_values[core_first_frame] + window_size, "left")
+        core_last_frame = align_frame(core_last_frame, cycle_length, round_up=True)
+        core_last_frame = min(max(core_last_frame, core_first_frame + cycle_length), frame_count)
+        first_frame = np.searchsorted(rt_values, rt_values[core_first_frame] - halo, "left")
+        first_frame = max(align_frame(first_frame, cycle_length, round_up=False), 1)
+        last_frame = np.searchsorted(rt_values, rt_values[core_last_frame - 1] + halo, "right")
+        last_frame = min(align_frame(last_frame, cycle_length, round_up=True), frame_count)
+        windows.append(
+            RtWindow(
+                first_frame=int(first_frame),
+                last_frame=int(last_frame),
+                core_first_frame=int(core_first_frame),
+                core_last_frame=int(core_last_frame),
+            )
+        )
+        core_first_frame = core_last_frame
+    return windows
+
+
+def grow_rt_window(
+    dia_data: alphatims.dia_data.DiaData,
+    window: RtWindow,
+    halo: float,
+    lower: bool,
+    upper: bool,
+) -> RtWindow:
+    """
+    Widen the halo of an RT window by halo seconds, but at least a cycle, on
+    the requested sides. The frames owned by the window stay the same.
+
+    Parameters:
+    - dia_data: alphatims.dia_data.DiaData
+        The acquisition.
+    - window: RtWindow
+        The RT window.
+    - halo: float
+        The RT range (in seconds) added to the halo.
+    - lower: bool
+        Widen the halo before the frames owned by the window.
+    - upper: bool
+        Widen the halo after the frames owned by the window.
+
+    Returns:
+    - RtWindow: The widened RT window.
+    """
+    cycle_length = dia_data.cycle.shape[1]
+    rt_values = dia_data.rt_values
+    frame_count = len(rt_values)
+    first_frame = window.first_frame
+    last_frame = window.last_frame
+    if lower:
+        first_frame = np.searchsorted(rt_values, rt_values[first_frame] - halo, "left")
+        first_frame = align_frame(first_frame, cycle_length, round_up=False)
+        first_frame = max(min(first_frame, window.first_frame - cycle_length), 1)
+    if upper:
+        last_frame = np.searchsorted(rt_values, rt_values[last_frame - 1] + halo, "right")
+        last_frame = align_frame(last_frame, cycle_length, round_up=True)
+        last_frame = min(max(last_frame, window.last_frame + cycle_length), frame_count)
+    return dataclasses.replace(window, first_frame=int(first_frame), last_frame=int(last_frame))
+
+
+def get_core_clusters(
+    partition_dia_data: WindowDiaData,
+    cluster3d_stats: timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D,
+) -> np.ndarray:
+    is_core_ion = np.zeros(len(partition_dia_data.intensity_values), dtype=np.bool_)
+    is_core_ion[partition_dia_data.get_core_ions()] = True
+    return np.flatnonzero(is_core_ion[cluster3d_stats.apex_indices])
+
+
+def get_truncated_sides(
+    partition_dia_data: WindowDiaData,
+    cluster3d_stats: timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D,
+    rt_tolerances: tuple,
+) -> tuple:
+    """
+    Check whether a partition could cut off clusters with their apex in the
+    frames owned by the partition. A cluster is the same as in the full
+    acquisition if every frame from which its ions can be reached in
+    len(rt_tolerances) RT neighbour steps lies in the partition: two
+    clustering steps, as ions only join the cluster of their most intense
+    neighbour, and a smoothing step if the partition was smoothed on its own.
+    Frames just at the border count as cut off.
+
+    Parameters:
+    - partition_dia_data: WindowDiaData
+        The part of the acquisition that was clustered with a clustering
+        threshold of 1, so that also cut-off parts of clusters are checked.
+    - cluster3d_stats: timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D
+        The statistics of the clusters of the partition.
+    - rt_tolerances: tuple
+        The RT tolerance (in seconds) of every neighbour step.
+
+    Returns:
+    - tuple: Whether a cluster reaches the first (bool) and the last (bool) frame of the partition.
+    """
+    core_clusters = get_core_clusters(partition_dia_data, cluster3d_stats)
+    rt_values = partition_dia_data.rt_values
+    first_frames, last_frames = get_rt_reach(
+        rt_values,
+        cluster3d_stats.rt_lower_boundaries[core_clusters],
+        cluster3d_stats.rt_upper_boundaries[core_clusters],
+        rt_tolerances,
+    )
+    return bool(np.any(first_frames <= 1)), bool(np.any(last_frames >= len(rt_values) - 1))
+
+
+def get_required_halo(
+    partition_dia_data: WindowDiaData,
+    cluster3d_stats: timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D,
+    rt_tolerances: tuple,
+) -> float:
+    """
+    Estimate the halo that a partition needs to cut off no cluster with its
+    apex in the frames owned by the partition: twice the longest RT range
+    (in seconds) that can be reached from such a cluster, as clusters that
+    are cut off reach further than their part within the partition.
+
+    Parameters:
+    - partition_dia_data: WindowDiaData
+        The part of the acquisition that was clustered with a clustering
+        threshold of 1.
+    - cluster3d_stats: timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D
+        The statistics of the clusters of the partition.
+    - rt_tolerances: tuple
+        The RT tolerance (in seconds) of every neighbour step.
+
+    Returns:
+    - float: The estimated halo (in seconds).
+    """
+    core_clusters = get_core_clusters(partition_dia_data, cluster3d_stats)
+    if len(core_clusters) == 0:
+        return 0.0
+    rt_values = partition_dia_data.rt_values
+    first_frames, last_frames = get_rt_reach(
+        rt_values,
+        cluster3d_stats.rt_lower_boundaries[core_clusters],
+        cluster3d_stats.rt_upper_boundaries[core_clusters],
+        rt_tolerances,
+    )
+    return 2 * float(np.max(rt_values[last_frames] - rt_values[first_frames]))
+
+
+def get_rt_reach(
+    rt_values: np.ndarray,
+    first_frames: np.ndarray,
+    last_frames: np.ndarray,
+    rt_tolerances: tuple,
+) -> tuple:
+    """
+    Get the frames that can be reached from ranges of frames in RT neighbour
+    steps.
+
+    Parameters:
+    - rt_values: np.ndarray
+        The retention time of every frame, including the zeroth frame.
+    - first_frames: np.ndarray
+        The first frame of every range.
+    - last_frames: np.ndarray
+        The last frame (inclusive) of every range.
+    - rt_tolerances: tuple
+        The RT tolerance (in seconds) of every neighbour step.
+
+    Returns:
+    - tuple: The first (np.ndarray) and last (np.ndarray) frame that can be reached from every range.
+    """
+    first_frames = first_frames.astype(np.int64)
+    last_frames = last_frames.astype(np.int64)
+    for rt_tolerance in rt_tolerances:
+        first_frames = np.searchsorted(rt_values, rt_values[first_frames] - rt_tolerance, "left")
+        last_frames = np.searchsorted(rt_values, rt_values[last_frames] + rt_tolerance, "right") - 1
+    return first_frames, last_frames
+
+
+def select_core_clusters(
+    partition_dia_data: WindowDiaData,
+    index_3d: timspeak.data_handlers.indexing.SparseIndex,
+    cluster3d_stats: timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D,
+    min_size: int = 1,
+) -> dict:
+    """
+    Select the clusters of a partition whose apex lies in the frames owned by
+    the partition, and express them in indices of the full acquisition. Every
+    cluster is therefore only selected from a single partition, also if it
+    lies (partially) in the halo of others. This gives the clusters of the
+    full acquisition as long as the partition does not cut them off (see
+    get_truncated_sides).
+
+    Parameters:
+    - partition_dia_data: WindowDiaData
+        The part of the acquisition that was clustered, e.g. a WindowDiaData
+        or timspeak.data_handlers.frame_groups.FrameGroupDiaData.
+    - index_3d: timspeak.data_handlers.indexing.SparseIndex
+        The clusters of the partition.
+    - cluster3d_stats: timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D
+        The statistics of the clusters of the partition.
+    - min_size: int
+        (Default: 1)
+        The minimum number of ions of a selected cluster.
+
+    Returns:
+    - dict: The indptr, values and statistics of the selected clusters.
+    """
+    selected_clusters = get_core_clusters(partition_dia_data, cluster3d_stats)
+    selected_clusters = selected_clusters[cluster3d_stats.sizes[selected_clusters] >= min_size]
+    core_index = index_3d.filter(selected_clusters)
+    core_clusters = {
+        "indptr": core_index.indptr,
+        "values": partition_dia_data.get_global_ions(core_index.values),
+    }
+    for name in CLUSTER_STATS_NAMES:
+        core_clusters[name] = getattr(cluster3d_stats, name)[selected_clusters]
+    core_clusters["apex_indices"] = partition_dia_data.get_global_ions(core_clusters["apex_indices"])
+    for name in ("rt_lower_boundaries", "rt_upper_boundaries"):
+        core_clusters[name] = partition_dia_data.get_global_frames(core_clusters[name]).astype(
+            core_clusters[name].dtype
+        )
+    core_clusters["frame_groups"] = partition_dia_data.get_global_frame_groups(core_clusters["frame_groups"])
+    return core_clusters
+
+
+def stitch_clusters(
+    dia_data: alphatims.dia_data.DiaData,
+    smooth_intensity_values: np.ndarray,
+    window_clusters: list,
+) -> tuple:
+    """
+    Combine the selected clusters of all windows into a single cluster
+    table. Clusters are ordered by their first ion, like clusters of the
+    full acquisition.
+
+    Parameters:
+    - dia_data: alphatims.dia_data.DiaData
+        The full acquisition.
+    - smooth_intensity_values: np.ndarray
+        The smoothed intensities of the full acquisition.
+    - window_clusters: list
+        The selected clusters of every window or other partition (see
+        select_core_clusters).
+
+    Returns:
+    - tuple: The SparseIndex and Clusters3D of the full acquisition.
+    """
+    indptr = np.zeros(
+        sum(len(clusters["indptr"]) - 1 for clusters in window_clusters) + 1,
+        dtype=np.int64
+    )
+    indptr[1:] = np.cumsum(
+        np.concatenate([np.diff(clusters["indptr"]) for clusters in window_clusters])
+    )
+    values = np.concatenate([clusters["values"] for clusters in window_clusters])
+    order = np.argsort(values[indptr[:-1]], kind="stable")
+    index_3d = timspeak.data_handlers.indexing.SparseIndex(
+        indptr=indptr,
+        values=values,
+    ).filter(order)
+    cluster3d_stats = object.__new__(timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D)
+    object.__setattr__(cluster3d_stats, "dia_data", dia_data)
+    object.__setattr__(cluster3d_stats, "sparse_index", index_3d)
+    object.__setattr__(cluster3d_stats, "smooth_intensity_values", smooth_intensity_values)
+    for name in CLUSTER_STATS_NAMES:
+        object.__setattr__(
+            cluster3d_stats,
+            name,
+            np.concatenate([clusters[name] for clusters in window_clusters])[order]
+        )
+    return index_3d, cluster3d_stats
@@ -0,0 +1,412 @@
+# builtin
+import dataclasses
+
+# external
+import numpy as np
+import pandas as pd
+
+
+ISOTOPE_MASS_DIFFERENCE = 1.00286864
+
+
+@dataclasses.dataclass(kw_only=True, frozen=True)
+class SyntheticDiaData:
+    """
+    A generated acquisition with the arrays the execution pipeline uses
+    from an alphatims.dia_data.DiaData object, with an empty zeroth frame.
+    """
+
+    cycle: np.ndarray
+    im_values: np.ndarray
+    rt_values: np.ndarray
+    mz_values: np.ndarray
+    tof_indptr: np.ndarray
+    tof_indices: np.ndarray
+    intensity_values: np.ndarray
+
+
+@dataclasses.dataclass(kw_only=True, frozen=True)
+class SyntheticSample:
+    """
+    A generated acquisition with its ground truth.
+
+    Parameters:
+    - dia_data: SyntheticDiaData
+        The acquisition.
+    - precursors: pd.DataFrame
+        Every precursor, with its charge, monoisotopic m/z, apex RT (in
+        seconds) and IM, abundance and the frame group of its fragments.
+    - features: pd.DataFrame
+        Every isotope (frame group 0) and fragment (other frame groups) of
+        every precursor, with its m/z, apex RT and IM, and the summed
+        intensity and number of its ions in the acquisition.
+    """
+
+    dia_data: SyntheticDiaData
+    precursors: pd.DataFrame
+    features: pd.DataFrame
+
+
+def get_cycle(cycle_length: int, scan_count: int, mz_range: tuple) -> np.ndarray:
+    """
+    Get the quadrupole windows of a cycle of one MS1 frame (-1) followed by
+    MS2 frames that split mz_range in windows of equal width.
+    """
+    cycle = np.full((1, cycle_length, scan_count, 2), -1.0)
+    window_edges = np.linspace(mz_range[0], mz_range[1], cycle_length)
+    cycle[0, 1:, :, 0] = window_edges[:-1, np.newaxis]
+    cycle[0, 1:, :, 1] = window_edges[1:, np.newaxis]
+    return cycle
+
+
+def get_precursors(
+    rng: np.random.Generator,
+    precursor_count: int,
+    gradient_length: float,
+    im_values: np.ndarray,
+    cycle: np.ndarray,
+    mz_range: tuple,
+    charge_3_fraction: float,
+) -> pd.DataFrame:
+    mz_values = rng.uniform(mz_range[0], mz_range[1], size=precursor_count)
+    window_lower_mz_values = cycle[0, 1:, 0, 0]
+    return pd.DataFrame(
+        {
+            "charge": np.where(rng.random(precursor_count) < charge_3_fraction, 3, 2),
+            "mz_values": mz_values,
+            "rt_values": rng.uniform(0, gradient_length, size=precursor_count),
+            "im_values": rng.uniform(im_values[-1], im_values[0], size=precursor_count),
+            "abundances": rng.lognormal(8, 1, size=precursor_count),
+            "fragment_frame_groups": np.searchsorted(window_lower_mz_values, mz_values, "right"),
+        }
+    )
+
+
+def get_features(
+    rng: np.random.Generator,
+    precursors: pd.DataFrame,
+    isotope_count: int,
+    fragments_per_precursor: int,
+) -> pd.DataFrame:
+    precursor_count = len(precursors)
+    isotope_precursors = np.repeat(np.arange(precursor_count), isotope_count)
+    isotopes = np.tile(np.arange(isotope_count), precursor_count)
+    fragment_precursors = np.repeat(np.arange(precursor_count), fragments_per_precursor)
+    precursor_indices = np.concatenate([isotope_precursors, fragment_precursors])
+    return pd.DataFrame(
+        {
+            "precursor_indices": precursor_indices,
+            "isotopes": np.concatenate([isotopes, np.full(len(fragment_precursors), -1)]),
+            "frame_groups": np.concatenate(
+                [
+                    np.zeros(len(isotope_precursors), dtype=np.int64),
+                    precursors["fragment_frame_groups"].values[fragment_precursors],
+                ]
+            ),
+            "mz_values": np.concatenate(
+                [
+                    precursors["mz_values"].values[isotope_precursors]
+                    + isotopes * ISOTOPE_MASS_DIFFERENCE / precursors["charge"].values[isotope_precursors],
+                    rng.uniform(150, 1500, size=len(fragment_precursors)),
+                ]
+            ),
+            "rt_values": precursors["rt_values"].values[precursor_indices],
+            "im_values": precursors["im_values"].values[precursor_indices],
+            "abundances": np.concatenate(
+                [
+                    precursors["abundances"].values[isotope_precursors] * 0.6**isotopes,
+                    precursors["abundances"].values[fragment_precursors]
+                    * rng.uniform(0.1, 0.5, size=len(fragment_precursors)),
+                ]
+            ),
+        }
+    )
+
+
+def get_feature_ions(
+    features: pd.DataFrame,
+    frame_count: int,
+    scan_count: int,
+    cycle_length: int,
+    frame_time: float,
+    im_values: np.ndarray,
+    rt_sigma: float,
+    im_sigma: float,
+) -> tuple:
+    """
+    Get the ions of all features, shaped as a Gaussian in RT and IM in the
+    frames of their frame group.
+
+    Returns:
+    - tuple: The feature, scan index, m/z value and intensity of every ion.
+    """
+    cycle_count = (frame_count - 1) // cycle_length
+    im_step = abs(im_values[0] - im_values[1])
+    apex_cycles = features["rt_values"].values / (frame_time * cycle_length)
+    apex_scans = (im_values[0] - features["im_values"].values) / im_step
+    rt_sigma_cycles = rt_sigma / (frame_time * cycle_length)
+    im_sigma_scans = im_sigma / im_step
+    rt_offsets = np.arange(-int(3 * rt_sigma_cycles) - 1, int(3 * rt_sigma_cycles) + 2)
+    im_offsets = np.arange(-int(3 * im_sigma_scans) - 1, int(3 * im_sigma_scans) + 2)
+    feature, rt_offset, im_offset = np.meshgrid(
+        np.arange(len(features)),
+        rt_offsets,
+        im_offsets,
+        indexing="ij",
+    )
+    cycles = np.round(apex_cycles[feature]).astype(np.int64) + rt_offset
+    scans = np.round(apex_scans[feature]).astype(np.int64) + im_offset
+    intensities = features["abundances"].values[feature] * np.exp(
+        -0.5 * ((cycles - apex_cycles[feature]) / rt_sigma_cycles)**2
+        - 0.5 * ((scans - apex_scans[feature]) / im_sigma_scans)**2
+    )
+    selection = (
+        (cycles >= 0) & (cycles < cycle_count)
+        & (scans >= 0) & (scans < scan_count)
+        & (intensities >= 1)
+    )
+    feature = feature[selection]
+    frames = 1 + cycles[selection] * cycle_length + features["frame_groups"].values[feature]
+    scan_indices = frames * scan_count + scans[selection]
+    return feature, scan_indices, features["mz_values"].values[feature], intensities[selection]
+
+
+def get_noise_ions(
+    rng: np.random.Generator,
+    frame_count: int,
+    scan_count: int,
+    noise_ions_per_scan: float,
+) -> tuple:
+    """
+    Get randomly placed low intensity ions in all frames but the zeroth.
+
+    Returns:
+    - tuple: The scan indices, m/z values and intensities of the ions.
+    """
+    ion_counts = rng.poisson(noise_ions_per_scan, size=(frame_count - 1) * scan_count)
+    scan_indices = np.repeat(np.arange(scan_count, frame_count * scan_count), ion_counts)
+    mz_values = rng.uniform(100, 1700, size=len(scan_indices))
+    intensities = rng.uniform(5, 50, size=len(scan_indices))
+    return scan_indices, mz_values, intensities
+
+
+def generate_sample(
+    gradient_length: float = 40.0,
+    frame_time: float = 0.1,
+    cycle_length: int = 4,
+    scan_count: int = 450,
+    precursors_per_second: float = 50.0,
+    charge_3_fraction: float = 0.4,
+    isotope_count: int = 3,
+    fragments_per_precursor: int = 4,
+    noise_ions_per_scan: float = 5.0,
+    rt_sigma: float = 1.0,
+    im_sigma: float = 0.008,
+    seed: int = 0,
+) -> SyntheticSample:
+    """
+    Generate an acquisition of precursor isotope envelopes and their
+    fragments on top of random noise, with the ground truth of every
+    precursor and feature, e.g. for benchmarks and tests without instrument
+    data.
+
+    Parameters:
+    - gradient_length: float
+        (Default: 40.0)
+        The length (in seconds) of the acquisition.
+    - frame_time: float
+        (Default: 0.1)
+        The time (in seconds) between two frames.
+    - cycle_length: int
+        (Default: 4)
+        The number of frames per cycle: an MS1 frame followed by MS2 frames
+        with equally wide precursor windows.
+    - scan_count: int
+        (Default: 450)
+        The number of scans per frame, from IM 1.5 down to 0.6.
+    - precursors_per_second: float
+        (Default: 50.0)
+        The number of precursors per second of gradient.
+    - charge_3_fraction: float
+        (Default: 0.4)
+        The fraction of precursors with charge 3 instead of 2.
+    - isotope_count: int
+        (Default: 3)
+        The number of isotopes of every precursor.
+    - fragments_per_precursor: int
+        (Default: 4)
+        The number of fragments of every precursor.
+    - noise_ions_per_scan: float
+        (Default: 5.0)
+        The average number of noise ions per scan.
+    - rt_sigma: float
+        (Default: 1.0)
+        The RT width (in seconds) of every feature.
+    - im_sigma: float
+        (Default: 0.008)
+        The IM width of every feature.
+    - seed: int
+        (Default: 0)
+        The seed of the random number generator.
+
+    Returns:
+    - SyntheticSample: The acquisition and its ground truth.
+    """
+    rng = np.random.default_rng(seed)
+    mz_range = (300.0, 1200.0)
+    frame_count = int(round(gradient_length / frame_time)) + 1
+    im_values = np.linspace(1.5, 0.6, scan_count)
+    mz_values = np.linspace(100, 1700, 400000)
+    cycle = get_cycle(cycle_length, scan_count, mz_range)
+    precursors = get_precursors(
+        rng,
+        int(round(precursors_per_second * gradient_length)),
+        gradient_length,
+        im_values,
+        cycle,
+        mz_range,
+        charge_3_fraction,
+    )
+    features = get_features(rng, precursors, isotope_count, fragments_per_precursor)
+    ion_features, *feature_ions = get_feature_ions(
+        features,
+        frame_count,
+        scan_count,
+        cycle_length,
+        frame_time,
+        im_values,
+        rt_sigma,
+        im_sigma,
+    )
+    features["summed_intensity_values"] = np.bincount(
+        ion_features,
+        weights=feature_ions[2],
+        minlength=len(features)
+    )
+    features["ion_counts"] = np.bincount(ion_features, minlength=len(features))
+    noise_ions = get_noise_ions(rng, frame_count, scan_count, noise_ions_per_scan)
+    scan_indices, ion_mz_values, intensities = (
+        np.concatenate(values) for values in zip(feature_ions, noise_ions)
+    )
+    tof_indices = np.minimum(
+        np.searchsorted(mz_values, ion_mz_values),
+        len(mz_values) - 1
+    )
+    # ions with the same tof index in the same scan are detected as one
+    ion_keys, ion_pointers = np.unique(
+        scan_indices * len(mz_values) + tof_indices,
+        return_inverse=True
+    )
+    scan_sizes = np.bincount(ion_keys // len(mz_values), minlength=frame_count * scan_count)
+    dia_data = SyntheticDiaData(
+        cycle=cycle,
+        im_values=im_values,
+        rt_values=np.arange(frame_count) * frame_time,
+        mz_values=mz_values,
+        tof_indptr=np.concatenate([[0], np.cumsum(scan_sizes)]).astype(np.int64),
+        tof_indices=(ion_keys % len(mz_values)).astype(np.uint32),
+        intensity_values=np.bincount(ion_pointers, weights=intensities).astype(np.float32),
+    )
+    return SyntheticSample(dia_data=dia_data, precursors=precursors, features=features)
+
+
+def match_features(
+    features: pd.DataFrame,
+    cluster3d_stats,
+    ppm_tolerance: float = 20.0,
+    rt_tolerance: float = 1.5,
+    im_tolerance: float = 0.02,
+) -> np.ndarray:
+    """
+    Find the most intense cluster of every feature, in the same frame group
+    and within the tolerances of its m/z, apex RT and apex IM.
+
+    Parameters:
+    - features: pd.DataFrame
+        The features of a SyntheticSample.
+    - cluster3d_stats: timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D
+        The clusters found in its acquisition.
+    - ppm_tolerance: float
+        (Default: 20.0)
+        The m/z tolerance (in ppm).
+    - rt_tolerance: float
+        (Default: 1.5)
+        The RT tolerance (in seconds).
+    - im_tolerance: float
+        (Default: 0.02)
+        The IM tolerance.
+
+    Returns:
+    - np.ndarray: The cluster of every feature, -1 if none matches.
+    """
+    order = np.argsort(cluster3d_stats.mz_values)
+    cluster_mz_values = cluster3d_stats.mz_values[order]
+    feature_mz_values = features["mz_values"].values
+    lower_bounds = np.searchsorted(cluster_mz_values, feature_mz_values * (1 - ppm_tolerance / 10**6))
+    upper_bounds = np.searchsorted(cluster_mz_values, feature_mz_values * (1 + ppm_tolerance / 10**6), "right")
+    clusters = np.full(len(features), -1, dtype=np.int64)
+    for feature_index in np.flatnonzero(upper_bounds > lower_bounds):
+        candidates = order[lower_bounds[feature_index]:upper_bounds[feature_index]]
+        candidates = candidates[
+            (cluster3d_stats.frame_groups[candidates] == features["frame_groups"].values[feature_index])
+            & (np.abs(cluster3d_stats.rt_values[candidates] - features["rt_values"].values[feature_index]) <= rt_tolerance)
+            & (np.abs(cluster3d_stats.im_values[candidates] - features["im_values"].values[feature_index]) <= im_tolerance)
+        ]
+        if len(candidates) > 0:
+            clusters[feature_index] = candidates[np.argmax(cluster3d_stats.intensity_values[candidates])]
+    return clusters
+
+
+def get_isotope_pair_recall(
+    features: pd.DataFrame,
+    feature_clusters: np.ndarray,
+    precursors: pd.DataFrame,
+    charge: int,
+    precursor_indices: np.ndarray,
+    isotopic_pairs: np.ndarray,
+) -> float:
+    """
+    Get the fraction of consecutive isotopes of the precursors of a charge
+    that the deisotoper paired.
+
+    Parameters:
+    - features: pd.DataFrame
+        The features of a SyntheticSample.
+    - feature_clusters: np.ndarray
+        The cluster of every feature (see match_features).
+    - precursors: pd.DataFrame
+        The precursors of a SyntheticSample.
+    - charge: int
+        The charge of the deisotoper.
+    - precursor_indices: np.ndarray
+        The cluster of every precursor cluster.
+    - isotopic_pairs: np.ndarray
+        The upper isotope of every precursor cluster, -1 if none, as found by
+        the deisotoper.
+
+    Returns:
+    - float: The recall, NaN if there are no such isotope pairs.
+    """
+    isotopes = features[features["isotopes"] >= 0]
+    isotopes = isotopes[precursors["charge"].values[isotopes["precursor_indices"].values] == charge]
+    isotopes = isotopes.assign(feature_indices=isotopes.index.values)
+    lower_isotopes = isotopes.set_index(["precursor_indices", "isotopes"])
+    upper_isotopes = isotopes.assign(isotopes=isotopes["isotopes"] - 1).set_index(["precursor_indices", "isotopes"])
+    isotope_pairs = lower_isotopes.index.intersection(upper_isotopes.index)
+    if len(isotope_pairs) == 0:
+        return np.nan
+    lower_clusters = feature_clusters[lower_isotopes.loc[isotope_pairs, "feature_indices"].values]
+    upper_clusters = feature_clusters[upper_isotopes.loc[isotope_pairs, "feature_indices"].values]
+    paired_lower_isotopes = np.flatnonzero(isotopic_pairs != -1)
+    found_pairs = set(
+        zip(
+            precursor_indices[paired_lower_isotopes],
+            precursor_indices[isotopic_pairs[paired_lower_isotopes]]
+        )
+    )
+    return np.mean(
+        [
+            (lower_cluster, upper_cluster) in found_pairs
+            for lower_cluster, upper_cluster in zip(lower_clusters, upper_clusters)
+        ]
+    )
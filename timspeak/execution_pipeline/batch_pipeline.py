@@ -0,0 +1,201 @@
+import os
+import glob
+import contextlib
+import concurrent.futures
+import timspeak.io_interface.logger
+import timspeak.io_interface.input.read_content
+import timspeak.execution_pipeline.main_pipeline
+import timspeak.performance_utilities.multiprocessing
+
+
+def get_sample_file_names(sample_patterns: list) -> list:
+	"""
+	Expand sample names and glob patterns into a sorted list of sample folders.
+
+	Parameters:
+	- sample_patterns: list
+		Sample file names (.d folders) or glob patterns matching them.
+
+	Returns:
+	- list: The absolute sample file names, without duplicates.
+	"""
+	sample_file_names = []
+	for sample_pattern in sample_patterns:
+		matches = sorted(glob.glob(sample_pattern)) or [sample_pattern]
+		for sample_file_name in matches:
+			sample_file_name = os.path.abspath(sample_file_name)
+			if not os.path.isdir(sample_file_name):
+				raise FileNotFoundError(f'Sample {sample_file_name} does not exist.')
+			if sample_file_name not in sample_file_names:
+				sample_file_names.append(sample_file_name)
+	return sample_file_names
+
+
+def run_sample_in_process(
+	config_file_name: str,
+	sample_file_name: str,
+	output_file_name: str,
+	resume: bool,
+	threads: int
+) -> None:
+	pipeline = timspeak.execution_pipeline.main_pipeline.MainPipeline(
+		config_file_name,
+		sample_file_name,
+		output_file_name,
+		resume
+	)
+	with timspeak.performance_utilities.multiprocessing.thread_budget(threads):
+		pipeline.run()
+
+
+class BatchPipeline:
+	"""
+	Run the execution pipeline for several samples with the same configuration
+	file in a single process, so imports, the logger and the thread pool are
+	set up once. Kernels are still compiled for every sample, as njit methods
+	are compiled per instance with the arrays of their sample.
+
+	Parameters:
+	- config_file_name: str
+		The configuration file shared by all samples.
+	- sample_file_names: list
+		Sample file names (.d folders) or glob patterns matching them.
+	- output_directory: str
+		(Default: the directory of the output file of the configuration)
+		The directory in which the output file of each sample is written. Output
+		files are named after the sample, with the extension of the output file
+		of the configuration.
+	- max_concurrent_samples: int
+		(Default: 1)
+		The maximum number of samples processed at the same time. The
+		number_of_threads of the configuration is split among them. Samples
+		processed at the same time on threads share the memory budget and
+		the trace of the process, so max_memory_gb and trace can then only
+		be used with processes.
+	- resume: bool
+		(Default: False)
+		Resume every sample from the stages already completed in its output file.
+	- processes: bool
+		(Default: False)
+		Process every sample in a worker process instead of a thread, so that
+		the Python-level work of concurrent samples, e.g. writing their output
+		files, does not compete for the GIL. Worker processes log to their own
+		log files.
+	"""
+
+	def __init__(
+		self,
+		config_file_name: str,
+		sample_file_names: list,
+		output_directory: str = None,
+		max_concurrent_samples: int = 1,
+		resume: bool = False,
+		processes: bool = False
+	) -> None:
+		self.config_file_name = config_file_name
+		self.sample_file_names = get_sample_file_names(sample_file_names)
+		self.output_directory = output_directory
+		self.max_concurrent_samples = max(1, min(max_concurrent_samples, len(self.sample_file_names)))
+		self.resume = resume
+		self.processes = processes
+
+	def run(self) -> dict:
+		self.logger = timspeak.io_interface.logger.Logger()
+		self.logger.root_logger.info('---------- BATCH ----------')
+		self.read_config_file_content()
+		self.set_threads_per_sample()
+		failed_samples = {}
+		with self.get_executor() as executor:
+			futures = {
+				self.submit_sample(executor, sample_file_name): sample_file_name
+				for sample_file_name in self.sample_file_names
+			}
+			for future in concurrent.futures.as_completed(futures):
+				sample_file_name = futures[future]
+				try:
+					future.result()
+				except Exception as exception:
+					self.logger.root_logger.exception(f'sample {sample_file_name} failed')
+					failed_samples[sample_file_name] = exception
+		self.logger.root_logger.info(
+			f'batch ended: {len(self.sample_file_names) - len(failed_samples)} of '
+			f'{len(self.sample_file_names)} samples processed'
+		)
+		if failed_samples:
+			raise RuntimeError(f'{len(failed_samples)} samples failed: {", ".join(failed_samples)}')
+		return self.output_file_names
+
+	def read_config_file_content(self) -> None:
+		object_read_content = timspeak.io_interface.input.read_content.ReadContent()
+		config_file_content = object_read_content.start_reading(self.config_file_name)
+		self.number_of_threads = config_file_content['number_of_threads']
+		self.check_process_options(config_file_content)
+		output_file_name = config_file_content['output_file_name']
+		extension = output_file_name.split('.')[-1]
+		output_directory = self.output_directory
+		if output_directory is None:
+			output_directory = os.path.dirname(os.path.abspath(output_file_name))
+		os.makedirs(output_directory, exist_ok=True)
+		self.output_file_names = {
+			sample_file_name: os.path.join(
+				output_directory,
+				f'{os.path.splitext(os.path.basename(sample_file_name))[0]}.{extension}'
+			) for sample_file_name in self.sample_file_names
+		}
+		self.logger.root_logger.info(f'configuration file: {self.config_file_name}')
+		self.logger.root_logger.info(f'number of samples: {len(self.sample_file_names)}')
+		self.logger.root_logger.info(f'output directory: {output_directory}')
+
+	def check_process_options(self, config_file_content: dict) -> None:
+		if self.processes or (self.max_concurrent_samples == 1):
+			return
+		# these options set state of the whole process, which concurrent samples would overwrite
+		for option_name, value in (
+			('max_memory_gb', config_file_content.get('max_memory_gb', None)),
+			('trace', config_file_content.get('trace', False)),
+		):
+			if value:
+				raise ValueError(
+					f'{option_name} applies to the whole process and cannot be used with concurrent samples '
+					'on threads, process them in worker processes instead.'
+				)
+
+	def set_threads_per_sample(self) -> None:
+		threads = timspeak.performance_utilities.multiprocessing.set_threads(self.number_of_threads)
+		self.threads_per_sample = max(1, threads // self.max_concurrent_samples)
+		self.logger.root_logger.info(f'max concurrent samples: {self.max_concurrent_samples}')
+		self.logger.root_logger.info(f'threads per sample: {self.threads_per_sample}')
+
+	def get_executor(self):
+		if self.processes:
+			# the process pool is kept for later batches
+			return contextlib.nullcontext(
+				timspeak.performance_utilities.multiprocessing.get_process_pool(self.max_concurrent_samples)
+			)
+		return concurrent.futures.ThreadPoolExecutor(self.max_concurrent_samples)
+
+	def submit_sample(self, executor, sample_file_name: str) -> concurrent.futures.Future:
+		if not self.processes:
+			return executor.submit(self.run_sample, sample_file_name)
+		self.logger.root_logger.info(f'---------- SAMPLE {sample_file_name} (IN A PROCESS) ----------')
+		return executor.submit(
+			run_sample_in_process,
+			self.config_file_name,
+			sample_file_name,
+			self.output_file_names[sample_file_name],
+			self.resume,
+			self.threads_per_sample
+		)
+
+	def run_sample(self, sample_file_name: str) -> None:
+		self.logger.root_logger.info(f'---------- SAMPLE {sample_file_name} ----------')
+		pipeline = timspeak.execution_pipeline.main_pipeline.MainPipeline(
+			self.config_file_name,
+			sample_file_name,
+			self.output_file_names[sample_file_name],
+			self.resume,
+			logger=self.logger
+		)
+		with timspeak.performance_utilities.multiprocessing.thread_budget(self.threads_per_sample):
+			pipeline.run()
+		self.logger.root_logger.info(f'sample {sample_file_name} completed')
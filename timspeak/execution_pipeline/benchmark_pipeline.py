@@ -0,0 +1,547 @@
+import os
+import json
+import time
+import tempfile
+import numpy as np
+import timspeak.io_interface.logger
+import timspeak.io_interface.input.read_content
+import timspeak.execution_pipeline.main_pipeline
+import timspeak.data_handlers.synthetic_data
+import timspeak.data_handlers.indexing
+import timspeak.statistical_utilities.stats
+import timspeak.statistical_utilities.ks_algorithms
+import timspeak.performance_utilities.memory
+import timspeak.performance_utilities.multiprocessing
+
+
+# gradient length (in seconds) of the generated acquisition of every size
+BENCHMARK_SIZES = {
+	'small': 10.0,
+	'medium': 40.0,
+	'large': 160.0,
+}
+
+
+def get_default_config_file_name() -> str:
+	return os.path.join(
+		os.path.dirname(os.path.dirname(__file__)),
+		'configuration_files',
+		'default_configuration.json'
+	)
+
+
+def write_synthetic_config_file(config_file_content: dict, directory: str, sample_name: str) -> str:
+	"""
+	Write a configuration file for a SyntheticPipeline that keeps all results
+	in memory and writes its output file in a directory.
+
+	Returns:
+	- str: The configuration file.
+	"""
+	config_file_name = os.path.join(directory, f'{sample_name}.json')
+	config_file_content = dict(config_file_content)
+	config_file_content['sample_file_name'] = f'{sample_name}.d'
+	config_file_content['output_file_name'] = os.path.join(directory, f'{sample_name}.hdf')
+	config_file_content['in_memory'] = True
+	with open(config_file_name, 'w') as config_file:
+		json.dump(config_file_content, config_file)
+	return config_file_name
+
+
+def time_kernel(function, repeats: int) -> list:
+	"""
+	Time a kernel. The first call of a kernel also compiles it, so it is
+	only timed after a previous call, or to measure its compile time.
+
+	Parameters:
+	- function:
+		The kernel, called without arguments.
+	- repeats: int
+		The number of times the kernel is called.
+
+	Returns:
+	- list: The wall time (in seconds) of every call.
+	"""
+	wall_times = []
+	for repeat in range(repeats):
+		start_time = time.perf_counter()
+		function()
+		wall_times.append(time.perf_counter() - start_time)
+	return wall_times
+
+
+def get_cluster_stats_kernel(
+	dia_data,
+	cluster_index: timspeak.data_handlers.indexing.SparseIndex,
+	smooth_intensity_values: np.ndarray
+):
+	"""
+	Get the statistics calculations of Clusters3D as a single kernel. Every
+	calculator is built once, as Clusters3D builds (and compiles) new ones
+	for every instance.
+
+	Parameters:
+	- dia_data: alphatims.dia_data.DiaData
+		The acquisition.
+	- cluster_index: timspeak.data_handlers.indexing.SparseIndex
+		The clusters.
+	- smooth_intensity_values: np.ndarray
+		The smoothed intensity of every ion.
+
+	Returns:
+	- callable: Calculates all statistics, called without arguments.
+	"""
+	expanded_index_pointers = timspeak.performance_utilities.memory.expand_indptr(dia_data.tof_indptr)
+	calculators = [
+		timspeak.statistical_utilities.stats.RtCalculator(
+			dia_data=dia_data,
+			index=cluster_index,
+			expanded_index_pointers=expanded_index_pointers,
+		),
+		timspeak.statistical_utilities.stats.ImCalculator(
+			dia_data=dia_data,
+			index=cluster_index,
+			expanded_index_pointers=expanded_index_pointers,
+		),
+		timspeak.statistical_utilities.stats.MzCalculator(
+			dia_data=dia_data,
+			index=cluster_index,
+		),
+		timspeak.statistical_utilities.stats.IntensityCalculator(
+			dia_data=dia_data,
+			index=cluster_index,
+		),
+		timspeak.statistical_utilities.stats.ApexCalculator(
+			dia_data=dia_data,
+			index=cluster_index,
+			smooth_intensity_values=smooth_intensity_values,
+		),
+		timspeak.statistical_utilities.stats.IMBoundaryCalculator(
+			dia_data=dia_data,
+			index=cluster_index,
+			expanded_index_pointers=expanded_index_pointers,
+		),
+		timspeak.statistical_utilities.stats.RTBoundaryCalculator(
+			dia_data=dia_data,
+			index=cluster_index,
+			expanded_index_pointers=expanded_index_pointers,
+		),
+	]
+	return lambda: [calculator.calculate() for calculator in calculators]
+
+
+def get_load_imbalance(profiles: list) -> dict:
+	"""
+	Summarize how evenly parallel functions spread their work over their
+	threads.
+
+	Parameters:
+	- profiles: list
+		The calls of parallel functions, as recorded by
+		timspeak.performance_utilities.multiprocessing.profile_parallel.
+
+	Returns:
+	- dict: The number of calls, the imbalance (the summed time until the
+		last thread finished, relative to the summed mean finish time of the
+		threads, minus 1, so 0 if all threads finish together), and the summed
+		time between the first and the last thread to finish (in seconds).
+	"""
+	last_finish_time = sum(max(profile['finish_times_s']) for profile in profiles)
+	mean_finish_time = sum(np.mean(profile['finish_times_s']) for profile in profiles)
+	return {
+		'parallel_calls': len(profiles),
+		'imbalance': float(last_finish_time / mean_finish_time - 1) if mean_finish_time > 0 else 0.0,
+		'finish_time_spread_s': float(
+			sum(max(profile['finish_times_s']) - min(profile['finish_times_s']) for profile in profiles)
+		),
+	}
+
+
+def get_regressions(results: dict, baseline: dict, tolerance: float) -> list:
+	"""
+	Compare benchmark results with a baseline.
+
+	Parameters:
+	- results: dict
+		The benchmark results, with the timing of every kernel by size.
+	- baseline: dict
+		Earlier benchmark results.
+	- tolerance: float
+		The fraction by which a kernel may be slower than in the baseline.
+
+	Returns:
+	- list: A description of every kernel that is slower than allowed.
+	"""
+	regressions = []
+	for size_name, kernels in results['sizes'].items():
+		baseline_kernels = baseline['sizes'].get(size_name, {})
+		for kernel_name, timing in kernels.items():
+			if kernel_name not in baseline_kernels:
+				continue
+			baseline_seconds = baseline_kernels[kernel_name]['seconds']
+			if timing['seconds'] > baseline_seconds * (1 + tolerance):
+				regressions.append(
+					f'{size_name} {kernel_name}: {timing["seconds"]:.4f} s '
+					f'instead of {baseline_seconds:.4f} s '
+					f'({timing["seconds"] / baseline_seconds - 1:+.0%})'
+				)
+	return regressions
+
+
+class SyntheticPipeline(
+	timspeak.execution_pipeline.main_pipeline.MainPipeline
+):
+	"""
+	The execution pipeline on a generated acquisition instead of a sample.
+
+	Parameters:
+	- config_file_name: str
+		The configuration file.
+	- sample: timspeak.data_handlers.synthetic_data.SyntheticSample
+		The generated acquisition and its ground truth.
+	- logger: timspeak.io_interface.logger.Logger
+		(Default: a new logger)
+		The logger.
+	"""
+
+	def __init__(
+		self,
+		config_file_name: str,
+		sample: timspeak.data_handlers.synthetic_data.SyntheticSample,
+		logger: timspeak.io_interface.logger.Logger = None
+	) -> None:
+		super().__init__(config_file_name, logger=logger)
+		object.__setattr__(self, 'sample', sample)
+
+	def load_dia_data(self) -> None:
+		self.logger.root_logger.info('---------- GENERATING DATA ----------')
+		self.dia_data = self.sample.dia_data
+
+	def get_recall(self) -> dict:
+		"""
+		Compare the results of a completed run with the ground truth.
+
+		Returns:
+		- dict: The fraction of isotopes and fragments found as a cluster, and
+			the fraction of consecutive isotopes paired by the deisotoper of
+			each charge.
+		"""
+		features = self.sample.features
+		feature_clusters = timspeak.data_handlers.synthetic_data.match_features(
+			features,
+			self.cluster3d_stats,
+			ppm_tolerance=self.clustering_parameters['ppm_tolerance'],
+		)
+		found = feature_clusters != -1
+		is_isotope = features['frame_groups'].values == 0
+		recall = {
+			'isotopes': float(np.mean(found[is_isotope])),
+			'fragments': float(np.mean(found[~is_isotope])),
+		}
+		for charge, isotopic_pairs in ((2, self.isotopic_pairs_2), (3, self.isotopic_pairs_3)):
+			recall[f'isotope_pairs_charge_{charge}'] = float(
+				timspeak.data_handlers.synthetic_data.get_isotope_pair_recall(
+					features,
+					feature_clusters,
+					self.sample.precursors,
+					charge,
+					self.precursor_indices,
+					isotopic_pairs
+				)
+			)
+		return recall
+
+	def get_kernels(self) -> dict:
+		"""
+		Get the kernels of all stages, with the inputs of a completed run.
+		Every kernel is a method of an instance that is built once, so only
+		its first call compiles it.
+
+		Returns:
+		- dict: The kernel (called without arguments), the number of ions and
+			the number of pairs it processes, by kernel name.
+		"""
+		ion_count = len(self.dia_data.intensity_values)
+		isotopic_pairs = self.isotopic_pairs_2
+		pair_count = int(np.sum(isotopic_pairs != -1))
+		paired_indices = self.get_paired_indices(isotopic_pairs, '2')
+		deisotoper = self.get_deisotoper(self.cluster3d_stats, 2, self.ms1_isotopes_charge_2_parameters)
+		ks_tester = self.get_ks_tester(self.cluster3d_stats)
+		ks1_1d_xics = self.get_ks1_1d_xics()
+		return {
+			'smoother': (
+				self.get_smoother(self.dia_data).smooth_all_scans,
+				ion_count,
+				None
+			),
+			'clusterer': (
+				self.get_clusterer(self.dia_data, self.smooth_intensity_values).cluster_all_scans,
+				ion_count,
+				None
+			),
+			'clusters_3d': (
+				get_cluster_stats_kernel(self.dia_data, self.cluster_index, self.smooth_intensity_values),
+				ion_count,
+				None
+			),
+			'xic_creator': (
+				timspeak.statistical_utilities.ks_algorithms.XICCreator(
+					dia_data=self.dia_data,
+					index3d=self.cluster_index,
+					cluster3d_stats=self.cluster3d_stats,
+					expanded_index_pointers=self.expanded_index_pointers,
+				).create_xics,
+				ion_count,
+				None
+			),
+			'mobilogram_creator': (
+				timspeak.statistical_utilities.ks_algorithms.MobilogramCreator(
+					dia_data=self.dia_data,
+					index3d=self.cluster_index,
+					cluster3d_stats=self.cluster3d_stats,
+					expanded_index_pointers=self.expanded_index_pointers
+				).create_mobilograms,
+				ion_count,
+				None
+			),
+			'charge_deisotoper': (
+				deisotoper.deisotope_all_scans,
+				ion_count,
+				pair_count
+			),
+			'ks_tester': (
+				lambda: ks_tester.between_all_clusters(isotopic_pairs),
+				ion_count,
+				pair_count
+			),
+			'ks_tester_1d': (
+				lambda: ks1_1d_xics.calculate_all(paired_indices),
+				None,
+				pair_count
+			),
+		}
+
+
+class BenchmarkPipeline:
+	"""
+	Time the kernels of all stages on generated acquisitions of several
+	sizes, and compare them with a baseline.
+
+	The execution pipeline first runs once on every acquisition, after which
+	its recall is measured against the ground truth of the acquisition and
+	every kernel is timed on the results. Every kernel is called once before
+	it is timed, which compiles it.
+
+	Parameters:
+	- config_file_name: str
+		(Default: the default configuration)
+		The configuration file.
+	- sizes: list
+		(Default: ['small', 'medium'])
+		The names of the acquisition sizes in BENCHMARK_SIZES.
+	- repeats: int
+		(Default: 3)
+		The number of times every kernel is timed, of which the fastest counts.
+	- output_file_name: str
+		(Default: timspeak_benchmark.json)
+		The JSON file in which the results are written.
+	- baseline_file_name: str
+		(Default: None)
+		The JSON file with earlier results to compare with.
+	- save_baseline: bool
+		(Default: False)
+		Write the results to baseline_file_name instead of comparing with it.
+	- tolerance: float
+		(Default: 0.25)
+		The fraction by which a kernel may be slower than in the baseline.
+	- thread_counts: list
+		(Default: None)
+		The numbers of threads at which every kernel is also timed, to measure
+		its speedup, parallel efficiency and load imbalance. None means no
+		scaling is measured.
+	- imbalance_threshold: float
+		(Default: 0.2)
+		The load imbalance above which a kernel is flagged.
+	- backends: list
+		(Default: None)
+		The parallel backends (see
+		timspeak.performance_utilities.multiprocessing.PARALLEL_BACKENDS)
+		with which every kernel is also timed, to choose the fastest backend
+		of every kernel. None means no backends are compared.
+	"""
+
+	def __init__(
+		self,
+		config_file_name: str = None,
+		sizes: list = None,
+		repeats: int = 3,
+		output_file_name: str = 'timspeak_benchmark.json',
+		baseline_file_name: str = None,
+		save_baseline: bool = False,
+		tolerance: float = 0.25,
+		thread_counts: list = None,
+		imbalance_threshold: float = 0.2,
+		backends: list = None
+	) -> None:
+		self.config_file_name = config_file_name or get_default_config_file_name()
+		self.sizes = sizes or ['small', 'medium']
+		self.repeats = repeats
+		self.output_file_name = output_file_name
+		self.baseline_file_name = baseline_file_name
+		self.save_baseline = save_baseline
+		self.tolerance = tolerance
+		self.thread_counts = sorted(thread_counts or [])
+		self.imbalance_threshold = imbalance_threshold
+		self.backends = list(backends or [])
+
+	def run(self) -> dict:
+		self.logger = timspeak.io_interface.logger.Logger()
+		self.logger.root_logger.info('---------- BENCHMARK ----------')
+		object_read_content = timspeak.io_interface.input.read_content.ReadContent()
+		self.config_file_content = object_read_content.start_reading(self.config_file_name)
+		self.imbalanced_kernels = []
+		if 'numba' in self.backends:
+			timspeak.performance_utilities.multiprocessing.start_numba_threads()
+		sizes = {}
+		recall = {}
+		scaling = {}
+		backends = {}
+		for size_name in self.sizes:
+			sizes[size_name], recall[size_name], scaling[size_name], backends[size_name] = self.run_size(size_name)
+		results = {
+			'version': timspeak.__version__,
+			'number_of_threads': timspeak.performance_utilities.multiprocessing.get_threads(),
+			'repeats': self.repeats,
+			'sizes': sizes,
+			'recall': recall,
+		}
+		if self.thread_counts:
+			results['scaling'] = scaling
+			results['imbalanced_kernels'] = self.imbalanced_kernels
+		if self.backends:
+			results['backends'] = backends
+		with open(self.output_file_name, 'w') as results_file:
+			json.dump(results, results_file, indent=2)
+		self.logger.root_logger.info(f'benchmark results saved to {self.output_file_name}')
+		self.check_baseline(results)
+		self.logger.root_logger.info('benchmark ended')
+		return results
+
+	def run_size(self, size_name: str) -> tuple:
+		gradient_length = BENCHMARK_SIZES[size_name]
+		self.logger.root_logger.info(f'---------- BENCHMARK {size_name.upper()} ({gradient_length} S GRADIENT) ----------')
+		sample = timspeak.data_handlers.synthetic_data.generate_sample(gradient_length=gradient_length)
+		with tempfile.TemporaryDirectory() as directory:
+			config_file_name = write_synthetic_config_file(
+				self.config_file_content,
+				directory,
+				f'synthetic_{size_name}'
+			)
+			pipeline = SyntheticPipeline(config_file_name, sample, self.logger)
+			pipeline.run()
+			recall = pipeline.get_recall()
+			self.logger.root_logger.info(
+				'recall: ' + ', '.join(f'{name} {value:.3f}' for name, value in recall.items())
+			)
+			kernels = pipeline.get_kernels()
+			timings = {}
+			scaling = {}
+			backends = {}
+			for kernel_name, (function, ion_count, pair_count) in kernels.items():
+				# compiles the kernel
+				function()
+				timings[kernel_name] = self.time_kernel(kernel_name, function, ion_count, pair_count)
+				if self.thread_counts:
+					scaling[kernel_name] = self.scale_kernel(size_name, kernel_name, function)
+				if self.backends:
+					backends[kernel_name] = self.compare_backends(kernel_name, function)
+		return timings, recall, scaling, backends
+
+	def time_kernel(self, kernel_name: str, function, ion_count: int, pair_count: int) -> dict:
+		wall_times = time_kernel(function, self.repeats)
+		seconds = min(wall_times)
+		timing = {
+			'seconds': seconds,
+			'median_seconds': float(np.median(wall_times)),
+		}
+		if ion_count is not None:
+			timing['ion_count'] = ion_count
+			timing['ions_per_s'] = ion_count / seconds
+		if pair_count is not None:
+			timing['pair_count'] = pair_count
+			timing['pairs_per_s'] = pair_count / seconds
+		self.logger.root_logger.info(
+			f'{kernel_name}: {seconds:.4f} s' +
+			''.join(f', {name} {timing[name]:.0f}' for name in ('ions_per_s', 'pairs_per_s') if name in timing)
+		)
+		return timing
+
+	def scale_kernel(self, size_name: str, kernel_name: str, function) -> dict:
+		scaling = {}
+		for thread_count in self.thread_counts:
+			with timspeak.performance_utilities.multiprocessing.thread_budget(thread_count) as threads:
+				with timspeak.performance_utilities.multiprocessing.profile_parallel() as profiles:
+					wall_times = time_kernel(function, self.repeats)
+			scaling[str(thread_count)] = {
+				'threads': threads,
+				'seconds': min(wall_times),
+				**get_load_imbalance(profiles),
+			}
+		reference = scaling[str(self.thread_counts[0])]
+		for thread_count, thread_scaling in scaling.items():
+			speedup = reference['seconds'] / thread_scaling['seconds']
+			thread_scaling['speedup'] = speedup
+			thread_scaling['efficiency'] = speedup * reference['threads'] / thread_scaling['threads']
+			self.logger.root_logger.info(
+				f'{kernel_name} on {thread_scaling["threads"]} threads: {thread_scaling["seconds"]:.4f} s, '
+				f'speedup {speedup:.2f}, efficiency {thread_scaling["efficiency"]:.2f}, '
+				f'imbalance {thread_scaling["imbalance"]:.2f}'
+			)
+			if thread_scaling['imbalance'] > self.imbalance_threshold:
+				imbalanced_kernel = (
+					f'{size_name} {kernel_name} on {thread_scaling["threads"]} threads: '
+					f'imbalance {thread_scaling["imbalance"]:.2f}'
+				)
+				self.logger.root_logger.warning(f'load imbalance: {imbalanced_kernel}')
+				self.imbalanced_kernels.append(imbalanced_kernel)
+		return scaling
+
+	def compare_backends(self, kernel_name: str, function) -> dict:
+		backends = {}
+		for backend in self.backends:
+			with timspeak.performance_utilities.multiprocessing.parallel_backend(backend):
+				# the first call compiles the parallel functions for the backend
+				wall_times = time_kernel(function, self.repeats + 1)[1:]
+			backends[backend] = {'seconds': min(wall_times)}
+		fastest = min(backends, key=lambda backend: backends[backend]['seconds'])
+		self.logger.root_logger.info(
+			f'{kernel_name} backends: ' +
+			', '.join(f'{backend} {timing["seconds"]:.4f} s' for backend, timing in backends.items()) +
+			f', fastest {fastest}'
+		)
+		return dict(backends, fastest=fastest)
+
+	def check_baseline(self, results: dict) -> None:
+		if self.baseline_file_name is None:
+			return
+		if self.save_baseline:
+			with open(self.baseline_file_name, 'w') as baseline_file:
+				json.dump(results, baseline_file, indent=2)
+			self.logger.root_logger.info(f'benchmark baseline saved to {self.baseline_file_name}')
+			return
+		with open(self.baseline_file_name, 'r') as baseline_file:
+			baseline = json.load(baseline_file)
+		if baseline['number_of_threads'] != results['number_of_threads']:
+			self.logger.root_logger.warning(
+				f'the baseline used {baseline["number_of_threads"]} threads '
+				f'instead of {results["number_of_threads"]}'
+			)
+		regressions = get_regressions(results, baseline, self.tolerance)
+		for regression in regressions:
+			self.logger.root_logger.error(f'regression: {regression}')
+		if regressions:
+			raise RuntimeError(
+				f'{len(regressions)} kernels are more than {self.tolerance:.0%} slower than in '
+				f'{self.baseline_file_name}:\n' + '\n'.join(regressions)
+			)
+		self.logger.root_logger.info(f'no regressions compared with {self.baseline_file_name}')
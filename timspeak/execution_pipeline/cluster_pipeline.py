@@ -1,49 +1,238 @@
 
+import time
 import numpy as np
+import alphatims.dia_data
 import timspeak.execution_pipeline.smooth_pipeline
 import timspeak.peak_picker_algorithms.algorithm_selection
 import timspeak.data_handlers.indexing
 import timspeak.peak_picker_algorithms.cluster.clusters_stats
+import timspeak.performance_utilities.memory
+import timspeak.data_handlers.rt_windows
 
 class ClusterPipeline(
 	timspeak.execution_pipeline.smooth_pipeline.SmoothPipeline
 ):
 
-	def clustering(
-		self
-	) -> timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D:
+	def clustering(self) -> None:
 		self.logger.root_logger.info('---------- CLUSTERING ----------')
-		index_3d = self.cluster_data()
-		self.save_index_3d_raw_pointers(index_3d)
-		self.create_mmaps_for_clustering_raw_pointers(index_3d)
-		clusters3d_stats = self.get_cluster_stats(index_3d)
-		self.save_clusters3d_stats_as_dataframe(clusters3d_stats)
+		if self.rt_windows is None:
+			index_3d = self.cluster_data()
+			self.save_index_3d_raw_pointers(index_3d)
+			self.create_mmaps_for_clustering_raw_pointers()
+			self.cluster3d_stats = self.get_cluster_stats(index_3d)
+		else:
+			index_3d, self.cluster3d_stats = self.cluster_data_in_rt_windows()
+			self.save_index_3d_raw_pointers(index_3d)
+			self.create_mmaps_for_clustering_raw_pointers()
+		self.save_clusters3d_stats_as_dataframe(self.cluster3d_stats)
 		self.get_expanded_index_pointers()
-		xics, xic_indptr = self.get_clustering_rt_projections(index_3d, clusters3d_stats)
-		self.save_clustering_rt_projections(clusters3d_stats, xics, xic_indptr)
+		self.generate_sparse_cluster_index()
+
+	def restore_clustering(self) -> None:
+		self.logger.root_logger.info('---------- CLUSTERING (RESTORED) ----------')
+		self.clustering_parameters = self.config_file_content['clustering']
+		self.create_mmaps_for_clustering_raw_pointers()
+		self.generate_sparse_cluster_index()
+		self.cluster3d_stats = self.get_cluster_stats(self.cluster_index)
+		self.get_expanded_index_pointers()
+
+	def clustering_rt_projections(self) -> None:
+		self.logger.root_logger.info('---------- CLUSTERING RT PROJECTIONS ----------')
+		xics, xic_indptr = self.get_clustering_rt_projections(self.cluster_index, self.cluster3d_stats)
+		self.save_clustering_rt_projections(self.cluster3d_stats, xics, xic_indptr)
 		self.create_mmaps_for_clustering_rt_projections()
-		mobilograms, mobilogram_indptr = self.get_clustering_im_projections(index_3d, clusters3d_stats)
-		self.save_clustering_im_projections(clusters3d_stats, mobilograms, mobilogram_indptr)
+		self.generate_sparse_xic_index()
+
+	def restore_clustering_rt_projections(self) -> None:
+		self.logger.root_logger.info('---------- CLUSTERING RT PROJECTIONS (RESTORED) ----------')
+		self.create_mmaps_for_clustering_rt_projections()
+		self.generate_sparse_xic_index()
+
+	def clustering_im_projections(self) -> None:
+		self.logger.root_logger.info('---------- CLUSTERING IM PROJECTIONS ----------')
+		mobilograms, mobilogram_indptr = self.get_clustering_im_projections(self.cluster_index, self.cluster3d_stats)
+		self.save_clustering_im_projections(self.cluster3d_stats, mobilograms, mobilogram_indptr)
+		self.create_mmaps_for_clustering_im_projections()
+		self.generate_sparse_mobilogram_index()
+
+	def restore_clustering_im_projections(self) -> None:
+		self.logger.root_logger.info('---------- CLUSTERING IM PROJECTIONS (RESTORED) ----------')
 		self.create_mmaps_for_clustering_im_projections()
-		self.generate_sparse_indices()
-		return clusters3d_stats
+		self.generate_sparse_mobilogram_index()
 
 	def cluster_data(
 		self
 	) -> timspeak.data_handlers.indexing.SparseIndex:
 		self.clustering_parameters = self.config_file_content['clustering']
-		clusterer = timspeak.peak_picker_algorithms.algorithm_selection.cluster_algorithm(
-			self.clustering_parameters['algorithm_name'])(
+		index_3d = self.cluster_dia_data(
+			self.dia_data,
+			self.smooth_intensity_values,
+			neighbor_work_stage='clustering'
+		)
+		self.logger.root_logger.info('data clustered')
+		return index_3d
+
+	def cluster_data_in_rt_windows(self) -> tuple:
+		self.clustering_parameters = self.config_file_content['clustering']
+		window_clusters = []
+		for window_index, window in enumerate(self.rt_windows):
+			window_dia_data, _, index_3d, cluster3d_stats = self.cluster_rt_window(
+				window,
+				neighbor_work_stage='clustering'
+			)
+			window_clusters.append(
+				timspeak.data_handlers.rt_windows.select_core_clusters(
+					window_dia_data,
+					index_3d,
+					cluster3d_stats,
+					self.clustering_parameters['clustering_threshold']
+				)
+			)
+			self.logger.root_logger.info(
+				f'rt window {window_index + 1} of {len(self.rt_windows)} clustered: '
+				f'{len(window_clusters[-1]["sizes"])} of {len(cluster3d_stats)} clusters have their apex in the window'
+			)
+		index_3d, cluster3d_stats = timspeak.data_handlers.rt_windows.stitch_clusters(
+			self.dia_data,
+			self.smooth_intensity_values,
+			window_clusters
+		)
+		self.logger.root_logger.info('data clustered')
+		self.logger.root_logger.info('cluster3d_stats calculated')
+		return index_3d, cluster3d_stats
+
+	def cluster_rt_window(
+		self,
+		window: timspeak.data_handlers.rt_windows.RtWindow,
+		smooth: bool = False,
+		neighbor_work_stage: str = None
+	) -> tuple:
+		"""
+		Cluster an RT window, so that the clusters with their apex in the
+		frames owned by the window are the same as without RT windows. If the
+		halo of the window cuts off such clusters, it is widened by the halo
+		these clusters need (see
+		timspeak.data_handlers.rt_windows.get_required_halo) and the window
+		clustered again. Should that halo still cut off clusters, the window
+		is widened to the start or end of the acquisition. As clustering
+		again costs as much as the first pass, RT windows should be much
+		longer than the RT width of clusters.
+
+		Parameters:
+		- window: timspeak.data_handlers.rt_windows.RtWindow
+			The RT window.
+		- smooth: bool
+			(Default: False)
+			Smooth the window on its own instead of taking the smoothed
+			intensities of the full acquisition.
+		- neighbor_work_stage: str
+			(Default: None)
+			The stage to which the neighbour work of clustering the window,
+			including clustering it again, is added. None does not count it.
+
+		Returns:
+		- tuple: The WindowDiaData, smoothed intensities, SparseIndex and Clusters3D
+			of the window, with a clustering threshold of 1.
+		"""
+		rt_tolerances = (self.clustering_parameters['rt_tolerance'],) * 2
+		if smooth:
+			rt_tolerances += (self.smoothing_parameters['rt_tolerance'],)
+		window_clusters = self.cluster_rt_window_once(window, smooth, neighbor_work_stage)
+		for halo in (None, np.inf):
+			window_dia_data, _, _, cluster3d_stats = window_clusters
+			lower, upper = timspeak.data_handlers.rt_windows.get_truncated_sides(
+				window_dia_data,
+				cluster3d_stats,
+				rt_tolerances
+			)
+			lower = lower and (window.first_frame > 1)
+			upper = upper and (window.last_frame < len(self.dia_data.rt_values))
+			if not (lower or upper):
+				break
+			if halo is None:
+				halo = timspeak.data_handlers.rt_windows.get_required_halo(
+					window_dia_data,
+					cluster3d_stats,
+					rt_tolerances
+				)
+			else:
+				self.logger.root_logger.warning('rt window still cuts off clusters, widened to the acquisition')
+			start_time = time.perf_counter()
+			window = timspeak.data_handlers.rt_windows.grow_rt_window(
+				self.dia_data,
+				window,
+				halo,
+				lower,
+				upper
+			)
+			window_clusters = self.cluster_rt_window_once(window, smooth, neighbor_work_stage)
+			self.logger.root_logger.info(
+				f'rt window cuts off clusters, halo widened to frames {window.first_frame} to {window.last_frame - 1} '
+				f'and clustered again in {time.perf_counter() - start_time:.1f} s'
+			)
+		return window_clusters
+
+	def cluster_rt_window_once(
+		self,
+		window: timspeak.data_handlers.rt_windows.RtWindow,
+		smooth: bool,
+		neighbor_work_stage: str = None
+	) -> tuple:
+		window_dia_data = timspeak.data_handlers.rt_windows.WindowDiaData(
 			dia_data=self.dia_data,
-			smooth_intensity_values=self.smooth_intensity_values,
+			window=window
+		)
+		if smooth:
+			window_smooth_intensity_values = self.smooth_dia_data(window_dia_data)
+		else:
+			window_smooth_intensity_values = window_dia_data.get_values(self.smooth_intensity_values)
+		index_3d = self.cluster_dia_data(
+			window_dia_data,
+			window_smooth_intensity_values,
+			clustering_threshold=1,
+			neighbor_work_stage=neighbor_work_stage
+		)
+		cluster3d_stats = timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D(
+			dia_data=window_dia_data,
+			sparse_index=index_3d,
+			smooth_intensity_values=window_smooth_intensity_values
+		)
+		return window_dia_data, window_smooth_intensity_values, index_3d, cluster3d_stats
+
+	def cluster_dia_data(
+		self,
+		dia_data: alphatims.dia_data.DiaData,
+		smooth_intensity_values: np.ndarray,
+		clustering_threshold: int = None,
+		neighbor_work_stage: str = None
+	) -> timspeak.data_handlers.indexing.SparseIndex:
+		clusterer = self.get_clusterer(dia_data, smooth_intensity_values, clustering_threshold)
+		index_3d = clusterer.cluster_all_scans()
+		if neighbor_work_stage is not None:
+			self.add_neighbor_work(
+				neighbor_work_stage,
+				clusterer,
+				None if dia_data is self.dia_data else dia_data
+			)
+		return index_3d
+
+	def get_clusterer(
+		self,
+		dia_data: alphatims.dia_data.DiaData,
+		smooth_intensity_values: np.ndarray,
+		clustering_threshold: int = None
+	):
+		if clustering_threshold is None:
+			clustering_threshold = self.clustering_parameters['clustering_threshold']
+		return timspeak.peak_picker_algorithms.algorithm_selection.cluster_algorithm(
+			self.clustering_parameters['algorithm_name'])(
+			dia_data=dia_data,
+			smooth_intensity_values=smooth_intensity_values,
 			ppm_tolerance=self.clustering_parameters['ppm_tolerance'],
 			im_tolerance=self.clustering_parameters['im_tolerance'],
 			rt_tolerance=self.clustering_parameters['rt_tolerance'],
-			clustering_threshold=self.clustering_parameters['clustering_threshold']
+			clustering_threshold=clustering_threshold
 		)
-		index_3d = clusterer.cluster_all_scans()
-		self.logger.root_logger.info('data clustered')
-		return index_3d
 
 	def save_index_3d_raw_pointers(
 		self,
@@ -52,10 +241,7 @@ class ClusterPipeline(
 		self.output_format_object.print_clustering_raw_pointers(index_3d)
 		self.logger.root_logger.info('index_3d saved to file')
 
-	def create_mmaps_for_clustering_raw_pointers(
-		self,
-		index_3d: timspeak.data_handlers.indexing.SparseIndex
-	) -> None:
+	def create_mmaps_for_clustering_raw_pointers(self) -> None:
 		self.cluster_indptr = self.output_format_object.read_mem_map(
 			file_name=self.output_file_name,
 			mmap_name='/clustering/raw_pointers/indptr'
@@ -89,9 +275,8 @@ class ClusterPipeline(
 		self.logger.root_logger.info('cluster3d_stats saved to file')
 
 	def get_expanded_index_pointers(self) -> None:
-		self.expanded_index_pointers = np.repeat(
-			np.arange(len(self.dia_data.tof_indptr) - 1),
-			np.diff(self.dia_data.tof_indptr),
+		self.expanded_index_pointers = timspeak.performance_utilities.memory.expand_indptr(
+			self.dia_data.tof_indptr
 		)
 		self.logger.root_logger.info('expanded_index_pointers calculated')
 
@@ -182,17 +367,23 @@ class ClusterPipeline(
 		)
 		self.logger.root_logger.info('xic_indptr, xics and xic_offsets mapped')
 
-	def generate_sparse_indices(self) -> None:
+	def generate_sparse_cluster_index(self) -> None:
 		self.cluster_index = timspeak.data_handlers.indexing.SparseIndex(
 			indptr=self.cluster_indptr,
 			values=self.cluster_indices
 		)
+		self.logger.root_logger.info('sparse cluster_index generated')
+
+	def generate_sparse_xic_index(self) -> None:
 		self.xic_index = timspeak.data_handlers.indexing.SparseIndex(
 			indptr=self.xic_indptr,
 			values=self.xics
 		)
+		self.logger.root_logger.info('sparse xic_index generated')
+
+	def generate_sparse_mobilogram_index(self) -> None:
 		self.mobilogram_index = timspeak.data_handlers.indexing.SparseIndex(
 			indptr=self.mobilogram_indptr,
 			values=self.mobilograms
 		)
-		self.logger.root_logger.info('sparse cluster_index, xic_index and mobilogram_index generated')
+		self.logger.root_logger.info('sparse mobilogram_index generated')
@@ -10,33 +10,63 @@ import timspeak.peak_picker_algorithms.isotope.deisotoping
 class DeisotopingPipeline(
 	timspeak.execution_pipeline.ms1_precursors_pipeline.MS1PrecursorsPipeline
 ):
-	def deisotoping(
-		self,
-		cluster3d_stats: timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D
-	) -> None:
-		self.logger.root_logger.info('---------- DEISOTOPING ----------')
-		lower_isotope_pointers_2, upper_isotope_pointers_2 = self.get_lower_upper_isotope_pointers_2(cluster3d_stats)
+	def deisotoping_charge_2(self) -> None:
+		self.logger.root_logger.info('---------- DEISOTOPING CHARGE 2 ----------')
+		lower_isotope_pointers_2, upper_isotope_pointers_2 = self.get_lower_upper_isotope_pointers_2(self.cluster3d_stats)
 		self.save_isotope_pointers_2(lower_isotope_pointers_2, upper_isotope_pointers_2)
 		self.create_mmaps_for_isotope_pointers_2()
-		lower_isotope_pointers_3, upper_isotope_pointers_3 = self.get_lower_upper_isotope_pointers_3(cluster3d_stats)
+
+	def restore_deisotoping_charge_2(self) -> None:
+		self.logger.root_logger.info('---------- DEISOTOPING CHARGE 2 (RESTORED) ----------')
+		self.ms1_isotopes_charge_2_parameters = self.config_file_content['ms1']['isotopes']['charge_2']
+		self.create_mmaps_for_isotope_pointers_2()
+		self.isotopic_pairs_2 = self.get_isotopic_pairs(self.lower_isotope_pointers_2, self.upper_isotope_pointers_2)
+
+	def deisotoping_charge_3(self) -> None:
+		self.logger.root_logger.info('---------- DEISOTOPING CHARGE 3 ----------')
+		lower_isotope_pointers_3, upper_isotope_pointers_3 = self.get_lower_upper_isotope_pointers_3(self.cluster3d_stats)
 		self.save_isotope_pointers_3(lower_isotope_pointers_3, upper_isotope_pointers_3)
 		self.create_mmaps_for_isotope_pointers_3()
 
-	def get_lower_upper_isotope_pointers_2(
+	def restore_deisotoping_charge_3(self) -> None:
+		self.logger.root_logger.info('---------- DEISOTOPING CHARGE 3 (RESTORED) ----------')
+		self.ms1_isotopes_charge_3_parameters = self.config_file_content['ms1']['isotopes']['charge_3']
+		self.create_mmaps_for_isotope_pointers_3()
+		self.isotopic_pairs_3 = self.get_isotopic_pairs(self.lower_isotope_pointers_3, self.upper_isotope_pointers_3)
+
+	def get_isotopic_pairs(
 		self,
-		cluster3d_stats
-	) -> tuple:
-		self.ms1_isotopes_charge_2_parameters = self.config_file_content['ms1']['isotopes']['charge_2']
-		deisotoper_2 = timspeak.peak_picker_algorithms.isotope.deisotoping.ChargeDeisotoper(
+		lower_isotope_pointers: np.ndarray,
+		upper_isotope_pointers: np.ndarray
+	) -> np.ndarray:
+		isotopic_pairs = np.full(len(self.precursor_indices), -1, dtype=np.int64)
+		isotopic_pairs[lower_isotope_pointers] = upper_isotope_pointers
+		return isotopic_pairs
+
+	def get_deisotoper(
+		self,
+		cluster3d_stats,
+		charge: int,
+		parameters: dict
+	) -> timspeak.peak_picker_algorithms.isotope.deisotoping.ChargeDeisotoper:
+		return timspeak.peak_picker_algorithms.isotope.deisotoping.ChargeDeisotoper(
 			dia_data=self.dia_data,
 			index=self.precursor_index,
 			cluster_stats=cluster3d_stats,
-			charge=2,
-			im_tolerance=self.ms1_isotopes_charge_2_parameters['im_tolerance'],
-			ppm_tolerance=self.ms1_isotopes_charge_2_parameters['ppm_tolerance'],
-			rt_tolerance=self.ms1_isotopes_charge_2_parameters['rt_tolerance']
+			charge=charge,
+			im_tolerance=parameters['im_tolerance'],
+			ppm_tolerance=parameters['ppm_tolerance'],
+			rt_tolerance=parameters['rt_tolerance']
 		)
+
+	def get_lower_upper_isotope_pointers_2(
+		self,
+		cluster3d_stats
+	) -> tuple:
+		self.ms1_isotopes_charge_2_parameters = self.config_file_content['ms1']['isotopes']['charge_2']
+		deisotoper_2 = self.get_deisotoper(cluster3d_stats, 2, self.ms1_isotopes_charge_2_parameters)
 		isotopic_pairs_2 = deisotoper_2.deisotope_all_scans()
+		self.add_neighbor_work('deisotoping_charge_2', deisotoper_2)
 		lower_isotope_pointers_2 = np.flatnonzero(isotopic_pairs_2 != -1)
 		upper_isotope_pointers_2 = isotopic_pairs_2[lower_isotope_pointers_2]
 		self.isotopic_pairs_2 = isotopic_pairs_2
@@ -71,16 +101,9 @@ class DeisotopingPipeline(
 		cluster3d_stats
 	) -> tuple:
 		self.ms1_isotopes_charge_3_parameters = self.config_file_content['ms1']['isotopes']['charge_3']
-		deisotoper_3 = timspeak.peak_picker_algorithms.isotope.deisotoping.ChargeDeisotoper(
-			dia_data=self.dia_data,
-			index=self.precursor_index,
-			cluster_stats=cluster3d_stats,
-			charge=3,
-			im_tolerance=self.ms1_isotopes_charge_3_parameters['im_tolerance'],
-			ppm_tolerance=self.ms1_isotopes_charge_3_parameters['ppm_tolerance'],
-			rt_tolerance=self.ms1_isotopes_charge_3_parameters['rt_tolerance']
-		)
+		deisotoper_3 = self.get_deisotoper(cluster3d_stats, 3, self.ms1_isotopes_charge_3_parameters)
 		isotopic_pairs_3 = deisotoper_3.deisotope_all_scans()
+		self.add_neighbor_work('deisotoping_charge_3', deisotoper_3)
 		lower_isotope_pointers_3 = np.flatnonzero(isotopic_pairs_3 != -1)
 		upper_isotope_pointers_3 = isotopic_pairs_3[lower_isotope_pointers_3]
 		self.isotopic_pairs_3 = isotopic_pairs_3
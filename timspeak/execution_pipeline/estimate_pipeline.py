@@ -0,0 +1,266 @@
+import json
+import time
+import numpy as np
+import timspeak.execution_pipeline.main_pipeline
+import timspeak.io_interface.logger
+import timspeak.performance_utilities.memory
+import timspeak.performance_utilities.multiprocessing
+import timspeak.performance_utilities.neighbor_work
+
+
+def get_sampled_scans(
+	frame_count: int,
+	scans_per_frame: int,
+	sample_fraction: float,
+	seed: int = 0
+) -> np.ndarray:
+	"""
+	Sample all scans of randomly chosen frames, so that the neighbours of a
+	sampled scan are visited in the same order as in a full run.
+
+	Parameters:
+	- frame_count: int
+		The number of frames, including the empty zeroth frame.
+	- scans_per_frame: int
+		The number of scans of every frame.
+	- sample_fraction: float
+		The fraction of frames to sample, of which at least one is sampled.
+	- seed: int
+		(Default: 0)
+		The seed of the random frame selection.
+
+	Returns:
+	- np.ndarray: The sorted indices of the sampled scans.
+	"""
+	sampled_frame_count = min(frame_count - 1, max(1, int(round(sample_fraction * (frame_count - 1)))))
+	frames = np.sort(
+		np.random.default_rng(seed).choice(np.arange(1, frame_count), sampled_frame_count, replace=False)
+	)
+	return (frames[:, np.newaxis] * scans_per_frame + np.arange(scans_per_frame)).ravel()
+
+
+def scale_reference_stages(reference: dict, ion_count: int, thread_count: int) -> dict:
+	"""
+	Scale the stages of the performance report of an earlier run to another
+	acquisition and number of threads, assuming that time and memory grow
+	linearly with the number of ions and that time shrinks linearly with the
+	number of threads.
+
+	Parameters:
+	- reference: dict
+		The performance report (see timspeak.performance_utilities.stage_performance.write_report).
+	- ion_count: int
+		The number of ions of the acquisition.
+	- thread_count: int
+		The number of threads.
+
+	Returns:
+	- dict: The wall time and the growth of the resident memory over the
+		memory after loading the acquisition, by stage name.
+	"""
+	ion_ratio = ion_count / reference['acquisition']['ion_count']
+	stages = reference['stages']
+	loaded_rss_bytes = min(stage['rss_bytes_before'] for stage in stages.values())
+	scaled_stages = {}
+	for stage_name, stage in stages.items():
+		peak_rss_bytes = stage.get('max_rss_bytes', stage['peak_rss_bytes'])
+		scaled_stages[stage_name] = {
+			'wall_time_s': stage['wall_time_s'] * ion_ratio * stage['threads'] / thread_count,
+			'memory_bytes': int(max(0, peak_rss_bytes - loaded_rss_bytes) * ion_ratio),
+		}
+	return scaled_stages
+
+
+class EstimatePipeline(
+	timspeak.execution_pipeline.main_pipeline.MainPipeline
+):
+	"""
+	Estimate the time and memory of a run before running it.
+
+	The acquisition is loaded, and the neighbour searches of the smoothing
+	and clustering kernels, which dominate their stages, run on all scans of
+	a random sample of frames. Their neighbour work is counted and their time
+	measured, and both are scaled to the ions of the whole acquisition. The
+	other stages, and the memory of all stages, are scaled from the
+	performance report of an earlier run, if given.
+
+	Parameters:
+	- config_file_name: str
+		The configuration file.
+	- cmdln_sample_file_name: str
+		(Default: the sample of the configuration file)
+		The sample.
+	- thread_count: int
+		(Default: number_of_threads of the configuration file)
+		The number of threads of the run. Times measured with fewer threads,
+		e.g. on a machine with fewer cores, are scaled linearly.
+	- sample_fraction: float
+		(Default: 0.01)
+		The fraction of frames to sample.
+	- reference_file_name: str
+		(Default: None)
+		The performance report of an earlier run.
+	- estimate_file_name: str
+		(Default: timspeak_estimate.json)
+		The JSON file in which the estimate is written.
+	- logger: timspeak.io_interface.logger.Logger
+		(Default: a new logger)
+		The logger.
+	"""
+
+	def __init__(
+		self,
+		config_file_name: str,
+		cmdln_sample_file_name: str = None,
+		thread_count: int = None,
+		sample_fraction: float = 0.01,
+		reference_file_name: str = None,
+		estimate_file_name: str = 'timspeak_estimate.json',
+		logger: timspeak.io_interface.logger.Logger = None
+	) -> None:
+		super().__init__(config_file_name, cmdln_sample_file_name, logger=logger)
+		object.__setattr__(self, 'thread_count', thread_count)
+		object.__setattr__(self, 'sample_fraction', sample_fraction)
+		object.__setattr__(self, 'reference_file_name', reference_file_name)
+		object.__setattr__(self, 'estimate_file_name', estimate_file_name)
+
+	def run(self) -> dict:
+		self.initialize_logger()
+		self.set_input_objects()
+		if self.thread_count is not None:
+			self.config_file_content['number_of_threads'] = self.thread_count
+		self.set_number_of_threads()
+		measured_thread_count = timspeak.performance_utilities.multiprocessing.get_threads()
+		thread_count = measured_thread_count if self.thread_count is None else self.thread_count
+		rss_bytes_before = timspeak.performance_utilities.memory.get_used_memory()
+		start_time = time.perf_counter()
+		self.load_dia_data()
+		loading = {
+			'wall_time_s': time.perf_counter() - start_time,
+			'memory_bytes': timspeak.performance_utilities.memory.get_used_memory() - rss_bytes_before,
+		}
+		loaded_rss_bytes = timspeak.performance_utilities.memory.get_used_memory()
+		self.get_cycle_lenght()
+		self.logger.root_logger.info('---------- ESTIMATING ----------')
+		stages = {}
+		if self.reference_file_name is not None:
+			with open(self.reference_file_name, 'r') as reference_file:
+				reference = json.load(reference_file)
+			for stage_name, stage in scale_reference_stages(
+				reference,
+				len(self.dia_data.intensity_values),
+				thread_count
+			).items():
+				stages[stage_name] = dict(stage, source='reference')
+		scan_indices = get_sampled_scans(
+			len(self.dia_data.rt_values),
+			len(self.dia_data.im_values),
+			self.sample_fraction
+		)
+		sampled_ion_count = int(np.sum(
+			self.dia_data.tof_indptr[scan_indices + 1] - self.dia_data.tof_indptr[scan_indices]
+		))
+		ion_ratio = len(self.dia_data.intensity_values) / max(sampled_ion_count, 1)
+		for stage_name, (kernel, scan_function, buffer) in self.get_sampled_kernels().items():
+			stage = self.estimate_sampled_kernel(kernel, scan_function, buffer, scan_indices)
+			stage['ion_pairs'] = int(stage['ion_pairs'] * ion_ratio)
+			stage['neighbor_scans'] = int(stage['neighbor_scans'] * ion_ratio)
+			stage['empty_neighbor_scans'] = int(stage['empty_neighbor_scans'] * ion_ratio)
+			stage['wall_time_s'] *= ion_ratio * measured_thread_count / thread_count
+			reference_stage = stages.get(stage_name, {})
+			stage['memory_bytes'] = reference_stage.get('memory_bytes', buffer.nbytes)
+			if 'wall_time_s' in reference_stage:
+				stage['reference_wall_time_s'] = reference_stage['wall_time_s']
+			stages[stage_name] = dict(stage, source='sample')
+			self.logger.root_logger.info(
+				f'{stage_name}: {stage["ion_pairs"]} ion pairs, {stage["wall_time_s"]:.1f} s'
+			)
+		estimate = {
+			'sample_file_name': self.config_file_content['sample_file_name'],
+			'acquisition': {
+				'frame_count': len(self.dia_data.rt_values),
+				'scan_count': len(self.dia_data.im_values),
+				'cycle_shape': list(self.dia_data.cycle.shape),
+				'ion_count': len(self.dia_data.intensity_values),
+			},
+			'number_of_threads': thread_count,
+			'measured_number_of_threads': measured_thread_count,
+			'sample': {
+				'fraction': self.sample_fraction,
+				'scan_count': len(scan_indices),
+				'ion_count': sampled_ion_count,
+			},
+			'loading': loading,
+			'stages': stages,
+			'stages_without_estimate': [
+				stage.name for stage in self.get_stages() if stage.name not in stages
+			],
+			'wall_time_s': loading['wall_time_s'] + sum(stage['wall_time_s'] for stage in stages.values()),
+			'peak_rss_bytes': loaded_rss_bytes + max(
+				[stage['memory_bytes'] for stage in stages.values()] + [0]
+			),
+		}
+		with open(self.estimate_file_name, 'w') as estimate_file:
+			json.dump(estimate, estimate_file, indent=2)
+		self.logger.root_logger.info(
+			f'estimated {estimate["wall_time_s"]:.0f} s and {estimate["peak_rss_bytes"] / 1024**3:.2f} GB '
+			f'with {thread_count} threads'
+		)
+		if estimate['stages_without_estimate']:
+			self.logger.root_logger.warning(
+				'no estimate without a reference for: ' + ', '.join(estimate['stages_without_estimate'])
+			)
+		self.logger.root_logger.info(f'estimate saved to {self.estimate_file_name}')
+		return estimate
+
+	def get_sampled_kernels(self) -> dict:
+		"""
+		Get the kernels whose neighbour search runs on the sampled scans.
+
+		Returns:
+		- dict: The kernel, its function that processes a single scan and the
+			buffer it writes to, by stage name.
+		"""
+		self.smoothing_parameters = self.config_file_content['smoothing']
+		self.clustering_parameters = self.config_file_content['clustering']
+		smoother = self.get_smoother(self.dia_data)
+		# the clustering neighbour search only compares intensities, so the
+		# raw intensities stand in for the smoothed ones
+		clusterer = self.get_clusterer(self.dia_data, self.dia_data.intensity_values)
+		return {
+			'smoothing': (
+				smoother,
+				smoother.smooth_scan,
+				timspeak.performance_utilities.memory.zeros_like(self.dia_data.intensity_values)
+			),
+			'clustering': (
+				clusterer,
+				clusterer.find_most_intense_neighbors_of_scan,
+				timspeak.performance_utilities.memory.arange(len(self.dia_data.intensity_values))
+			),
+		}
+
+	def estimate_sampled_kernel(
+		self,
+		kernel,
+		scan_function,
+		buffer: np.ndarray,
+		scan_indices: np.ndarray
+	) -> dict:
+		counter = timspeak.performance_utilities.neighbor_work.get_neighbor_work_counter(kernel)
+		neighbor_work = dict(zip(
+			timspeak.performance_utilities.neighbor_work.NEIGHBOR_WORK_NAMES,
+			counter.count_scans(scan_indices)
+		))
+		parallel_scan_function = timspeak.performance_utilities.multiprocessing.parallel(
+			scan_function,
+			include_progress_callback=False
+		)
+		# the first call compiles
+		parallel_scan_function(scan_indices[:1], buffer)
+		start_time = time.perf_counter()
+		parallel_scan_function(scan_indices, buffer)
+		estimate = {'wall_time_s': time.perf_counter() - start_time}
+		for name, counts in neighbor_work.items():
+			estimate[name] = int(np.sum(counts))
+		return estimate
@@ -0,0 +1,324 @@
+import os
+import json
+import time
+import tempfile
+import numpy as np
+import timspeak
+import timspeak.io_interface.logger
+import timspeak.io_interface.input.read_content
+import timspeak.io_interface.output.write_content
+import timspeak.data_handlers.synthetic_data
+import timspeak.execution_pipeline.benchmark_pipeline
+
+
+IO_BENCHMARK_FORMATS = ('hdf', 'zarr')
+# contiguous: every array is written at once, as by the main pipeline, and
+# can be memory-mapped; appended: the smoothed intensities and clusters are
+# appended in chunks, as by the stream pipeline
+IO_BENCHMARK_SETTINGS = ('contiguous', 'appended')
+# pointer and value arrays that later stages read a slice at a time
+RANDOM_ACCESS_DATASETS = {
+	'clusters': ('clustering/raw_pointers/indptr', 'clustering/raw_pointers/indices'),
+	'xics': ('clustering/rt_projection/indptr', 'clustering/rt_projection/summed_intensity_values'),
+	'mobilograms': ('clustering/im_projection/indptr', 'clustering/im_projection/summed_intensity_values'),
+}
+
+
+def get_file_names(file_name: str) -> list:
+	if not os.path.isdir(file_name):
+		return [file_name]
+	return [
+		os.path.join(path_name, name)
+		for path_name, directory_names, names in os.walk(file_name)
+		for name in names
+	]
+
+
+def get_file_size(file_name: str) -> int:
+	"""
+	Get the size on disk of an output file, or of all files in the
+	directory of a ZARR store.
+	"""
+	return sum(os.path.getsize(name) for name in get_file_names(file_name))
+
+
+def evict_file(file_name: str) -> None:
+	"""
+	Ask the operating system to drop an output file from its page cache, so
+	that it is read from disk again. Does nothing where this is not supported.
+	"""
+	if not hasattr(os, 'posix_fadvise'):
+		return
+	for name in get_file_names(file_name):
+		file_descriptor = os.open(name, os.O_RDONLY)
+		try:
+			os.fsync(file_descriptor)
+			os.posix_fadvise(file_descriptor, 0, 0, os.POSIX_FADV_DONTNEED)
+		finally:
+			os.close(file_descriptor)
+
+
+def split_clusters(
+	cluster_index,
+	cluster3d_stats,
+	chunk_count: int
+) -> list:
+	"""
+	Split the clusters of a completed run in chunks as appended by the
+	stream pipeline.
+
+	Returns:
+	- list: A dictionary with the pointers, ions and statistics of the
+		clusters of every chunk.
+	"""
+	cluster_borders = np.linspace(0, len(cluster_index.indptr) - 1, chunk_count + 1).astype(np.int64)
+	chunks = []
+	for start, end in zip(cluster_borders[:-1], cluster_borders[1:]):
+		indptr = cluster_index.indptr[start: end + 1]
+		chunk = {
+			'indptr': indptr - indptr[0],
+			'values': cluster_index.values[indptr[0]: indptr[-1]],
+		}
+		for name in ('apex_indices', 'sizes', 'frame_groups', 'mz_values', 'im_values', 'rt_values', 'intensity_values'):
+			chunk[name] = getattr(cluster3d_stats, name)[start: end]
+		chunks.append(chunk)
+	return chunks
+
+
+def get_output_writes(pipeline, setting: str, chunk_count: int) -> list:
+	"""
+	Get the writes of the representative arrays of a completed run: the
+	smoothed intensities, the cluster pointers, the XICs and mobilograms
+	and the charge 2 isotope pointers.
+
+	Parameters:
+	- pipeline: timspeak.execution_pipeline.benchmark_pipeline.SyntheticPipeline
+		The completed run.
+	- setting: str
+		The name of the setting in IO_BENCHMARK_SETTINGS.
+	- chunk_count: int
+		The number of chunks in which arrays are appended.
+
+	Returns:
+	- list: The name of the function of the output format and its arguments
+		for every write.
+	"""
+	if setting == 'contiguous':
+		writes = [
+			('print_smoothing_data', (pipeline.smoothing_parameters, pipeline.smooth_intensity_values)),
+			('print_clustering_raw_pointers', (pipeline.cluster_index,)),
+		]
+	else:
+		smooth_intensity_chunks = np.array_split(pipeline.smooth_intensity_values, chunk_count)
+		cluster_chunks = split_clusters(pipeline.cluster_index, pipeline.cluster3d_stats, chunk_count)
+		writes = []
+		for smooth_intensity_values, clusters in zip(smooth_intensity_chunks, cluster_chunks):
+			writes.append(('append_smoothing_data', (pipeline.smoothing_parameters, smooth_intensity_values)))
+			writes.append(('append_clustering_data', (pipeline.clustering_parameters, clusters)))
+	return writes + [
+		(
+			'print_clustering_rt_projection',
+			(pipeline.cluster3d_stats, pipeline.xics, pipeline.xic_indptr, pipeline.cycle_length)
+		),
+		(
+			'print_clustering_im_projection',
+			(pipeline.cluster3d_stats, pipeline.mobilograms, pipeline.mobilogram_indptr)
+		),
+		(
+			'print_ms1_isotopes_charge_2',
+			(
+				pipeline.ms1_isotopes_charge_2_parameters,
+				pipeline.lower_isotope_pointers_2,
+				pipeline.upper_isotope_pointers_2
+			)
+		),
+	]
+
+
+class IOBenchmarkPipeline:
+	"""
+	Write and read back the representative arrays of a run on a generated
+	acquisition with every output format and setting.
+
+	For every format and setting, the arrays are written to a new output
+	file, through the print_ and append_ functions of the output format, and
+	read back through its read_mem_map. The fastest of several repeats
+	counts for the throughputs; the latencies are medians.
+
+	Parameters:
+	- config_file_name: str
+		(Default: the default configuration)
+		The configuration file.
+	- size: str
+		(Default: medium)
+		The name of the acquisition size in BENCHMARK_SIZES.
+	- output_formats: list
+		(Default: all IO_BENCHMARK_FORMATS)
+		The output formats.
+	- settings: list
+		(Default: all IO_BENCHMARK_SETTINGS)
+		The settings.
+	- repeats: int
+		(Default: 3)
+		The number of output files written with every format and setting.
+	- output_file_name: str
+		(Default: timspeak_io_benchmark.json)
+		The JSON file in which the results are written.
+	- directory: str
+		(Default: the temporary directory of the system)
+		The directory in which the output files are written, i.e. the disk
+		that is measured.
+	- chunk_count: int
+		(Default: 16)
+		The number of chunks in which arrays are appended.
+	- random_access_count: int
+		(Default: 1000)
+		The number of random slices read from every pointer and value array.
+	- evict: bool
+		(Default: True)
+		Drop every output file from the page cache before reading it, so that
+		reads come from disk instead of memory.
+	"""
+
+	def __init__(
+		self,
+		config_file_name: str = None,
+		size: str = 'medium',
+		output_formats: list = None,
+		settings: list = None,
+		repeats: int = 3,
+		output_file_name: str = 'timspeak_io_benchmark.json',
+		directory: str = None,
+		chunk_count: int = 16,
+		random_access_count: int = 1000,
+		evict: bool = True
+	) -> None:
+		self.config_file_name = config_file_name or timspeak.execution_pipeline.benchmark_pipeline.get_default_config_file_name()
+		self.size = size
+		self.output_formats = output_formats or list(IO_BENCHMARK_FORMATS)
+		self.settings = settings or list(IO_BENCHMARK_SETTINGS)
+		self.repeats = repeats
+		self.output_file_name = output_file_name
+		self.directory = directory
+		self.chunk_count = chunk_count
+		self.random_access_count = random_access_count
+		self.evict = evict
+
+	def run(self) -> dict:
+		self.logger = timspeak.io_interface.logger.Logger()
+		self.logger.root_logger.info('---------- I/O BENCHMARK ----------')
+		object_read_content = timspeak.io_interface.input.read_content.ReadContent()
+		config_file_content = object_read_content.start_reading(self.config_file_name)
+		gradient_length = timspeak.execution_pipeline.benchmark_pipeline.BENCHMARK_SIZES[self.size]
+		sample = timspeak.data_handlers.synthetic_data.generate_sample(gradient_length=gradient_length)
+		measurements = {}
+		with tempfile.TemporaryDirectory() as directory:
+			pipeline = timspeak.execution_pipeline.benchmark_pipeline.SyntheticPipeline(
+				timspeak.execution_pipeline.benchmark_pipeline.write_synthetic_config_file(
+					config_file_content,
+					directory,
+					f'synthetic_{self.size}'
+				),
+				sample,
+				self.logger
+			)
+			pipeline.run()
+			for output_format in self.output_formats:
+				for setting in self.settings:
+					self.logger.root_logger.info(f'---------- I/O BENCHMARK {output_format.upper()} {setting.upper()} ----------')
+					measurements[f'{output_format}_{setting}'] = self.measure(
+						output_format,
+						get_output_writes(pipeline, setting, self.chunk_count)
+					)
+		results = {
+			'version': timspeak.__version__,
+			'size': self.size,
+			'repeats': self.repeats,
+			'chunk_count': self.chunk_count,
+			'evict': self.evict,
+			'measurements': measurements,
+		}
+		with open(self.output_file_name, 'w') as results_file:
+			json.dump(results, results_file, indent=2)
+		self.logger.root_logger.info(f'I/O benchmark results saved to {self.output_file_name}')
+		self.logger.root_logger.info('I/O benchmark ended')
+		return results
+
+	def measure(self, output_format: str, writes: list) -> dict:
+		output_format_class = timspeak.io_interface.output.write_content.output_function(output_format)
+		write_times = []
+		read_times = []
+		open_latencies = []
+		random_access_latencies = {name: [] for name in RANDOM_ACCESS_DATASETS}
+		with tempfile.TemporaryDirectory(dir=self.directory) as directory:
+			for repeat in range(self.repeats):
+				output_file_name = os.path.join(directory, f'io_benchmark_{repeat}.{output_format}')
+				start_time = time.perf_counter()
+				output_format_object = timspeak.io_interface.output.write_content.WriteObject.init_writing_object(
+					output_file_name
+				)
+				for function_name, args in writes:
+					getattr(output_format_object, function_name)(*args)
+				write_times.append(time.perf_counter() - start_time)
+				dataset_sizes = output_format_class.read_dataset_sizes(file_name=output_file_name)
+				read_time = 0
+				for mmap_name in dataset_sizes:
+					open_latency, array_read_time = self.read_dataset(output_format_class, output_file_name, mmap_name)
+					open_latencies.append(open_latency)
+					read_time += array_read_time
+				read_times.append(read_time)
+				for name, (indptr_name, values_name) in RANDOM_ACCESS_DATASETS.items():
+					random_access_latencies[name].append(
+						self.read_random_slices(output_format_class, output_file_name, indptr_name, values_name)
+					)
+			file_size = get_file_size(output_file_name)
+		data_bytes = sum(dataset_sizes.values())
+		measurement = {
+			'data_bytes': data_bytes,
+			'file_size_bytes': file_size,
+			'datasets': len(dataset_sizes),
+			'write_s': min(write_times),
+			'write_mb_per_s': data_bytes / min(write_times) / 1e6,
+			'read_s': min(read_times),
+			'read_mb_per_s': data_bytes / min(read_times) / 1e6,
+			'open_latency_s': float(np.median(open_latencies)),
+			'random_access_latency_s': {
+				name: float(np.median(latencies)) for name, latencies in random_access_latencies.items()
+			},
+		}
+		self.logger.root_logger.info(
+			f'{output_format}: {data_bytes / 1e6:.1f} MB in a {file_size / 1e6:.1f} MB file, '
+			f'write {measurement["write_mb_per_s"]:.1f} MB/s, read {measurement["read_mb_per_s"]:.1f} MB/s, '
+			f'open {measurement["open_latency_s"] * 1e3:.2f} ms, random access ' +
+			', '.join(
+				f'{name} {latency * 1e6:.1f} us'
+				for name, latency in measurement['random_access_latency_s'].items()
+			)
+		)
+		return measurement
+
+	def read_dataset(self, output_format_class, output_file_name: str, mmap_name: str) -> tuple:
+		if self.evict:
+			evict_file(output_file_name)
+		start_time = time.perf_counter()
+		array = output_format_class.read_mem_map(file_name=output_file_name, mmap_name=f'/{mmap_name}')
+		open_latency = time.perf_counter() - start_time
+		np.array(array)
+		return open_latency, time.perf_counter() - start_time
+
+	def read_random_slices(
+		self,
+		output_format_class,
+		output_file_name: str,
+		indptr_name: str,
+		values_name: str
+	) -> float:
+		if self.evict:
+			evict_file(output_file_name)
+		indptr = output_format_class.read_mem_map(file_name=output_file_name, mmap_name=f'/{indptr_name}')
+		values = output_format_class.read_mem_map(file_name=output_file_name, mmap_name=f'/{values_name}')
+		slice_indices = np.random.default_rng(0).integers(0, len(indptr) - 1, self.random_access_count)
+		start_time = time.perf_counter()
+		for slice_index in slice_indices:
+			np.array(values[indptr[slice_index]: indptr[slice_index + 1]])
+		return (time.perf_counter() - start_time) / self.random_access_count
@@ -1,4 +1,6 @@
 
+import time
+import numpy as np
 import alphatims.dia_data
 import timspeak.io_interface.logger
 import timspeak.io_interface.input.extract_in_extensions
@@ -7,11 +9,20 @@ import timspeak.io_interface.input.read_content
 import timspeak.io_interface.output.extract_out_extensions
 import timspeak.io_interface.output.check_out_name
 import timspeak.io_interface.output.write_content
+import timspeak.io_interface.output.background_writer
+import timspeak.io_interface.output.in_memory
+import timspeak.performance_utilities.memory
+import timspeak.performance_utilities.tracing
+import timspeak.performance_utilities.memory_sampler
+import timspeak.performance_utilities.neighbor_work
+import timspeak.data_handlers.rt_windows
+import timspeak.execution_pipeline.stage_graph
 
 class IOPipeline:
 
 	def initialize_logger(self) -> None:
-		self.logger = timspeak.io_interface.logger.Logger()
+		if not hasattr(self, 'logger'):
+			self.logger = timspeak.io_interface.logger.Logger()
 
 	def set_input_objects(self) -> None:
 		self.logger.root_logger.info('---------- SET INPUT OBJECTS ----------')
@@ -42,11 +53,53 @@ class IOPipeline:
 		self.logger.root_logger.info('---------- SET NUMBER OF THREADS ----------')
 		timspeak.performance_utilities.multiprocessing.set_threads(self.config_file_content['number_of_threads'])
 		self.logger.root_logger.info(f'number of threads: {self.config_file_content["number_of_threads"]}')
+		parallel_schedule = timspeak.performance_utilities.multiprocessing.set_parallel_schedule(
+			self.config_file_content.get('parallel_schedule', 'balanced')
+		)
+		self.logger.root_logger.info(f'parallel schedule: {parallel_schedule}')
+		placement_cpus = timspeak.performance_utilities.multiprocessing.set_thread_placement(
+			self.config_file_content.get('thread_placement', 'none')
+		)
+		self.logger.root_logger.info(
+			f'thread placement: {timspeak.performance_utilities.multiprocessing.THREAD_PLACEMENT}'
+		)
+		if placement_cpus is not None:
+			numa_nodes = timspeak.performance_utilities.multiprocessing.get_numa_nodes()
+			self.logger.root_logger.info(
+				f'numa nodes: {len(numa_nodes)}, cpus of the worker threads: '
+				f'{", ".join(str(cpu) for cpu in placement_cpus[:timspeak.performance_utilities.multiprocessing.get_threads()])}'
+			)
+		parallel_backend = timspeak.performance_utilities.multiprocessing.set_parallel_backend(
+			self.config_file_content.get('parallel_backend', 'threads'),
+			self.config_file_content.get('parallel_backend_overrides', None)
+		)
+		numba_threading_layer = timspeak.performance_utilities.multiprocessing.set_numba_threading_layer(
+			self.config_file_content.get('numba_threading_layer', 'default')
+		)
+		self.logger.root_logger.info(f'parallel backend: {parallel_backend}')
+		backend_overrides = timspeak.performance_utilities.multiprocessing.PARALLEL_BACKEND_OVERRIDES
+		for kernel_name, backend in backend_overrides.items():
+			self.logger.root_logger.info(f'parallel backend of {kernel_name}: {backend}')
+		if 'numba' in [parallel_backend] + list(backend_overrides.values()):
+			numba_threading_layer = timspeak.performance_utilities.multiprocessing.start_numba_threads()
+		self.logger.root_logger.info(f'numba threading layer: {numba_threading_layer}')
+
+	def set_memory_budget(self) -> None:
+		self.logger.root_logger.info('---------- SET MEMORY BUDGET ----------')
+		max_memory_gb = self.config_file_content.get('max_memory_gb', None)
+		timspeak.performance_utilities.memory.set_max_memory(max_memory_gb)
+		scratch_directory = timspeak.performance_utilities.memory.set_scratch_directory(
+			self.config_file_content.get('scratch_directory', None)
+		)
+		self.logger.root_logger.info(f'max memory (GB): {max_memory_gb}')
+		self.logger.root_logger.info(f'scratch directory: {scratch_directory}')
 
 	def set_output_objects(self) -> None:
 		self.logger.root_logger.info('---------- SET OUTPUT OBJECTS ----------')
 		self.check_output_file_name()
 		self.initialize_output_object()
+		self.read_completed_stages()
+		self.set_neighbor_work_counting()
 
 	def check_output_file_name(self) -> None:
 		object_output_extensions = timspeak.io_interface.output.extract_out_extensions.ExtractOutputExtensions()
@@ -60,7 +113,132 @@ class IOPipeline:
 
 	def initialize_output_object(self) -> None:
 		output_object = timspeak.io_interface.output.write_content.WriteObject()
-		self.output_format_object = output_object.init_writing_object(self.output_file_name)
+		self.output_format_object = output_object.init_writing_object(self.output_file_name, self.resume)
+		self.in_memory = bool(self.config_file_content.get('in_memory', False))
+		self.background_writer = bool(self.config_file_content.get('background_writer', False)) or self.in_memory
+		if self.background_writer:
+			self.output_format_object = timspeak.io_interface.output.background_writer.BackgroundWriter(
+				self.output_format_object,
+				max_memory_gb=float(self.config_file_content.get('background_writer_memory_gb', 2.0))
+			)
+		if self.in_memory:
+			self.output_format_object = timspeak.io_interface.output.in_memory.InMemoryOutput(self.output_format_object)
+		self.logger.root_logger.info(f'background writer: {self.background_writer}')
+		self.logger.root_logger.info(f'in memory: {self.in_memory}')
+
+	def start_tracing(self) -> None:
+		import os
+		self.trace_file_name = None
+		if not self.config_file_content.get('trace', False):
+			return
+		self.trace_file_name = f'{os.path.splitext(self.output_file_name)[0]}_trace.json'
+		timspeak.performance_utilities.tracing.start_tracing()
+		timspeak.performance_utilities.tracing.name_thread('pipeline')
+		self.logger.root_logger.info(f'tracing to {self.trace_file_name}')
+
+	def stop_tracing(self) -> None:
+		if getattr(self, 'trace_file_name', None) is None:
+			return
+		timspeak.performance_utilities.tracing.stop_tracing(self.trace_file_name)
+		self.logger.root_logger.info(f'trace saved to {self.trace_file_name}')
+
+	def start_memory_sampler(self) -> None:
+		self.memory_sampler = None
+		memory_sample_interval = self.config_file_content.get('memory_sample_interval', None)
+		if memory_sample_interval is None:
+			return
+		self.memory_sampler = timspeak.performance_utilities.memory_sampler.MemorySampler(
+			float(memory_sample_interval)
+		)
+		self.memory_sampler.start()
+		self.logger.root_logger.info(f'sampling memory every {memory_sample_interval} s')
+
+	def stop_memory_sampler(self) -> None:
+		if getattr(self, 'memory_sampler', None) is None:
+			return
+		self.memory_sampler.stop()
+
+	def set_neighbor_work_counting(self) -> None:
+		self.count_neighbor_work = bool(self.config_file_content.get('count_neighbor_work', False))
+		self.neighbor_work = {}
+		self.neighbor_work_times = {}
+		self.logger.root_logger.info(f'count neighbor work: {self.count_neighbor_work}')
+
+	def add_neighbor_work(
+		self,
+		stage_name: str,
+		kernel,
+		partition_dia_data=None
+	) -> None:
+		"""
+		Count the neighbour work of a kernel that ran for a stage and add it
+		to the neighbour work of the stage. The time of counting is kept
+		apart, so that it is not charged to the stage.
+
+		Parameters:
+		- stage_name: str
+			The stage the kernel ran for.
+		- kernel:
+			The Smoother, Clusterer or ChargeDeisotoper that ran.
+		- partition_dia_data:
+			(Default: None)
+			The WindowDiaData or FrameGroupDiaData the kernel ran on, whose
+			counts are added to the frames of the acquisition. None means
+			the kernel ran on the whole acquisition.
+		"""
+		if not getattr(self, 'count_neighbor_work', False):
+			return
+		start_wall_time = time.perf_counter()
+		start_cpu_time = time.process_time()
+		with timspeak.performance_utilities.tracing.span(f'{stage_name} neighbor work', 'neighbor_work'):
+			neighbor_work = timspeak.performance_utilities.neighbor_work.count_neighbor_work(kernel)
+		if stage_name not in self.neighbor_work:
+			self.neighbor_work[stage_name] = {
+				name: np.zeros((len(self.dia_data.rt_values), len(self.dia_data.im_values)), dtype=np.int64)
+				for name in neighbor_work
+			}
+		for name, counts in neighbor_work.items():
+			if partition_dia_data is None:
+				self.neighbor_work[stage_name][name] += counts
+			else:
+				# the zeroth frame of a partition is empty
+				frames = partition_dia_data.get_global_frames(np.arange(1, len(counts)))
+				self.neighbor_work[stage_name][name][frames] += counts[1:]
+		wall_time, cpu_time = self.neighbor_work_times.get(stage_name, (0.0, 0.0))
+		self.neighbor_work_times[stage_name] = (
+			wall_time + time.perf_counter() - start_wall_time,
+			cpu_time + time.process_time() - start_cpu_time
+		)
+
+	def save_neighbor_work(self, stage_name: str) -> None:
+		neighbor_work = self.neighbor_work.pop(stage_name)
+		self.output_format_object.print_neighbor_work(stage_name, neighbor_work)
+		self.logger.root_logger.info(
+			f'{stage_name} neighbor work saved: ' +
+			', '.join(f'{name} {np.sum(counts)}' for name, counts in neighbor_work.items())
+		)
+
+	def read_completed_stages(self) -> None:
+		import os
+		stage_graph = timspeak.execution_pipeline.stage_graph.StageGraph(self.get_stages())
+		self.stage_signatures = stage_graph.get_signatures(self.config_file_content)
+		self.completed_stages = []
+		if not (self.resume and os.path.exists(self.output_file_name)):
+			return
+		recorded_signatures = self.output_format_object.read_completed_stages(
+			file_name=self.output_file_name
+		)
+		# a stage is only restored if it ran with the same configuration and
+		# all stages it depends on are restored as well
+		for stage in stage_graph.get_topological_order():
+			if stage.name not in recorded_signatures:
+				continue
+			if recorded_signatures[stage.name] != self.stage_signatures[stage.name]:
+				self.logger.root_logger.info(f'configuration of stage {stage.name} changed, it is recomputed')
+				continue
+			if stage_graph.dependencies[stage.name] <= set(self.completed_stages):
+				self.completed_stages.append(stage.name)
+		self.logger.root_logger.info(f'completed stages: {", ".join(self.completed_stages) or "none"}')
 
 	def save_sample_info(self) -> None:
 		self.output_format_object.record_sample(self.config_file_content['sample_file_name'])
@@ -76,6 +254,33 @@ class IOPipeline:
 	def get_cycle_lenght(self) -> None:
 		self.cycle_length = self.dia_data.cycle.shape[1]
 
+	def set_rt_windows(self) -> None:
+		self.rt_windows = None
+		rt_window_size = self.config_file_content.get('rt_window_size', None)
+		if rt_window_size is None:
+			return
+		self.logger.root_logger.info('---------- SET RT WINDOWS ----------')
+		smoothing_rt_tolerance = self.config_file_content['smoothing']['rt_tolerance']
+		self.rt_window_halo = self.config_file_content.get('rt_window_halo', None)
+		if self.rt_window_halo is None:
+			self.rt_window_halo = smoothing_rt_tolerance + 2 * self.config_file_content['clustering']['rt_tolerance']
+		# owned frames are only smoothed as without RT windows if the halo covers their neighbours
+		self.rt_window_halo = max(self.rt_window_halo, smoothing_rt_tolerance)
+		self.rt_windows = timspeak.data_handlers.rt_windows.get_rt_windows(
+			self.dia_data,
+			rt_window_size,
+			self.rt_window_halo
+		)
+		self.logger.root_logger.info(f'rt window size (s): {rt_window_size}')
+		self.logger.root_logger.info(f'rt window halo (s): {self.rt_window_halo}')
+		self.logger.root_logger.info(f'number of rt windows: {len(self.rt_windows)}')
+
 	def save_acquisition(self) -> None:
 		self.output_format_object.record_acquisition(self.dia_data)
 		self.logger.root_logger.info('acquisition (cycle and tof_indptr) saved to file')
+
+	def close_output_object(self) -> None:
+		if self.background_writer:
+			self.logger.root_logger.info('waiting for output file to be written')
+			self.output_format_object.close()
+			self.logger.root_logger.info('output file written')
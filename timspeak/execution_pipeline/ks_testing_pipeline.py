@@ -9,12 +9,9 @@ class KsTestingPipeline(
 	timspeak.execution_pipeline.metrics_1dprojections_pipeline.Metrics1dProjectionsPipeline
 ):
 
-	def ks_testing(
-		self,
-		cluster_3d_stats: timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D
-	) -> None:
+	def ks_testing(self) -> None:
 		self.logger.root_logger.info('---------- KS TESTING ----------')
-		ks_tester = self.get_ks_tester(cluster_3d_stats)
+		ks_tester = self.get_ks_tester(self.cluster3d_stats)
 		ks_values_rt_im2 = self.get_ks_values(ks_tester, self.isotopic_pairs_2, '2')
 		self.save_ks_values_2(ks_values_rt_im2)
 		self.create_mmaps_for_ks_values_2()
@@ -22,6 +19,11 @@ class KsTestingPipeline(
 		self.save_ks_values_3(ks_values_rt_im3)
 		self.create_mmaps_for_ks_values_3()
 
+	def restore_ks_testing(self) -> None:
+		self.logger.root_logger.info('---------- KS TESTING (RESTORED) ----------')
+		self.create_mmaps_for_ks_values_2()
+		self.create_mmaps_for_ks_values_3()
+
 	def get_ks_tester(
 		self,
 		cluster3d_stats: timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D
@@ -1,7 +1,12 @@
 
 import numpy as np
 import timspeak.execution_pipeline.ms2_fragments_pipeline
+import timspeak.execution_pipeline.stage_graph
+import timspeak.io_interface.logger
 import timspeak.statistical_utilities.ks_1d
+import timspeak.performance_utilities.multiprocessing
+import timspeak.performance_utilities.stage_performance
+import timspeak.performance_utilities.tracing
 
 class MainPipeline(
     timspeak.execution_pipeline.ms2_fragments_pipeline.Ms2FragmentsPipeline
@@ -11,9 +16,14 @@ class MainPipeline(
         self,
         config_file_name: str,
         cmdln_sample_file_name: str = None,
-        cmdln_output_file_name: str = None
+        cmdln_output_file_name: str = None,
+        resume: bool = False,
+        logger: timspeak.io_interface.logger.Logger = None
     ) -> None:
         object.__setattr__(self, 'config_file_name', config_file_name)
+        object.__setattr__(self, 'resume', resume)
+        if logger is not None:
+            object.__setattr__(self, 'logger', logger)
         if cmdln_sample_file_name is not None:
             object.__setattr__(self, 'cmdln_sample_file_name', cmdln_sample_file_name)
         if cmdln_output_file_name is not None:
@@ -23,18 +33,213 @@ class MainPipeline(
         self.initialize_logger()
         self.set_input_objects()
         self.set_number_of_threads()
+        self.set_memory_budget()
         self.set_output_objects()
-        self.save_sample_info()
-        self.save_package_info()
-        self.load_dia_data()
-        self.get_cycle_lenght()
-        self.save_acquisition()
-        self.smoothing()
-        cluster3d_stats = self.clustering()
-        self.ms1_precursors(cluster3d_stats)
-        self.deisotoping(cluster3d_stats)
-        self.metrics_for_1d_projections()
-        self.ks_testing(cluster3d_stats)
-        self.mono_isotopes()
-        self.ms2_fragments(cluster3d_stats)
+        self.start_tracing()
+        self.start_memory_sampler()
+        try:
+            self.save_sample_info()
+            self.save_package_info()
+            self.load_dia_data()
+            self.get_cycle_lenght()
+            self.set_rt_windows()
+            self.set_shards()
+            self.save_acquisition()
+            try:
+                self.run_stages()
+                self.stop_memory_sampler()
+                self.save_stage_performances()
+            finally:
+                self.close_output_object()
+        finally:
+            self.stop_memory_sampler()
+            self.stop_tracing()
         self.logger.root_logger.info('execution ended')
+
+    def get_stages(self) -> list:
+        Stage = timspeak.execution_pipeline.stage_graph.Stage
+        return [
+            Stage(
+                'smoothing', self.smoothing, self.restore_smoothing,
+                inputs=('dia_data',),
+                outputs=('smooth_intensity_values',),
+                parameters=('smoothing',),
+                groups=('smoothing',)
+            ),
+            Stage(
+                'clustering', self.clustering, self.restore_clustering,
+                inputs=('dia_data', 'smooth_intensity_values'),
+                outputs=('cluster_index', 'cluster3d_stats', 'expanded_index_pointers'),
+                parameters=('clustering',),
+                groups=('clustering',)
+            ),
+            Stage(
+                'clustering_rt_projections', self.clustering_rt_projections, self.restore_clustering_rt_projections,
+                inputs=('cluster_index', 'cluster3d_stats', 'expanded_index_pointers'),
+                outputs=('xic_index', 'xic_offsets'),
+                groups=('clustering/rt_projection',)
+            ),
+            Stage(
+                'clustering_im_projections', self.clustering_im_projections, self.restore_clustering_im_projections,
+                inputs=('cluster_index', 'cluster3d_stats', 'expanded_index_pointers'),
+                outputs=('mobilogram_index', 'mobilogram_offsets'),
+                groups=('clustering/im_projection',)
+            ),
+            Stage(
+                'ms1_precursors', self.ms1_precursors, self.restore_ms1_precursors,
+                inputs=('cluster3d_stats',),
+                outputs=('precursor_indices', 'precursor_index'),
+                parameters=('ms1.precursors',),
+                groups=('ms1/precursors',)
+            ),
+            Stage(
+                'deisotoping_charge_2', self.deisotoping_charge_2, self.restore_deisotoping_charge_2,
+                inputs=('cluster3d_stats', 'precursor_indices', 'precursor_index'),
+                outputs=('isotopic_pairs_2', 'lower_isotope_pointers_2', 'upper_isotope_pointers_2'),
+                parameters=('ms1.isotopes.charge_2',),
+                groups=('ms1/isotopes/charge_2',)
+            ),
+            Stage(
+                'deisotoping_charge_3', self.deisotoping_charge_3, self.restore_deisotoping_charge_3,
+                inputs=('cluster3d_stats', 'precursor_indices', 'precursor_index'),
+                outputs=('isotopic_pairs_3', 'lower_isotope_pointers_3', 'upper_isotope_pointers_3'),
+                parameters=('ms1.isotopes.charge_3',),
+                groups=('ms1/isotopes/charge_3',)
+            ),
+            Stage(
+                'metrics_for_1d_projections', self.metrics_for_1d_projections, self.restore_metrics_for_1d_projections,
+                inputs=(
+                    'xic_index', 'xic_offsets', 'mobilogram_index', 'mobilogram_offsets',
+                    'precursor_indices', 'isotopic_pairs_2', 'isotopic_pairs_3'
+                ),
+                outputs=(
+                    'ks_values_rt_charge_2', 'ks_values_im_charge_2',
+                    'ks_values_rt_charge_3', 'ks_values_im_charge_3'
+                ),
+                groups=(
+                    'ms1/isotopes/charge_2/metrics/ks_distance_rt', 'ms1/isotopes/charge_2/metrics/ks_distance_im',
+                    'ms1/isotopes/charge_3/metrics/ks_distance_rt', 'ms1/isotopes/charge_3/metrics/ks_distance_im'
+                )
+            ),
+            Stage(
+                'ks_testing', self.ks_testing, self.restore_ks_testing,
+                inputs=(
+                    'cluster_index', 'cluster3d_stats', 'expanded_index_pointers',
+                    'precursor_index', 'isotopic_pairs_2', 'isotopic_pairs_3'
+                ),
+                outputs=('ks_values_rt_im_2', 'ks_values_rt_im_3'),
+                groups=(
+                    'ms1/isotopes/charge_2/metrics/ks_distance_im_rt', 'ms1/isotopes/charge_3/metrics/ks_distance_im_rt'
+                )
+            ),
+            Stage(
+                'mono_isotopes', self.mono_isotopes, self.restore_mono_isotopes,
+                inputs=(
+                    'precursor_indices', 'lower_isotope_pointers_2', 'upper_isotope_pointers_2',
+                    'lower_isotope_pointers_3', 'upper_isotope_pointers_3',
+                    'ks_values_rt_im_2', 'ks_values_rt_im_3'
+                ),
+                outputs=('monoisotopic_precursors', 'monoisotopic_charges'),
+                parameters=('ms1.isotopes.monoisotopic_precursors',),
+                groups=('ms1/monoisotopic_precursors',)
+            ),
+            Stage(
+                'ms2_fragments', self.ms2_fragments, self.restore_ms2_fragments,
+                inputs=('cluster3d_stats',),
+                outputs=('fragment_indices', 'fragment_index'),
+                parameters=('ms2.fragments',),
+                groups=('ms2',)
+            ),
+        ]
+
+    def run_stages(self) -> None:
+        max_concurrent_stages = int(self.config_file_content.get('max_concurrent_stages', 1))
+        self.logger.root_logger.info(f'max concurrent stages: {max_concurrent_stages}')
+        stage_graph = timspeak.execution_pipeline.stage_graph.StageGraph(self.get_stages())
+        self.stage_performances = {}
+        stage_graph.run(self.run_stage, max_concurrent_stages)
+
+    def run_stage(
+        self,
+        stage: timspeak.execution_pipeline.stage_graph.Stage
+    ) -> None:
+        if stage.name in self.completed_stages:
+            with timspeak.performance_utilities.tracing.span(stage.name, 'stage', restored=True):
+                stage.restore_function()
+            return
+        if self.memory_sampler is not None:
+            self.memory_sampler.start_stage(stage.name)
+        with timspeak.performance_utilities.tracing.span(stage.name, 'stage'):
+            with timspeak.performance_utilities.stage_performance.measure_stage() as stage_performance:
+                stage.function()
+        if stage.name in self.neighbor_work:
+            # counting ran within the stage, but is not part of its time
+            stage_performance.neighbor_work_time_s, neighbor_work_cpu_time_s = self.neighbor_work_times.pop(stage.name)
+            stage_performance.wall_time_s -= stage_performance.neighbor_work_time_s
+            stage_performance.cpu_time_s -= neighbor_work_cpu_time_s
+            self.save_neighbor_work(stage.name)
+        if self.memory_sampler is not None:
+            self.memory_sampler.stop_stage(stage.name)
+            stage_performance.memory_maxima = self.memory_sampler.get_stage_maxima(stage.name)
+        stage_performance.item_counts = self.get_item_counts(stage)
+        self.stage_performances[stage.name] = stage_performance
+        self.output_format_object.record_stage_completion(stage.name, self.stage_signatures[stage.name])
+        self.logger.root_logger.info(
+            f'stage {stage.name} completed in {stage_performance.wall_time_s:.2f} s '
+            f'(cpu {stage_performance.cpu_time_s:.2f} s, '
+            f'peak rss {stage_performance.peak_rss_bytes / 1024**3:.2f} GB)'
+        )
+
+    def get_item_counts(
+        self,
+        stage: timspeak.execution_pipeline.stage_graph.Stage
+    ) -> dict:
+        item_counts = {}
+        for name in stage.inputs + stage.outputs:
+            item_count = timspeak.performance_utilities.stage_performance.get_item_count(
+                getattr(self, name, None)
+            )
+            if item_count is not None:
+                item_counts['ion' if name == 'dia_data' else name] = item_count
+        return item_counts
+
+    def save_stage_performances(self) -> None:
+        if not self.stage_performances:
+            return
+        if self.background_writer:
+            self.output_format_object.flush()
+        bytes_written = timspeak.performance_utilities.stage_performance.get_bytes_written(
+            self.output_format_object.read_dataset_sizes(file_name=self.output_file_name),
+            {stage.name: stage.groups for stage in self.get_stages()}
+        )
+        for stage_name, stage_performance in self.stage_performances.items():
+            stage_performance.bytes_written = bytes_written[stage_name]
+            self.output_format_object.record_stage_performance(stage_name, stage_performance.as_dict())
+        report_file_name = timspeak.performance_utilities.stage_performance.get_report_file_name(
+            self.output_file_name
+        )
+        timspeak.performance_utilities.stage_performance.write_report(
+            report_file_name,
+            self.get_run_info(),
+            self.stage_performances,
+            None if self.memory_sampler is None else self.memory_sampler.get_timeline()
+        )
+        self.logger.root_logger.info(f'stage performances saved to {report_file_name}')
+
+    def get_run_info(self) -> dict:
+        import platform
+        from timspeak import __version__
+        return {
+            'version': __version__,
+            'sample_file_name': self.config_file_content['sample_file_name'],
+            'output_file_name': self.output_file_name,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'number_of_threads': timspeak.performance_utilities.multiprocessing.get_threads(),
+            'acquisition': {
+                'frame_count': len(self.dia_data.rt_values),
+                'scan_count': len(self.dia_data.im_values),
+                'cycle_length': self.cycle_length,
+                'ion_count': len(self.dia_data.intensity_values),
+            },
+        }
@@ -23,6 +23,11 @@ class Metrics1dProjectionsPipeline(
 		self.save_ks_values_rt_im_charge_3(ks_values_rt_charge_3, ks_values_im_charge_3)
 		self.create_mmaps_for_ks_values_rt_im_charge_3()
 
+	def restore_metrics_for_1d_projections(self) -> None:
+		self.logger.root_logger.info('---------- METRICS 1D PROJECTIONS (RESTORED) ----------')
+		self.create_mmaps_for_ks_values_rt_im_charge_2()
+		self.create_mmaps_for_ks_values_rt_im_charge_3()
+
 	def get_ks1_1d_xics(
 		self
 	) -> timspeak.statistical_utilities.ks_1d.KSTester1D:
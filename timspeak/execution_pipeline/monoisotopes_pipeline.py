@@ -13,6 +13,11 @@ class MonoIsotopesPipeline(
 		self.get_monoisotopic_charges(precursor_is_monoisotopic)
 		self.save_monoisotopic_precursors_charges()
 
+	def restore_mono_isotopes(self) -> None:
+		self.logger.root_logger.info('---------- DETERMINING MONO-ISOTOPES (RESTORED) ----------')
+		self.ks_2d_threshold = float(self.config_file_content['ms1']['isotopes']['monoisotopic_precursors']['ks_2d_threshold'])
+		self.create_mmaps_for_monoisotopic_precursors_charges()
+
 	def get_monoisotopic_precursors(self) -> np.ndarray:
 		self.ks_2d_threshold = float(self.config_file_content['ms1']['isotopes']['monoisotopic_precursors']['ks_2d_threshold'])
 		precursor_is_monoisotopic = np.zeros(len(self.precursor_indices), dtype=np.int64)
@@ -39,3 +44,14 @@ class MonoIsotopesPipeline(
 			self.monoisotopic_charges
 		)
 		self.logger.root_logger.info('monoisotopic_precursors and charges saved')
+
+	def create_mmaps_for_monoisotopic_precursors_charges(self) -> None:
+		self.monoisotopic_precursors = self.output_format_object.read_mem_map(
+			file_name=self.output_file_name,
+			mmap_name='/ms1/monoisotopic_precursors/as_dataframe/precursor_pointers'
+		)
+		self.monoisotopic_charges = self.output_format_object.read_mem_map(
+			file_name=self.output_file_name,
+			mmap_name='/ms1/monoisotopic_precursors/as_dataframe/charge'
+		)
+		self.logger.root_logger.info('monoisotopic_precursors and charges mapped')
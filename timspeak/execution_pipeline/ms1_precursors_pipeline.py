@@ -1,21 +1,24 @@
 
 import numpy as np
-import timspeak.execution_pipeline.cluster_pipeline
+import timspeak.execution_pipeline.shard_pipeline
 import timspeak.peak_picker_algorithms.cluster.clusters_stats
 
 class MS1PrecursorsPipeline(
-	timspeak.execution_pipeline.cluster_pipeline.ClusterPipeline
+	timspeak.execution_pipeline.shard_pipeline.ShardPipeline
 ):
 
-	def ms1_precursors(
-		self,
-		cluster3d_stats: timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D
-	) -> None:
+	def ms1_precursors(self) -> None:
 		self.logger.root_logger.info('---------- MS1 PRECURSORS ----------')
-		precursor_indices = self.get_precursor_indices(cluster3d_stats)
+		precursor_indices = self.get_precursor_indices(self.cluster3d_stats)
 		self.save_precursor_indices(precursor_indices)
 		self.create_mmaps_for_precursor_indices()
-		self.generate_sparse_precursor_index(cluster3d_stats)
+		self.generate_sparse_precursor_index(self.cluster3d_stats)
+
+	def restore_ms1_precursors(self) -> None:
+		self.logger.root_logger.info('---------- MS1 PRECURSORS (RESTORED) ----------')
+		self.ms1_precursor_min_size = int(self.config_file_content['ms1']['precursors']['min_size'])
+		self.create_mmaps_for_precursor_indices()
+		self.generate_sparse_precursor_index(self.cluster3d_stats)
 
 	def get_precursor_indices(
 		self,
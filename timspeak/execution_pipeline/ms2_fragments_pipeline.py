@@ -7,16 +7,20 @@ class Ms2FragmentsPipeline(
 	timspeak.execution_pipeline.monoisotopes_pipeline.MonoIsotopesPipeline
 ):
 
-	def ms2_fragments(
-		self,
-		cluster3d_stats: timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D
-	) -> None:
+	def ms2_fragments(self) -> None:
 		self.logger.root_logger.info('---------- MS2 FRAGMENTS ----------')
-		self.get_fragments_indices(cluster3d_stats)
-		self.get_fragments_indptr(cluster3d_stats)
+		self.get_fragments_indices(self.cluster3d_stats)
+		self.get_fragments_indptr(self.cluster3d_stats)
 		self.get_fragments_sparse_index()
 		self.save_fragments_indices()
 
+	def restore_ms2_fragments(self) -> None:
+		self.logger.root_logger.info('---------- MS2 FRAGMENTS (RESTORED) ----------')
+		self.ms2_fragments_min_size = int(self.config_file_content['ms2']['fragments']['min_size'])
+		self.create_mmaps_for_fragments_indices()
+		self.get_fragments_indptr(self.cluster3d_stats)
+		self.get_fragments_sparse_index()
+
 	def get_fragments_indices(
 		self,
 		cluster3d_stats: timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D
@@ -56,3 +60,9 @@ class Ms2FragmentsPipeline(
 		self.output_format_object.print_ms2_fragments(self.fragment_indices, self.ms2_fragments_min_size)
 		self.logger.root_logger.info('MS2 fragment_indices saved')
 
+	def create_mmaps_for_fragments_indices(self) -> None:
+		self.fragment_indices = self.output_format_object.read_mem_map(
+			file_name=self.output_file_name,
+			mmap_name='/ms2/fragments/cluster_pointers'
+		)
+		self.logger.root_logger.info('MS2 fragment_indices mapped')
@@ -0,0 +1,258 @@
+import os
+import json
+import hashlib
+import multiprocessing
+import concurrent.futures
+import numpy as np
+import timspeak.execution_pipeline.cluster_pipeline
+import timspeak.execution_pipeline.stage_graph
+import timspeak.data_handlers.rt_windows
+import timspeak.data_handlers.frame_groups
+import timspeak.peak_picker_algorithms.cluster.clusters_stats
+import timspeak.performance_utilities.memory
+import timspeak.performance_utilities.multiprocessing
+
+SHARD_PARTITIONS = ('rt_window', 'frame_group')
+
+
+def run_shard_in_process(
+	pipeline_class: type,
+	config_file_name: str,
+	sample_file_name: str,
+	output_file_name: str,
+	shard_index: int,
+	number_of_threads: int = None
+) -> str:
+	pipeline = pipeline_class(config_file_name, sample_file_name, output_file_name)
+	return pipeline.run_shard(shard_index, number_of_threads)
+
+
+class ShardPipeline(
+	timspeak.execution_pipeline.cluster_pipeline.ClusterPipeline
+):
+	"""
+	Smooth and cluster a sample as independent shards, either RT windows
+	(with halo) or DIA frame groups, in separate worker processes. Every
+	shard is written to a file in the shard directory; the smoothing and
+	clustering stages merge these into the global results, on which all
+	later stages run. Shards whose file already exists with the same
+	signature (sample, partition and smoothing and clustering configuration)
+	are not computed again, so shards can also be computed on other hosts
+	with run_shard, given a shard directory on a shared filesystem.
+	"""
+
+	def set_shards(self) -> None:
+		self.shard_partition = self.config_file_content.get('shard_partition', None)
+		if self.shard_partition is None:
+			return
+		self.logger.root_logger.info('---------- SET SHARDS ----------')
+		if self.shard_partition == 'rt_window':
+			if self.rt_windows is None:
+				raise ValueError('Sharding by rt_window requires an rt_window_size.')
+			self.shard_count = len(self.rt_windows)
+		elif self.shard_partition == 'frame_group':
+			self.shard_count = self.cycle_length
+		else:
+			raise ValueError(
+				f'Shard partition {self.shard_partition} is not one of {", ".join(SHARD_PARTITIONS)}.'
+			)
+		self.shard_processes = max(1, int(self.config_file_content.get('shard_processes', 1)))
+		self.shard_signature = self.get_shard_signature()
+		shard_directory = self.config_file_content.get('shard_directory', None)
+		if shard_directory is None:
+			output_file_name = os.path.abspath(self.config_file_content['output_file_name'])
+			shard_directory = f'{os.path.splitext(output_file_name)[0]}_shards'
+		# shards of other samples or configurations sharing the directory are kept apart
+		signature_hash = hashlib.sha1(self.shard_signature.encode()).hexdigest()[:12]
+		self.shard_directory = os.path.join(shard_directory, f'{self.get_sample_name()}_{signature_hash}')
+		os.makedirs(self.shard_directory, exist_ok=True)
+		self.logger.root_logger.info(f'shard partition: {self.shard_partition}')
+		self.logger.root_logger.info(f'number of shards: {self.shard_count}')
+		self.logger.root_logger.info(f'shard processes: {self.shard_processes}')
+		self.logger.root_logger.info(f'shard directory: {self.shard_directory}')
+
+	def get_sample_name(self) -> str:
+		sample_file_name = os.path.normpath(self.config_file_content['sample_file_name'])
+		return os.path.splitext(os.path.basename(sample_file_name))[0]
+
+	def get_shard_signature(self) -> str:
+		stage_signatures = timspeak.execution_pipeline.stage_graph.StageGraph(
+			[stage for stage in self.get_stages() if stage.name in ('smoothing', 'clustering')]
+		).get_signatures(self.config_file_content)
+		return json.dumps(
+			[
+				self.get_sample_name(),
+				self.shard_partition,
+				self.config_file_content.get('rt_window_size', None),
+				stage_signatures['smoothing'],
+				stage_signatures['clustering'],
+			]
+		)
+
+	def get_shard_file_name(self, shard_index: int) -> str:
+		return os.path.join(self.shard_directory, f'shard_{shard_index:03}.npz')
+
+	def get_shard_dia_data(self, shard_index: int):
+		if self.shard_partition == 'rt_window':
+			return timspeak.data_handlers.rt_windows.WindowDiaData(
+				dia_data=self.dia_data,
+				window=self.rt_windows[shard_index]
+			)
+		return timspeak.data_handlers.frame_groups.FrameGroupDiaData(
+			dia_data=self.dia_data,
+			frame_group=shard_index
+		)
+
+	def run_shard(self, shard_index: int, number_of_threads: int = None) -> str:
+		self.initialize_logger()
+		self.set_input_objects()
+		if number_of_threads is not None:
+			self.config_file_content['number_of_threads'] = number_of_threads
+		self.set_number_of_threads()
+		self.set_memory_budget()
+		self.load_dia_data()
+		self.get_cycle_lenght()
+		self.set_rt_windows()
+		self.set_shards()
+		if self.shard_partition is None:
+			raise ValueError('The configuration has no shard_partition.')
+		if not 0 <= shard_index < self.shard_count:
+			raise IndexError(f'Shard {shard_index} does not exist, there are {self.shard_count} shards.')
+		return self.compute_shard(shard_index)
+
+	def compute_shard(self, shard_index: int) -> str:
+		self.logger.root_logger.info(f'---------- SHARD {shard_index + 1} OF {self.shard_count} ----------')
+		self.smoothing_parameters = self.config_file_content['smoothing']
+		self.clustering_parameters = self.config_file_content['clustering']
+		if self.shard_partition == 'rt_window':
+			shard_dia_data, smooth_intensity_values, index_3d, cluster3d_stats = self.cluster_rt_window(
+				self.rt_windows[shard_index],
+				smooth=True
+			)
+		else:
+			shard_dia_data = self.get_shard_dia_data(shard_index)
+			smooth_intensity_values = self.smooth_dia_data(shard_dia_data)
+			index_3d = self.cluster_dia_data(shard_dia_data, smooth_intensity_values)
+			cluster3d_stats = timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D(
+				dia_data=shard_dia_data,
+				sparse_index=index_3d,
+				smooth_intensity_values=smooth_intensity_values
+			)
+		core_clusters = timspeak.data_handlers.rt_windows.select_core_clusters(
+			shard_dia_data,
+			index_3d,
+			cluster3d_stats,
+			self.clustering_parameters['clustering_threshold']
+		)
+		self.logger.root_logger.info(
+			f'shard clustered: {len(core_clusters["sizes"])} of {len(cluster3d_stats)} clusters have their apex in the shard'
+		)
+		core_ions = np.arange(len(shard_dia_data.intensity_values))[shard_dia_data.get_core_ions()]
+		shard_file_name = self.get_shard_file_name(shard_index)
+		temporary_file_name = f'{shard_file_name}.tmp'
+		with open(temporary_file_name, 'wb') as shard_file:
+			np.savez(
+				shard_file,
+				signature=self.shard_signature,
+				ion_indices=shard_dia_data.get_global_ions(core_ions),
+				smooth_intensity_values=smooth_intensity_values[core_ions],
+				**{f'clusters_{name}': values for name, values in core_clusters.items()}
+			)
+		os.replace(temporary_file_name, shard_file_name)
+		self.logger.root_logger.info(f'shard saved to {shard_file_name}')
+		return shard_file_name
+
+	def run_shards(self) -> None:
+		shard_indices = [
+			shard_index for shard_index in range(self.shard_count)
+			if not self.is_shard_computed(shard_index)
+		]
+		self.logger.root_logger.info(f'{self.shard_count - len(shard_indices)} of {self.shard_count} shards already computed')
+		if not shard_indices:
+			return
+		shard_processes = min(self.shard_processes, len(shard_indices))
+		if shard_processes == 1:
+			for shard_index in shard_indices:
+				self.compute_shard(shard_index)
+			return
+		threads_per_process = max(1, timspeak.performance_utilities.multiprocessing.get_threads() // shard_processes)
+		self.logger.root_logger.info(f'computing {len(shard_indices)} shards in {shard_processes} processes')
+		with concurrent.futures.ProcessPoolExecutor(
+			shard_processes,
+			mp_context=multiprocessing.get_context('spawn')
+		) as executor:
+			futures = {
+				executor.submit(
+					run_shard_in_process,
+					type(self),
+					self.config_file_name,
+					self.config_file_content['sample_file_name'],
+					self.config_file_content['output_file_name'],
+					shard_index,
+					threads_per_process
+				): shard_index for shard_index in shard_indices
+			}
+			for future in concurrent.futures.as_completed(futures):
+				self.logger.root_logger.info(f'shard {futures[future] + 1} computed: {future.result()}')
+
+	def is_shard_computed(self, shard_index: int) -> bool:
+		shard_file_name = self.get_shard_file_name(shard_index)
+		if not os.path.exists(shard_file_name):
+			return False
+		with np.load(shard_file_name) as shard_file:
+			if ('signature' in shard_file.files) and (str(shard_file['signature']) == self.shard_signature):
+				return True
+		self.logger.root_logger.info(f'shard {shard_index + 1} was computed with another configuration, it is recomputed')
+		return False
+
+	def read_shard(self, shard_index: int) -> dict:
+		with np.load(self.get_shard_file_name(shard_index)) as shard_file:
+			return {name: shard_file[name] for name in shard_file.files}
+
+	def smooth_data(self) -> np.ndarray:
+		if self.shard_partition is None:
+			return super().smooth_data()
+		self.smoothing_parameters = self.config_file_content['smoothing']
+		if getattr(self, 'count_neighbor_work', False):
+			# shards may be computed in other processes or in earlier runs
+			self.logger.root_logger.info('neighbor work of shards is not counted')
+		self.run_shards()
+		smooth_intensity_values = timspeak.performance_utilities.memory.empty(
+			len(self.dia_data.intensity_values),
+			dtype=self.dia_data.intensity_values.dtype
+		)
+		for shard_index in range(self.shard_count):
+			shard = self.read_shard(shard_index)
+			smooth_intensity_values[shard['ion_indices']] = shard['smooth_intensity_values']
+		self.logger.root_logger.info('data smoothed (merged from shards)')
+		return smooth_intensity_values
+
+	def clustering(self) -> None:
+		if self.shard_partition is None:
+			return super().clustering()
+		self.logger.root_logger.info('---------- CLUSTERING ----------')
+		index_3d, self.cluster3d_stats = self.cluster_data_in_shards()
+		self.save_index_3d_raw_pointers(index_3d)
+		self.create_mmaps_for_clustering_raw_pointers()
+		self.save_clusters3d_stats_as_dataframe(self.cluster3d_stats)
+		self.get_expanded_index_pointers()
+		self.generate_sparse_cluster_index()
+
+	def cluster_data_in_shards(self) -> tuple:
+		self.clustering_parameters = self.config_file_content['clustering']
+		self.run_shards()
+		shard_clusters = []
+		for shard_index in range(self.shard_count):
+			shard = self.read_shard(shard_index)
+			shard_clusters.append(
+				{
+					name[len('clusters_'):]: values for name, values in shard.items() if name.startswith('clusters_')
+				}
+			)
+		index_3d, cluster3d_stats = timspeak.data_handlers.rt_windows.stitch_clusters(
+			self.dia_data,
+			self.smooth_intensity_values,
+			shard_clusters
+		)
+		self.logger.root_logger.info('data clustered (merged from shards)')
+		return index_3d, cluster3d_stats
@@ -1,7 +1,10 @@
 
 import numpy as np
+import alphatims.dia_data
 import timspeak.execution_pipeline.io_pipeline
 import timspeak.peak_picker_algorithms.algorithm_selection
+import timspeak.data_handlers.rt_windows
+import timspeak.performance_utilities.memory
 
 class SmoothPipeline(
 	timspeak.execution_pipeline.io_pipeline.IOPipeline
@@ -13,20 +16,60 @@ class SmoothPipeline(
 		self.save_smoothed_values(smooth_intensity_values)
 		self.create_mmaps_for_smoothing()
 
+	def restore_smoothing(self) -> None:
+		self.logger.root_logger.info('---------- SMOOTHING (RESTORED) ----------')
+		self.smoothing_parameters = self.config_file_content['smoothing']
+		self.create_mmaps_for_smoothing()
+
 	def smooth_data(self) -> np.ndarray:
 		self.smoothing_parameters = self.config_file_content['smoothing']
-		smoother = timspeak.peak_picker_algorithms.algorithm_selection.smooth_algorithm(
+		if self.rt_windows is None:
+			smooth_intensity_values = self.smooth_dia_data(self.dia_data, neighbor_work_stage='smoothing')
+		else:
+			smooth_intensity_values = self.smooth_data_in_rt_windows()
+		self.logger.root_logger.info('data smoothed')
+		return smooth_intensity_values
+
+	def smooth_data_in_rt_windows(self) -> np.ndarray:
+		smooth_intensity_values = timspeak.performance_utilities.memory.empty(
+			len(self.dia_data.intensity_values),
+			dtype=self.dia_data.intensity_values.dtype
+		)
+		for window_index, window in enumerate(self.rt_windows):
+			window_dia_data = timspeak.data_handlers.rt_windows.WindowDiaData(
+				dia_data=self.dia_data,
+				window=window
+			)
+			window_smooth_intensity_values = self.smooth_dia_data(window_dia_data, neighbor_work_stage='smoothing')
+			window_dia_data.set_core_values(smooth_intensity_values, window_smooth_intensity_values)
+			self.logger.root_logger.info(f'rt window {window_index + 1} of {len(self.rt_windows)} smoothed')
+		return smooth_intensity_values
+
+	def smooth_dia_data(
+		self,
+		dia_data: alphatims.dia_data.DiaData,
+		neighbor_work_stage: str = None
+	) -> np.ndarray:
+		smoother = self.get_smoother(dia_data)
+		smooth_intensity_values = smoother.smooth_all_scans()
+		if neighbor_work_stage is not None:
+			self.add_neighbor_work(
+				neighbor_work_stage,
+				smoother,
+				None if dia_data is self.dia_data else dia_data
+			)
+		return smooth_intensity_values
+
+	def get_smoother(self, dia_data: alphatims.dia_data.DiaData):
+		return timspeak.peak_picker_algorithms.algorithm_selection.smooth_algorithm(
 			self.smoothing_parameters['algorithm_name'])(
-			dia_data=self.dia_data,
+			dia_data=dia_data,
 			im_sigma=self.smoothing_parameters['im_sigma'],
 			im_tolerance=self.smoothing_parameters['im_tolerance'],
 			ppm_tolerance=self.smoothing_parameters['ppm_tolerance'],
 			rt_sigma=self.smoothing_parameters['rt_sigma'],
 			rt_tolerance=self.smoothing_parameters['rt_tolerance'],
 		)
-		smooth_intensity_values = smoother.smooth_all_scans()
-		self.logger.root_logger.info('data smoothed')
-		return smooth_intensity_values
 
 	def save_smoothed_values(self, smooth_intensity_values: np.ndarray) -> None:
 		self.output_format_object.print_smoothing_data(self.smoothing_parameters, smooth_intensity_values)
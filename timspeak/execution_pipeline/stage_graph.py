@@ -0,0 +1,200 @@
+import json
+import dataclasses
+import concurrent.futures
+import timspeak.performance_utilities.multiprocessing
+
+
+def get_config_value(config_file_content: dict, key: str) -> any:
+	value = config_file_content
+	for name in key.split('.'):
+		value = value[name]
+	return value
+
+
+def set_config_value(config_file_content: dict, key: str, value: any) -> None:
+	*names, last_name = key.split('.')
+	for name in names:
+		config_file_content = config_file_content[name]
+	if last_name not in config_file_content:
+		raise KeyError(f'{key} is not in the configuration')
+	config_file_content[last_name] = value
+
+
+@dataclasses.dataclass(frozen=True)
+class Stage:
+	"""
+	A single stage of the execution pipeline.
+
+	Parameters:
+	- name: str
+		The name of the stage, also used as its checkpoint marker.
+	- function: callable
+		Computes the stage and sets its outputs on the pipeline.
+	- restore_function: callable
+		Sets the outputs of an already completed stage from the output file.
+	- inputs: tuple
+		Names of the pipeline attributes the stage reads.
+	- outputs: tuple
+		Names of the pipeline attributes the stage sets.
+	- parameters: tuple
+		Dotted keys of the configuration entries the stage depends on,
+		e.g. 'ms1.isotopes.charge_2'.
+	- groups: tuple
+		Groups of the output file the stage writes. Groups nested in them
+		belong to stages that depend on this stage. Stages writing to the
+		same group list their datasets instead, as every group or dataset
+		has a single owner.
+	"""
+
+	name: str
+	function: callable = dataclasses.field(repr=False)
+	restore_function: callable = dataclasses.field(repr=False)
+	inputs: tuple = ()
+	outputs: tuple = ()
+	parameters: tuple = ()
+	groups: tuple = ()
+
+
+class StageGraph:
+	"""
+	Dependency graph of pipeline stages. A stage depends on the stages
+	producing its inputs; inputs that no stage produces (e.g. dia_data)
+	are expected to be available before the graph is run.
+	"""
+
+	def __init__(self, stages: list) -> None:
+		self.stages = list(stages)
+		self.producers = self._get_producers()
+		self.dependencies = self._get_dependencies()
+		self._check_for_cycles()
+
+	def _get_producers(self) -> dict:
+		producers = {}
+		for stage in self.stages:
+			for output in stage.outputs:
+				if output in producers:
+					raise ValueError(
+						f'{output} is produced by both {producers[output]} and {stage.name}'
+					)
+				producers[output] = stage.name
+		return producers
+
+	def _get_dependencies(self) -> dict:
+		return {
+			stage.name: {
+				self.producers[name] for name in stage.inputs if name in self.producers
+			} for stage in self.stages
+		}
+
+	def _check_for_cycles(self) -> None:
+		done = set()
+		remaining = [stage.name for stage in self.stages]
+		while remaining:
+			ready = [name for name in remaining if self.dependencies[name] <= done]
+			if not ready:
+				raise ValueError(f'stage graph contains a cycle between {", ".join(remaining)}')
+			done.update(ready)
+			remaining = [name for name in remaining if name not in done]
+
+	def get_topological_order(self) -> list:
+		done = set()
+		order = []
+		while len(order) < len(self.stages):
+			for stage in self.get_ready_stages(done, done):
+				done.add(stage.name)
+				order.append(stage)
+		return order
+
+	def get_signatures(self, config_file_content: dict) -> dict:
+		"""
+		Describe the configuration every stage result depends on, including the
+		configuration of all stages it depends on. Two runs give the same result
+		for a stage if its signature is the same.
+
+		Parameters:
+		- config_file_content: dict
+			The configuration of the run.
+
+		Returns:
+		- dict: The signature (str) of every stage, by stage name.
+		"""
+		signatures = {}
+		for stage in self.get_topological_order():
+			signatures[stage.name] = json.dumps(
+				[
+					{key: get_config_value(config_file_content, key) for key in stage.parameters},
+					sorted(signatures[name] for name in self.dependencies[stage.name]),
+				],
+				sort_keys=True
+			)
+		return signatures
+
+	def get_ready_stages(self, done: set, started: set) -> list:
+		return [
+			stage for stage in self.stages
+			if (stage.name not in started) and (self.dependencies[stage.name] <= done)
+		]
+
+	def run(
+		self,
+		stage_runner: callable,
+		max_concurrent_stages: int = 1,
+		thread_count: int = None,
+	) -> None:
+		"""
+		Run all stages, starting every stage as soon as its dependencies
+		are done. Stages that are started together share the threads that
+		are not used by running stages. A stage that is ready while running
+		stages use all threads still starts, with a single thread, rather
+		than waiting for these stages to finish.
+
+		Parameters:
+		- stage_runner: callable
+			Called with a Stage to execute it.
+		- max_concurrent_stages: int
+			(Default: 1)
+			The maximum number of stages that run at the same time.
+		- thread_count: int
+			(Default: the current thread budget)
+			The total number of threads shared by all running stages.
+		"""
+		if thread_count is None:
+			thread_count = timspeak.performance_utilities.multiprocessing.get_threads()
+		max_concurrent_stages = max(1, max_concurrent_stages)
+		done = set()
+		started = set()
+		running = {}
+		available_threads = thread_count
+		with concurrent.futures.ThreadPoolExecutor(max_concurrent_stages) as executor:
+			while len(done) < len(self.stages):
+				ready = self.get_ready_stages(done, started)
+				launch = ready[:max_concurrent_stages - len(running)]
+				if launch:
+					shared_threads, extra_threads = divmod(max(available_threads, 0), len(launch))
+				for launch_index, stage in enumerate(launch):
+					threads = max(1, shared_threads + (launch_index < extra_threads))
+					available_threads -= threads
+					started.add(stage.name)
+					future = executor.submit(self._run_stage, stage_runner, stage, threads)
+					running[future] = (stage, threads)
+				finished, _ = concurrent.futures.wait(
+					running,
+					return_when=concurrent.futures.FIRST_COMPLETED
+				)
+				for future in finished:
+					stage, threads = running.pop(future)
+					available_threads += threads
+					exception = future.exception()
+					if exception is not None:
+						concurrent.futures.wait(running)
+						raise exception
+					done.add(stage.name)
+
+	@staticmethod
+	def _run_stage(
+		stage_runner: callable,
+		stage: Stage,
+		threads: int
+	) -> None:
+		with timspeak.performance_utilities.multiprocessing.thread_budget(threads):
+			stage_runner(stage)
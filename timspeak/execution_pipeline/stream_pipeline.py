@@ -0,0 +1,264 @@
+import time
+import dataclasses
+import numpy as np
+import timspeak.execution_pipeline.main_pipeline
+import timspeak.io_interface.logger
+import timspeak.data_handlers.frame_stream
+import timspeak.data_handlers.indexing
+import timspeak.data_handlers.rt_windows
+import timspeak.peak_picker_algorithms.cluster.clusters_stats
+
+# every batch compiles its smoothing, clustering and statistics kernels again,
+# as these are compiled for the arrays of a single batch, so a batch covers at
+# least this many seconds of the acquisition to keep up with it
+MIN_STREAM_BATCH_SIZE = 60.0
+
+class StreamPipeline(
+	timspeak.execution_pipeline.main_pipeline.MainPipeline
+):
+	"""
+	Smooth and cluster an acquisition while it is acquired. Frame chunks are
+	read from a stream directory (see
+	timspeak.data_handlers.frame_stream.write_frame_chunks) into a ring of
+	recent frames. As soon as frames are more than a halo (in seconds) older
+	than the newest frame, they can no longer receive neighbours: they are
+	smoothed and clustered, clusters with their apex in these frames are
+	appended to the output file, and frames that are no longer needed as
+	neighbours are dropped from the ring. Clusters that could still change
+	with frames that are not acquired yet are held back, together with all
+	later frames, so the smoothed intensities and clusters are the same as
+	in a full run.
+
+	Clusters are appended in the order in which their frames become final,
+	not ordered by their first ion as in a full run.
+
+	Frames are processed in batches of at least rt_window_size seconds, and
+	no less than MIN_STREAM_BATCH_SIZE, as every batch compiles its kernels.
+	The time every batch takes is logged with how far the processed frames
+	lag behind the newest frame, so a growing backlog shows in the log.
+	"""
+
+	def __init__(
+		self,
+		config_file_name: str,
+		stream_directory: str,
+		cmdln_output_file_name: str = None,
+		poll_interval: float = 1.0,
+		timeout: float = None,
+		logger: timspeak.io_interface.logger.Logger = None
+	) -> None:
+		super().__init__(
+			config_file_name,
+			stream_directory,
+			cmdln_output_file_name,
+			logger=logger
+		)
+		object.__setattr__(self, 'stream_directory', stream_directory)
+		object.__setattr__(self, 'poll_interval', poll_interval)
+		object.__setattr__(self, 'timeout', timeout)
+
+	def run(self) -> None:
+		self.initialize_logger()
+		self.set_input_objects()
+		self.set_number_of_threads()
+		self.set_memory_budget()
+		self.set_output_objects()
+		self.save_sample_info()
+		self.save_package_info()
+		self.set_stream()
+		try:
+			self.process_stream()
+		finally:
+			self.close_output_object()
+		self.logger.root_logger.info('execution ended')
+
+	def process_stream(self) -> None:
+		for chunk in self.frame_chunk_reader:
+			self.frame_ring.append(chunk)
+			self.logger.root_logger.info(
+				f'{len(chunk["rt_values"])} frames received, {len(self.frame_ring.rt_values)} frames in ring'
+			)
+			self.process_final_frames()
+		self.logger.root_logger.info('acquisition done')
+		self.process_final_frames(acquisition_done=True)
+
+	def set_stream(self) -> None:
+		self.logger.root_logger.info('---------- SET STREAM ----------')
+		self.smoothing_parameters = self.config_file_content['smoothing']
+		self.clustering_parameters = self.config_file_content['clustering']
+		self.stream_halo = self.config_file_content.get('rt_window_halo', None)
+		if self.stream_halo is None:
+			self.stream_halo = self.smoothing_parameters['rt_tolerance'] + 2 * self.clustering_parameters['rt_tolerance']
+		# neighbour steps from which the smoothed intensity or cluster of an ion can change
+		self.stream_rt_tolerances = (
+			self.clustering_parameters['rt_tolerance'],
+			self.clustering_parameters['rt_tolerance'],
+			self.smoothing_parameters['rt_tolerance'],
+		)
+		self.stream_batch_size = self.config_file_content.get('rt_window_size', None)
+		if self.stream_batch_size is None:
+			self.stream_batch_size = MIN_STREAM_BATCH_SIZE
+		elif self.stream_batch_size < MIN_STREAM_BATCH_SIZE:
+			self.logger.root_logger.warning(
+				f'rt_window_size raised to {MIN_STREAM_BATCH_SIZE} s, as every batch compiles its kernels'
+			)
+			self.stream_batch_size = MIN_STREAM_BATCH_SIZE
+		self.frame_chunk_reader = timspeak.data_handlers.frame_stream.FrameChunkReader(
+			self.stream_directory,
+			self.poll_interval,
+			self.timeout
+		)
+		self.frame_ring = timspeak.data_handlers.frame_stream.FrameRing(
+			self.frame_chunk_reader.read_metadata()
+		)
+		self.cycle_length = self.frame_ring.cycle_length
+		self.processed_frame = 1
+		self.streamed_cluster_count = 0
+		self.logger.root_logger.info(f'stream directory: {self.stream_directory}')
+		self.logger.root_logger.info(f'stream halo (s): {self.stream_halo}')
+		self.logger.root_logger.info(f'stream batch size (s): {self.stream_batch_size}')
+
+	def process_final_frames(self, acquisition_done: bool = False) -> None:
+		frame_ring = self.frame_ring
+		if len(frame_ring.rt_values) == 0:
+			return
+		ring_last_frame = frame_ring.first_frame + len(frame_ring.rt_values)
+		if acquisition_done:
+			final_frame = ring_last_frame
+		else:
+			final_frame = frame_ring.get_frame(frame_ring.rt_values[-1] - self.stream_halo, 'right')
+		if final_frame <= self.processed_frame:
+			return
+		batch_rt_values = frame_ring.rt_values[
+			[self.processed_frame - frame_ring.first_frame, final_frame - frame_ring.first_frame - 1]
+		]
+		if not acquisition_done and (batch_rt_values[1] - batch_rt_values[0] < self.stream_batch_size):
+			return
+		start_time = time.perf_counter()
+		ring_dia_data = frame_ring.get_dia_data()
+		window = timspeak.data_handlers.rt_windows.RtWindow(
+			first_frame=1,
+			last_frame=ring_last_frame - frame_ring.first_frame + 1,
+			core_first_frame=self.processed_frame - frame_ring.first_frame + 1,
+			core_last_frame=final_frame - frame_ring.first_frame + 1,
+		)
+		window_dia_data = timspeak.data_handlers.rt_windows.WindowDiaData(dia_data=ring_dia_data, window=window)
+		smooth_intensity_values = self.smooth_dia_data(window_dia_data)
+		index_3d = self.cluster_dia_data(window_dia_data, smooth_intensity_values, clustering_threshold=1)
+		cluster3d_stats = timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D(
+			dia_data=window_dia_data,
+			sparse_index=index_3d,
+			smooth_intensity_values=smooth_intensity_values
+		)
+		apex_frames = (
+			np.searchsorted(window_dia_data.tof_indptr, cluster3d_stats.apex_indices, 'right') - 1
+		) // frame_ring.scans_per_frame
+		window = dataclasses.replace(
+			window,
+			core_last_frame=self.get_exact_core_last_frame(
+				window,
+				window_dia_data,
+				cluster3d_stats,
+				apex_frames,
+				acquisition_done
+			)
+		)
+		if window.core_last_frame > window.core_first_frame:
+			self.append_core_frames(window, ring_dia_data, index_3d, cluster3d_stats, smooth_intensity_values)
+		self.logger.root_logger.info(
+			f'batch of {batch_rt_values[1] - batch_rt_values[0]:.1f} s processed in '
+			f'{time.perf_counter() - start_time:.1f} s, '
+			f'{frame_ring.rt_values[-1] - window_dia_data.rt_values[window.core_last_frame - 1]:.1f} s '
+			'behind the newest frame'
+		)
+		if acquisition_done:
+			return
+		pending_clusters = np.flatnonzero(apex_frames >= window.core_last_frame)
+		first_frames, _ = timspeak.data_handlers.rt_windows.get_rt_reach(
+			window_dia_data.rt_values,
+			np.append(cluster3d_stats.rt_lower_boundaries[pending_clusters], window.core_last_frame),
+			np.append(cluster3d_stats.rt_upper_boundaries[pending_clusters], window.core_last_frame),
+			self.stream_rt_tolerances
+		)
+		frame_ring.drop_frames_before(
+			frame_ring.get_frame(window_dia_data.rt_values[max(np.min(first_frames), 1)])
+		)
+
+	def get_exact_core_last_frame(
+		self,
+		window: timspeak.data_handlers.rt_windows.RtWindow,
+		window_dia_data: timspeak.data_handlers.rt_windows.WindowDiaData,
+		cluster3d_stats: timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D,
+		apex_frames: np.ndarray,
+		acquisition_done: bool
+	) -> int:
+		"""
+		Get the end of the frames (in frames of the ring) whose smoothed
+		intensities and clusters are final: the first frame with the apex of
+		a cluster that reaches the newest frame, as frames that are not
+		acquired yet can still change it.
+
+		Parameters:
+		- window: timspeak.data_handlers.rt_windows.RtWindow
+			The ring as RT window, with the frames to process as core.
+		- window_dia_data: timspeak.data_handlers.rt_windows.WindowDiaData
+			The ring, clustered with a clustering threshold of 1.
+		- cluster3d_stats: timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D
+			The statistics of the clusters of the ring.
+		- apex_frames: np.ndarray
+			The frame (in frames of the ring) of the apex of every cluster.
+		- acquisition_done: bool
+			No more frames will be acquired.
+
+		Returns:
+		- int: The frame after the last final frame.
+		"""
+		core_clusters = timspeak.data_handlers.rt_windows.get_core_clusters(window_dia_data, cluster3d_stats)
+		first_frames, last_frames = timspeak.data_handlers.rt_windows.get_rt_reach(
+			window_dia_data.rt_values,
+			cluster3d_stats.rt_lower_boundaries[core_clusters],
+			cluster3d_stats.rt_upper_boundaries[core_clusters],
+			self.stream_rt_tolerances
+		)
+		if (self.frame_ring.first_frame > 1) and np.any(first_frames <= 1):
+			self.logger.root_logger.warning('frames were dropped from the ring while clusters still reached them')
+		core_last_frame = window.core_last_frame
+		if acquisition_done:
+			return core_last_frame
+		truncated_clusters = core_clusters[last_frames >= len(window_dia_data.rt_values) - 1]
+		if len(truncated_clusters) == 0:
+			return core_last_frame
+		return int(min(core_last_frame, np.min(apex_frames[truncated_clusters])))
+
+	def append_core_frames(
+		self,
+		window: timspeak.data_handlers.rt_windows.RtWindow,
+		ring_dia_data: timspeak.data_handlers.frame_stream.RingDiaData,
+		index_3d: timspeak.data_handlers.indexing.SparseIndex,
+		cluster3d_stats: timspeak.peak_picker_algorithms.cluster.clusters_stats.Clusters3D,
+		smooth_intensity_values: np.ndarray
+	) -> None:
+		frame_ring = self.frame_ring
+		window_dia_data = timspeak.data_handlers.rt_windows.WindowDiaData(dia_data=ring_dia_data, window=window)
+		core_clusters = timspeak.data_handlers.rt_windows.select_core_clusters(
+			window_dia_data,
+			index_3d,
+			cluster3d_stats,
+			self.clustering_parameters['clustering_threshold']
+		)
+		for name in ('values', 'apex_indices'):
+			core_clusters[name] = core_clusters[name] + frame_ring.first_ion
+		for name in ('rt_lower_boundaries', 'rt_upper_boundaries'):
+			core_clusters[name] = (core_clusters[name] + frame_ring.first_frame - 1).astype(core_clusters[name].dtype)
+		self.output_format_object.append_smoothing_data(
+			self.smoothing_parameters,
+			smooth_intensity_values[window_dia_data.get_core_ions()]
+		)
+		self.output_format_object.append_clustering_data(self.clustering_parameters, core_clusters)
+		self.streamed_cluster_count += len(core_clusters['sizes'])
+		final_frame = window.core_last_frame + frame_ring.first_frame - 1
+		self.logger.root_logger.info(
+			f'frames {self.processed_frame} to {final_frame - 1} smoothed and clustered, '
+			f'{self.streamed_cluster_count} clusters in total'
+		)
+		self.processed_frame = final_frame
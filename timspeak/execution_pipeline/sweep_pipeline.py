@@ -0,0 +1,165 @@
+import os
+import copy
+import json
+import itertools
+import timspeak.io_interface.logger
+import timspeak.io_interface.input.read_content
+import timspeak.io_interface.output.write_content
+import timspeak.execution_pipeline.main_pipeline
+import timspeak.execution_pipeline.stage_graph
+
+
+def get_grid_points(grid: dict) -> list:
+	"""
+	Expand a parameter grid into all its grid points.
+
+	Parameters:
+	- grid: dict
+		The values to try (list) for every dotted configuration key,
+		e.g. {'clustering.ppm_tolerance': [10.0, 20.0]}.
+
+	Returns:
+	- list: A dict of dotted configuration keys and values for every grid point.
+	"""
+	keys = list(grid.keys())
+	return [
+		dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))
+	]
+
+
+class SweepPipeline:
+	"""
+	Run the execution pipeline for every point of a parameter grid. A stage is
+	only computed once for every distinct configuration of itself and the stages
+	it depends on; later grid points copy its results from the output file of
+	the first grid point that computed it and resume from there.
+
+	Parameters:
+	- config_file_name: str
+		The configuration file the grid points are derived from.
+	- grid: dict
+		The values to try (list) for every dotted configuration key.
+	- sample_file_name: str
+		(Default: the sample_file_name of the configuration)
+		The sample (.d folder) to process.
+	- output_directory: str
+		(Default: the directory of the output file of the configuration)
+		The directory in which the output and configuration file of every grid
+		point and a summary of the sweep are written.
+	"""
+
+	def __init__(
+		self,
+		config_file_name: str,
+		grid: dict,
+		sample_file_name: str = None,
+		output_directory: str = None
+	) -> None:
+		self.config_file_name = config_file_name
+		self.grid = grid
+		self.sample_file_name = sample_file_name
+		self.output_directory = output_directory
+
+	def run(self) -> list:
+		self.logger = timspeak.io_interface.logger.Logger()
+		self.logger.root_logger.info('---------- SWEEP ----------')
+		self.read_config_file_content()
+		grid_points = get_grid_points(self.grid)
+		self.logger.root_logger.info(f'number of grid points: {len(grid_points)}')
+		self.computed_signatures = []
+		summary = []
+		for grid_index, grid_point in enumerate(grid_points):
+			summary.append(self.run_grid_point(grid_index, grid_point))
+		with open(self.get_file_name('sweep', 'json'), 'w') as summary_file:
+			json.dump(summary, summary_file, indent=2)
+		self.logger.root_logger.info('sweep ended')
+		return summary
+
+	def read_config_file_content(self) -> None:
+		object_read_content = timspeak.io_interface.input.read_content.ReadContent()
+		self.config_file_content = object_read_content.start_reading(self.config_file_name)
+		if self.sample_file_name is not None:
+			self.config_file_content['sample_file_name'] = self.sample_file_name
+		output_file_name = os.path.abspath(self.config_file_content['output_file_name'])
+		if self.output_directory is None:
+			self.output_directory = os.path.dirname(output_file_name)
+		os.makedirs(self.output_directory, exist_ok=True)
+		self.output_name, self.output_extension = os.path.splitext(os.path.basename(output_file_name))
+		self.output_extension = self.output_extension.lstrip('.')
+
+	def get_file_name(self, suffix: str, extension: str) -> str:
+		return os.path.join(self.output_directory, f'{self.output_name}_{suffix}.{extension}')
+
+	def write_grid_point_config_file(self, grid_index: int, grid_point: dict) -> str:
+		config_file_content = copy.deepcopy(self.config_file_content)
+		for key, value in grid_point.items():
+			timspeak.execution_pipeline.stage_graph.set_config_value(config_file_content, key, value)
+		config_file_content['output_file_name'] = self.get_file_name(f'{grid_index:03}', self.output_extension)
+		config_file_name = self.get_file_name(f'{grid_index:03}', 'json')
+		with open(config_file_name, 'w') as config_file:
+			json.dump(config_file_content, config_file, indent=2)
+		return config_file_name
+
+	def get_shared_stages(self, signatures: dict) -> tuple:
+		source_file_name = None
+		shared_stages = []
+		for computed_file_name, computed_signatures in self.computed_signatures:
+			stages = [
+				name for name, signature in signatures.items() if computed_signatures[name] == signature
+			]
+			if len(stages) > len(shared_stages):
+				source_file_name = computed_file_name
+				shared_stages = stages
+		return source_file_name, shared_stages
+
+	def copy_shared_stages(
+		self,
+		source_file_name: str,
+		output_file_name: str,
+		stages: list,
+		shared_stages: list,
+		signatures: dict
+	) -> None:
+		# performance and neighbor work of the source file describe its own run
+		excluded_groups = ['checkpoints', 'performance']
+		for stage in stages:
+			if stage.name not in shared_stages:
+				excluded_groups.extend(stage.groups)
+		output_format = timspeak.io_interface.output.write_content.output_function(self.output_extension)
+		output_format.copy_output_file(
+			source_file_name=source_file_name,
+			file_name=output_file_name,
+			excluded_groups=tuple(excluded_groups)
+		)
+		output_format_object = output_format(output_file_name, True)
+		for stage_name in shared_stages:
+			output_format_object.record_stage_completion(stage_name, signatures[stage_name])
+
+	def run_grid_point(self, grid_index: int, grid_point: dict) -> dict:
+		self.logger.root_logger.info(f'---------- GRID POINT {grid_index} ----------')
+		for key, value in grid_point.items():
+			self.logger.root_logger.info(f'{key}: {value}')
+		config_file_name = self.write_grid_point_config_file(grid_index, grid_point)
+		output_file_name = self.get_file_name(f'{grid_index:03}', self.output_extension)
+		stages = timspeak.execution_pipeline.main_pipeline.MainPipeline(config_file_name).get_stages()
+		stage_graph = timspeak.execution_pipeline.stage_graph.StageGraph(stages)
+		config_file_content = timspeak.io_interface.input.read_content.ReadContent().start_reading(config_file_name)
+		signatures = stage_graph.get_signatures(config_file_content)
+		source_file_name, shared_stages = self.get_shared_stages(signatures)
+		if shared_stages:
+			self.logger.root_logger.info(f'shared stages from {source_file_name}: {", ".join(shared_stages)}')
+			self.copy_shared_stages(source_file_name, output_file_name, stages, shared_stages, signatures)
+		pipeline = timspeak.execution_pipeline.main_pipeline.MainPipeline(
+			config_file_name,
+			resume=bool(shared_stages),
+			logger=self.logger
+		)
+		pipeline.run()
+		self.computed_signatures.append((output_file_name, signatures))
+		return {
+			'parameters': grid_point,
+			'config_file_name': config_file_name,
+			'output_file_name': output_file_name,
+			'shared_stages': shared_stages,
+			'shared_from': source_file_name,
+		}
@@ -36,6 +36,56 @@ class IOutputFileContent(abc.ABC):
     ) -> None:
         pass
 
+    @staticmethod
+    @abc.abstractmethod
+    def read_completed_stages(
+        *,
+        file_name: str
+    ) -> dict:
+        pass
+
+    @staticmethod
+    @abc.abstractmethod
+    def copy_output_file(
+        *,
+        source_file_name: str,
+        file_name: str,
+        excluded_groups: tuple
+    ) -> None:
+        pass
+
+    @abc.abstractmethod
+    def record_stage_completion(
+        self,
+        stage_name: str,
+        signature: str
+    ) -> None:
+        pass
+
+    @abc.abstractmethod
+    def print_neighbor_work(
+        self,
+        stage_name: str,
+        neighbor_work: dict
+    ) -> None:
+        pass
+
+    @abc.abstractmethod
+    def record_stage_performance(
+        self,
+        stage_name: str,
+        stage_performance: dict
+    ) -> None:
+        pass
+
+    @staticmethod
+    @abc.abstractmethod
+    def read_dataset_sizes(
+        *,
+        file_name: str
+    ) -> dict:
+        pass
+
     @abc.abstractmethod
     def record_sample(
         self,
@@ -76,6 +126,22 @@ class IOutputFileContent(abc.ABC):
     ) -> None:
         pass
 
+    @abc.abstractmethod
+    def append_smoothing_data(
+        self,
+        smoothing_parameters: dict,
+        smooth_intensity_values: np.ndarray
+    ) -> None:
+        pass
+
+    @abc.abstractmethod
+    def append_clustering_data(
+         self,
+         cluster_parameters: dict,
+         clusters: dict
+    ) -> None:
+        pass
+
     @abc.abstractmethod
     def print_clustering_rt_projection(
          self,
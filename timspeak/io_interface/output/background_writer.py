@@ -0,0 +1,157 @@
+
+import queue
+import threading
+import functools
+import numpy as np
+import timspeak.io_interface.output.out_formats.memory_object
+import timspeak.performance_utilities.tracing
+
+# functions of output format objects that write to the output file
+WRITE_PREFIXES = ('print_', 'record_', 'append_')
+
+
+class PendingWrite:
+
+	def __init__(
+		self,
+		function_name: str,
+		args: tuple,
+		kwargs: dict,
+		arrays: dict
+	) -> None:
+		self.function_name = function_name
+		self.args = args
+		self.kwargs = kwargs
+		self.mmap_names = list(arrays.keys())
+		self.nbytes = sum(getattr(array, 'nbytes', 0) for array in arrays.values())
+		self.done = threading.Event()
+
+
+class BackgroundWriter:
+	"""
+	Wraps an output format object so that its print_, record_ and append_
+	functions are queued and executed in order by a dedicated I/O thread,
+	while the pipeline continues with the next computation.
+
+	read_mem_map only waits for the pending write of the requested array.
+
+	Parameters:
+	- output_format_object: timspeak.io_interface.configuration_templates.IOutputFileContent
+		The output format object that writes the output file.
+	- max_memory_gb: float
+		(Default: 2.0)
+		The size of the arrays that can be queued before writing blocks.
+	- max_queue_size: int
+		(Default: 64)
+		The number of writes that can be queued before writing blocks.
+	"""
+
+	def __init__(
+		self,
+		output_format_object,
+		max_memory_gb: float = 2.0,
+		max_queue_size: int = 64
+	) -> None:
+		self.output_format_object = output_format_object
+		self.max_queue_bytes = int(max_memory_gb * 1024**3)
+		self.max_queue_size = max_queue_size
+		self.queued_bytes = 0
+		self.queued_writes = 0
+		self.pending_writes = {}
+		self.exception = None
+		self.condition = threading.Condition()
+		self.queue = queue.Queue()
+		self.thread = threading.Thread(target=self.write_queued, name='timspeak_output', daemon=True)
+		self.thread.start()
+
+	def __getattr__(self, name: str) -> any:
+		attr = getattr(self.output_format_object, name)
+		if name.startswith(WRITE_PREFIXES):
+			return functools.partial(self.write, name)
+		return attr
+
+	def get_arrays(self, function_name: str, *args, **kwargs) -> dict:
+		# laid out in memory, the write reports which arrays it writes where
+		memory_object = timspeak.io_interface.output.out_formats.memory_object.MemoryObject()
+		memory_format_object = timspeak.io_interface.output.out_formats.memory_object.get_memory_format_object(
+			self.output_format_object.output_file_name,
+			memory_object
+		)
+		getattr(memory_format_object, function_name)(*args, **kwargs)
+		return memory_object.arrays
+
+	def write(self, function_name: str, *args, **kwargs) -> None:
+		arrays = self.get_arrays(function_name, *args, **kwargs)
+		pending_write = PendingWrite(function_name, args, kwargs, arrays)
+		with self.condition:
+			self.condition.wait_for(
+				lambda: (self.exception is not None) or (
+					(self.queued_writes < self.max_queue_size) and (
+						(self.queued_bytes == 0) or
+						(self.queued_bytes + pending_write.nbytes <= self.max_queue_bytes)
+					)
+				)
+			)
+			self.raise_exception()
+			self.queued_bytes += pending_write.nbytes
+			self.queued_writes += 1
+			for mmap_name in pending_write.mmap_names:
+				self.pending_writes[mmap_name] = pending_write
+		self.queue.put(pending_write)
+
+	def write_queued(self) -> None:
+		while True:
+			pending_write = self.queue.get()
+			if pending_write is None:
+				break
+			try:
+				if self.exception is None:
+					timspeak.performance_utilities.tracing.name_thread('output writer')
+					with timspeak.performance_utilities.tracing.span(
+						pending_write.function_name,
+						'output',
+						nbytes=pending_write.nbytes
+					):
+						getattr(self.output_format_object, pending_write.function_name)(
+							*pending_write.args,
+							**pending_write.kwargs
+						)
+			except Exception as exception:
+				self.exception = exception
+			finally:
+				with self.condition:
+					self.queued_bytes -= pending_write.nbytes
+					self.queued_writes -= 1
+					for mmap_name in pending_write.mmap_names:
+						if self.pending_writes.get(mmap_name) is pending_write:
+							del self.pending_writes[mmap_name]
+					pending_write.done.set()
+					self.condition.notify_all()
+
+	def raise_exception(self) -> None:
+		if self.exception is not None:
+			raise RuntimeError('writing the output file failed') from self.exception
+
+	def read_mem_map(self, *, file_name: str, mmap_name: str) -> np.ndarray:
+		mmap_name = mmap_name.strip('/')
+		with self.condition:
+			pending_write = self.pending_writes.get(mmap_name)
+		if pending_write is not None:
+			pending_write.done.wait()
+		self.raise_exception()
+		return self.output_format_object.read_mem_map(file_name=file_name, mmap_name=f'/{mmap_name}')
+
+	def flush(self) -> None:
+		"""
+		Wait until everything queued so far is written to the output file.
+		"""
+		with self.condition:
+			self.condition.wait_for(lambda: self.queued_writes == 0)
+		self.raise_exception()
+
+	def close(self) -> None:
+		try:
+			self.flush()
+		finally:
+			self.queue.put(None)
+			self.thread.join()
@@ -0,0 +1,41 @@
+
+import functools
+import numpy as np
+import timspeak.io_interface.output.out_formats.memory_object
+import timspeak.io_interface.output.background_writer
+
+
+class InMemoryOutput:
+	"""
+	Wraps a background writer so that arrays written by its print_ and
+	append_ functions stay available in memory for read_mem_map, while the
+	background writer writes them to the output file in order.
+
+	Parameters:
+	- output_format_object: timspeak.io_interface.output.background_writer.BackgroundWriter
+		The background writer that writes the output file.
+	"""
+
+	def __init__(self, output_format_object) -> None:
+		self.output_format_object = output_format_object
+		self.memory_object = timspeak.io_interface.output.out_formats.memory_object.MemoryObject()
+		self.memory_format_object = timspeak.io_interface.output.out_formats.memory_object.get_memory_format_object(
+			output_format_object.output_file_name,
+			self.memory_object
+		)
+
+	def __getattr__(self, name: str) -> any:
+		attr = getattr(self.output_format_object, name)
+		if name.startswith(timspeak.io_interface.output.background_writer.WRITE_PREFIXES):
+			return functools.partial(self.write, name)
+		return attr
+
+	def write(self, function_name: str, *args, **kwargs) -> None:
+		getattr(self.memory_format_object, function_name)(*args, **kwargs)
+		getattr(self.output_format_object, function_name)(*args, **kwargs)
+
+	def read_mem_map(self, *, file_name: str, mmap_name: str) -> np.ndarray:
+		array = self.memory_object.get_mmap(mmap_name)
+		if array is not None:
+			return array
+		return self.output_format_object.read_mem_map(file_name=file_name, mmap_name=mmap_name)
@@ -13,10 +13,13 @@ class HDFFormat(
 
     def __init__(
          self,
-         output_file_name: str
+         output_file_name: str,
+         resume: bool = False
     ) -> None:
+        import os
+        new = not (resume and os.path.exists(output_file_name))
         object.__setattr__(self, 'output_file_name', output_file_name)
-        object.__setattr__(self, 'hdf_object', timspeak.io_interface.output.out_formats.hdf_object.HDFObject.from_file(output_file_name, new=True))
+        object.__setattr__(self, 'hdf_object', timspeak.io_interface.output.out_formats.hdf_object.HDFObject.from_file(output_file_name, new=new))
 
     @staticmethod
     def read_mem_map(*, file_name: str, mmap_name: str) -> np.ndarray:
@@ -25,6 +28,62 @@ class HDFFormat(
             mmap_name=mmap_name
         )
 
+    @staticmethod
+    def read_completed_stages(*, file_name: str) -> dict:
+        checkpoints = timspeak.io_interface.output.out_formats.hdf_object.read_attrs(
+            file_name=file_name,
+            group_name='checkpoints'
+        )
+        return {stage_name: str(signature) for stage_name, signature in checkpoints.items()}
+
+    @staticmethod
+    def copy_output_file(
+            *,
+            source_file_name: str,
+            file_name: str,
+            excluded_groups: tuple = ()
+    ) -> None:
+        timspeak.io_interface.output.out_formats.hdf_object.copy_file(
+            source_file_name=source_file_name,
+            file_name=file_name,
+            excluded_groups=excluded_groups
+        )
+
+    def record_stage_completion(
+            self,
+            stage_name: str,
+            signature: str,
+    ) -> None:
+        group_name = 'checkpoints/'
+        group = self.hdf_object.set_group(group_name)
+        group.set_attr(stage_name, signature)
+
+    def record_stage_performance(
+            self,
+            stage_name: str,
+            stage_performance: dict,
+    ) -> None:
+        group_name = f'performance/{stage_name}/'
+        group = self.hdf_object.set_group(group_name)
+        for attr_name, attr_value in stage_performance.items():
+            group.set_attr(attr_name, attr_value)
+
+    def print_neighbor_work(
+            self,
+            stage_name: str,
+            neighbor_work: dict,
+    ) -> None:
+        group_name = f'performance/{stage_name}/'
+        self.hdf_object.set_group(group_name)
+        for mmap_name, mmap_value in neighbor_work.items():
+            self.hdf_object.set_mmap(f'{group_name}{mmap_name}', mmap_value)
+
+    @staticmethod
+    def read_dataset_sizes(*, file_name: str) -> dict:
+        return timspeak.io_interface.output.out_formats.hdf_object.read_dataset_sizes(
+            file_name=file_name
+        )
+
     def record_sample(
             self,
             sample_file_name: str,
@@ -92,6 +151,45 @@ class HDFFormat(
         self.hdf_object.set_mmap(f'{subgroup_name}indptr', index_3d.indptr)
         self.hdf_object.set_mmap(f'{subgroup_name}indices', index_3d.values)
 
+    def append_smoothing_data(
+        self,
+        smoothing_parameters: dict,
+        smooth_intensity_values: np.ndarray
+    ) -> None:
+        group_name = 'smoothing/'
+        group = self.hdf_object.set_group(group_name)
+        self.hdf_object.append_mmap(f'{group_name}smooth_intensity_values', smooth_intensity_values)
+        group.set_attr('algorithm_name', smoothing_parameters['algorithm_name'])
+        group.set_attr('ppm_tolerance', smoothing_parameters['ppm_tolerance'])
+        group.set_attr('im_tolerance', smoothing_parameters['im_tolerance'])
+        group.set_attr('rt_tolerance', smoothing_parameters['rt_tolerance'])
+        group.set_attr('im_sigma', smoothing_parameters['im_sigma'])
+        group.set_attr('rt_sigma', smoothing_parameters['rt_sigma'])
+
+    def append_clustering_data(
+        self,
+        cluster_parameters: dict,
+        clusters: dict
+    ) -> None:
+        group_name = 'clustering/'
+        group = self.hdf_object.set_group(group_name)
+        group.set_attr('algorithm_name', cluster_parameters['algorithm_name'])
+        group.set_attr('ppm_tolerance', cluster_parameters['ppm_tolerance'])
+        group.set_attr('rt_tolerance', cluster_parameters['rt_tolerance'])
+        group.set_attr('im_tolerance', cluster_parameters['im_tolerance'])
+        group.set_attr('clustering_threshold', cluster_parameters['clustering_threshold'])
+        subgroup_name = f'{group_name}raw_pointers/'
+        self.hdf_object.append_mmap(f'{subgroup_name}indptr', clusters['indptr'], continue_pointers=True)
+        self.hdf_object.append_mmap(f'{subgroup_name}indices', clusters['values'])
+        subgroup_name = f'{group_name}as_dataframe/'
+        self.hdf_object.append_mmap(f'{subgroup_name}apex_pointer', clusters['apex_indices'])
+        self.hdf_object.append_mmap(f'{subgroup_name}number_of_ions', clusters['sizes'])
+        self.hdf_object.append_mmap(f'{subgroup_name}frame_group', clusters['frame_groups'])
+        self.hdf_object.append_mmap(f'{subgroup_name}mz_weighted_average', clusters['mz_values'])
+        self.hdf_object.append_mmap(f'{subgroup_name}im_weighted_average', clusters['im_values'])
+        self.hdf_object.append_mmap(f'{subgroup_name}rt_weighted_average', clusters['rt_values'])
+        self.hdf_object.append_mmap(f'{subgroup_name}summed_intensity', clusters['intensity_values'])
+
     def print_clustering_rt_projection(
         self,
         clusters3d_stats: np.ndarray,
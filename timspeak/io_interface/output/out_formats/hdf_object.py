@@ -6,11 +6,21 @@ import mmap
 import os
 import contextlib
 import dataclasses
+import threading
 
 # external
 import numpy as np
 import h5py
 
+# local
+import timspeak.performance_utilities.tracing
+
+
+# HDF files are opened per call; stages running concurrently in
+# different threads must not open the same file at the same time.
+HDF_LOCK = threading.RLock()
+APPEND_CHUNK_SIZE = 2**16
+
 
 def read_mmap(
     *,
@@ -20,7 +30,7 @@ def read_mmap(
 ) -> np.ndarray:
     if group_name is not None:
         mmap_name = f"{group_name}/{mmap_name}"
-    with h5py.File(file_name, "r") as hdf_file:
+    with HDF_LOCK, h5py.File(file_name, "r") as hdf_file:
         array = hdf_file[mmap_name]
         return _read_mmap(array, file_name)
 
@@ -28,6 +38,12 @@ def read_mmap(
 def _read_mmap(array, file_name):
     offset = array.id.get_offset()
     shape = array.shape
+    if (offset is None) and (array.chunks is not None):
+        # appended datasets are stored in chunks and cannot be mapped
+        return array[...]
+    if offset is None:
+        # empty datasets have no storage allocated and cannot be mapped
+        return np.empty(shape, dtype=array.dtype)
     with open(file_name, "rb") as raw_hdf_file:
         mmap_obj = mmap.mmap(
             raw_hdf_file.fileno(),
@@ -49,7 +65,11 @@ def write_mmap(
     mmap_name: str,
     mmap_value: np.ndarray,
 ) -> np.ndarray:
-    with get_or_create_group_from_hdf(file_name, group_name) as group:
+    with timspeak.performance_utilities.tracing.span(
+        f"{group_name}/{mmap_name}",
+        "output",
+        nbytes=mmap_value.nbytes,
+    ), get_or_create_group_from_hdf(file_name, group_name) as group:
         if mmap_name in group:
             del group[mmap_name]
         group[mmap_name] = mmap_value
@@ -60,13 +80,43 @@ def write_mmap(
     )
 
 
+def append_mmap(
+    *,
+    file_name: str,
+    group_name: str,
+    mmap_name: str,
+    mmap_value: np.ndarray,
+    continue_pointers: bool = False,
+) -> int:
+    with timspeak.performance_utilities.tracing.span(
+        f"{group_name}/{mmap_name}",
+        "output",
+        nbytes=mmap_value.nbytes,
+    ), get_or_create_group_from_hdf(file_name, group_name) as group:
+        if mmap_name not in group:
+            group.create_dataset(
+                mmap_name,
+                data=mmap_value,
+                maxshape=(None,) + mmap_value.shape[1:],
+                chunks=(APPEND_CHUNK_SIZE,) + mmap_value.shape[1:],
+            )
+            return len(mmap_value)
+        dataset = group[mmap_name]
+        start = dataset.shape[0]
+        if continue_pointers:
+            mmap_value = mmap_value[1:] + dataset[start - 1]
+        dataset.resize(start + len(mmap_value), axis=0)
+        dataset[start:] = mmap_value
+        return start + len(mmap_value)
+
+
 def read_attr(
     *,
     file_name: str,
     group_name: str,
     attr_name: str,
 ) -> any:
-    with h5py.File(file_name, "r") as hdf_file:
+    with HDF_LOCK, h5py.File(file_name, "r") as hdf_file:
         group = hdf_file[group_name]
         return _read_attr(group, attr_name)
 
@@ -75,6 +125,35 @@ def _read_attr(group, attr_name):
     return group.attrs[attr_name]
 
 
+def read_attrs(
+    *,
+    file_name: str,
+    group_name: str,
+) -> dict:
+    with HDF_LOCK, h5py.File(file_name, "r") as hdf_file:
+        if group_name not in hdf_file:
+            return {}
+        group = hdf_file[group_name]
+        return {
+            attr_name: _read_attr(group, attr_name) for attr_name in group.attrs
+        }
+
+
+def read_dataset_sizes(
+    *,
+    file_name: str,
+) -> dict:
+    dataset_sizes = {}
+
+    def add_dataset_size(name, hdf_object):
+        if isinstance(hdf_object, h5py.Dataset):
+            dataset_sizes[name] = hdf_object.nbytes
+
+    with HDF_LOCK, h5py.File(file_name, "r") as hdf_file:
+        hdf_file.visititems(add_dataset_size)
+    return dataset_sizes
+
+
 def write_attr(
     *,
     file_name: str,
@@ -91,6 +170,29 @@ def write_attr(
     )
 
 
+def copy_file(
+    *,
+    source_file_name: str,
+    file_name: str,
+    excluded_groups: tuple = (),
+) -> None:
+    excluded_groups = {group_name.strip("/") for group_name in excluded_groups}
+    with HDF_LOCK, h5py.File(source_file_name, "r") as source_file:
+        with h5py.File(file_name, "w") as hdf_file:
+            _copy_group(source_file, hdf_file, excluded_groups)
+
+
+def _copy_group(source_group, group, excluded_groups):
+    group.attrs.update(source_group.attrs)
+    for item_name, item in source_group.items():
+        if item.name.strip("/") in excluded_groups:
+            continue
+        if isinstance(item, h5py.Dataset):
+            source_group.copy(item, group, name=item_name)
+        else:
+            _copy_group(item, group.create_group(item_name), excluded_groups)
+
+
 @contextlib.contextmanager
 def get_or_create_group_from_hdf(
     file_name: str,
@@ -99,7 +201,7 @@ def get_or_create_group_from_hdf(
     path_name = os.path.dirname(file_name)
     if not os.path.exists(path_name):
         os.mkdir(path_name)
-    with h5py.File(file_name, "a") as hdf_file:
+    with HDF_LOCK, h5py.File(file_name, "a") as hdf_file:
         if group_name not in hdf_file:
             group = hdf_file.create_group(group_name)
         else:
@@ -155,7 +257,7 @@ class HDFObject:
         if not os.path.exists(path_name):
             os.mkdir(path_name)
         mode = "w" if new else "r"
-        with h5py.File(file_name, mode) as hdf_file:
+        with HDF_LOCK, h5py.File(file_name, mode) as hdf_file:
             hdf_object =  cls(hdf_file, file_name, "")
             return hdf_object
 
@@ -183,6 +285,20 @@ class HDFObject:
             self.arrays.append(mmap_name)
         return mmap_value
 
+    def append_mmap(
+        self,
+        mmap_name: str,
+        mmap_value: np.ndarray,
+        continue_pointers: bool = False,
+    ) -> int:
+        return append_mmap(
+            file_name=self.file_name,
+            group_name=self.group_name,
+            mmap_name=mmap_name,
+            mmap_value=mmap_value,
+            continue_pointers=continue_pointers,
+        )
+
     def set_group(self, group_name: str):
         full_group_name = f"{self.group_name}{group_name}"
         with get_or_create_group_from_hdf(
@@ -0,0 +1,83 @@
+#!python
+
+
+# external
+import numpy as np
+
+
+class MemoryObject:
+    """
+    Stand-in for an HDFObject that keeps arrays and attributes in memory.
+    All groups created from the same root share the same dictionaries,
+    keyed by the full path without leading or trailing slashes.
+    """
+
+    def __init__(
+        self,
+        group_name: str = "",
+        arrays: dict = None,
+        attrs: dict = None,
+    ) -> None:
+        if group_name and not group_name.endswith("/"):
+            group_name = f"{group_name}/"
+        self.group_name = group_name
+        self.arrays = {} if arrays is None else arrays
+        self.attrs = {} if attrs is None else attrs
+
+    def set_attr(self, attr_name: str, attr_value: any) -> any:
+        self.attrs[f"{self.group_name}{attr_name}".strip("/")] = attr_value
+        return attr_value
+
+    def set_mmap(self, mmap_name: str, mmap_value: np.ndarray) -> np.ndarray:
+        self.arrays[f"{self.group_name}{mmap_name}".strip("/")] = mmap_value
+        return mmap_value
+
+    def append_mmap(
+        self,
+        mmap_name: str,
+        mmap_value: np.ndarray,
+        continue_pointers: bool = False,
+    ) -> int:
+        mmap_name = f"{self.group_name}{mmap_name}".strip("/")
+        if mmap_name in self.arrays:
+            array = self.arrays[mmap_name]
+            if continue_pointers:
+                mmap_value = mmap_value[1:] + array[-1]
+            mmap_value = np.concatenate([array, mmap_value])
+        self.arrays[mmap_name] = mmap_value
+        return len(mmap_value)
+
+    def set_group(self, group_name: str):
+        return type(self)(
+            f"{self.group_name}{group_name}",
+            self.arrays,
+            self.attrs,
+        )
+
+    def get_mmap(self, mmap_name: str) -> np.ndarray:
+        return self.arrays.get(mmap_name.strip("/"))
+
+
+def get_memory_format_object(
+    output_file_name: str,
+    memory_object: MemoryObject,
+):
+    """
+    Get an HDF output format object that writes to a MemoryObject. The
+    print_, record_ and append_ functions of the HDF format only use their
+    hdf_object, so they lay out the same groups in memory.
+
+    Parameters:
+    - output_file_name: str
+        The name of the output file the format object stands in for.
+    - memory_object: MemoryObject
+        The MemoryObject the arrays and attributes are written to.
+
+    Returns:
+    - timspeak.io_interface.output.out_formats.hdf.HDFFormat: The output format object.
+    """
+    import timspeak.io_interface.output.out_formats.hdf
+    memory_format_object = object.__new__(timspeak.io_interface.output.out_formats.hdf.HDFFormat)
+    object.__setattr__(memory_format_object, "output_file_name", output_file_name)
+    object.__setattr__(memory_format_object, "hdf_object", memory_object)
+    return memory_format_object
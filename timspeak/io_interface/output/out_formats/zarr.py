@@ -11,10 +11,13 @@ class ZARRFormat(
 
     def __init__(
         self,
-        output_file_name: str
+        output_file_name: str,
+        resume: bool = False
     ) -> None:
         object.__setattr__(self, 'output_file_name', output_file_name)
         object.__setattr__(self, 'zarr_object', timspeak.io_interface.output.out_formats.zarr_object.ZARRObject)
+        if not resume:
+            self.zarr_object.remove_group(self.output_file_name, '/checkpoints/')
 
     @staticmethod
     def read_mem_map(
@@ -27,6 +30,62 @@ class ZARRFormat(
             mmap_name=mmap_name
         )
 
+    @staticmethod
+    def read_completed_stages(*, file_name: str) -> dict:
+        checkpoints = timspeak.io_interface.output.out_formats.zarr_object.ZARRObject.read_attributes(
+            file_name,
+            '/checkpoints/'
+        )
+        return {stage_name: str(signature) for stage_name, signature in checkpoints.items()}
+
+    @staticmethod
+    def copy_output_file(
+        *,
+        source_file_name: str,
+        file_name: str,
+        excluded_groups: tuple = ()
+    ) -> None:
+        timspeak.io_interface.output.out_formats.zarr_object.ZARRObject.copy_store(
+            source_file_name,
+            file_name,
+            excluded_groups
+        )
+
+    def record_stage_completion(
+        self,
+        stage_name: str,
+        signature: str,
+    ) -> None:
+        self.zarr_object.set_new_attribute(self.output_file_name, '/checkpoints/', stage_name, signature)
+
+    def record_stage_performance(
+        self,
+        stage_name: str,
+        stage_performance: dict,
+    ) -> None:
+        for attribute_key, attribute_val in stage_performance.items():
+            self.zarr_object.set_new_attribute(
+                self.output_file_name,
+                f'/performance/{stage_name}/',
+                attribute_key,
+                attribute_val
+            )
+
+    def print_neighbor_work(
+        self,
+        stage_name: str,
+        neighbor_work: dict,
+    ) -> None:
+        self.zarr_object.set_new_group(self.output_file_name, f'/performance/{stage_name}/')
+        for nparray_key, nparray_val in neighbor_work.items():
+            self.zarr_object.set_new_nparray(self.output_file_name, f'/performance/{stage_name}/{nparray_key}', nparray_val)
+
+    @staticmethod
+    def read_dataset_sizes(*, file_name: str) -> dict:
+        return timspeak.io_interface.output.out_formats.zarr_object.ZARRObject.read_dataset_sizes(
+            file_name
+        )
+
     def record_sample(
         self,
         sample_file_name: str,
@@ -91,6 +150,41 @@ class ZARRFormat(
         self.zarr_object.set_new_nparray(self.output_file_name, '/clustering/raw_pointers/indptr', index_3d.indptr)
         self.zarr_object.set_new_nparray(self.output_file_name, '/clustering/raw_pointers/indices', index_3d.values)
 
+    def append_smoothing_data(
+        self,
+        smoothing_parameters: dict,
+        smooth_intensity_values: np.ndarray
+    ) -> None:
+        self.zarr_object.set_new_group(self.output_file_name, '/smoothing/')
+        self.zarr_object.set_new_attribute(self.output_file_name, '/smoothing/', 'algorithm_name', smoothing_parameters['algorithm_name'])
+        self.zarr_object.set_new_attribute(self.output_file_name, '/smoothing/', 'ppm_tolerance', smoothing_parameters['ppm_tolerance'])
+        self.zarr_object.set_new_attribute(self.output_file_name, '/smoothing/', 'im_tolerance', smoothing_parameters['im_tolerance'])
+        self.zarr_object.set_new_attribute(self.output_file_name, '/smoothing/', 'rt_tolerance', smoothing_parameters['rt_tolerance'])
+        self.zarr_object.append_nparray(self.output_file_name, '/smoothing/smooth_intensity_values', smooth_intensity_values)
+
+    def append_clustering_data(
+        self,
+        cluster_parameters: dict,
+        clusters: dict
+    ) -> None:
+        self.zarr_object.set_new_group(self.output_file_name, '/clustering/')
+        self.zarr_object.set_new_attribute(self.output_file_name, '/clustering/', 'algorithm_name', cluster_parameters['algorithm_name'])
+        self.zarr_object.set_new_attribute(self.output_file_name, '/clustering/', 'ppm_tolerance', cluster_parameters['ppm_tolerance'])
+        self.zarr_object.set_new_attribute(self.output_file_name, '/clustering/', 'im_tolerance', cluster_parameters['im_tolerance'])
+        self.zarr_object.set_new_attribute(self.output_file_name, '/clustering/', 'rt_tolerance', cluster_parameters['rt_tolerance'])
+        self.zarr_object.set_new_attribute(self.output_file_name, '/clustering/', 'clustering_threshold', cluster_parameters['clustering_threshold'])
+        self.zarr_object.set_new_group(self.output_file_name, '/clustering/raw_pointers/')
+        self.zarr_object.append_nparray(self.output_file_name, '/clustering/raw_pointers/indptr', clusters['indptr'], continue_pointers=True)
+        self.zarr_object.append_nparray(self.output_file_name, '/clustering/raw_pointers/indices', clusters['values'])
+        self.zarr_object.set_new_group(self.output_file_name, '/clustering/as_dataframe/')
+        self.zarr_object.append_nparray(self.output_file_name, '/clustering/as_dataframe/apex_pointer', clusters['apex_indices'])
+        self.zarr_object.append_nparray(self.output_file_name, '/clustering/as_dataframe/number_of_ions', clusters['sizes'])
+        self.zarr_object.append_nparray(self.output_file_name, '/clustering/as_dataframe/frame_group', clusters['frame_groups'])
+        self.zarr_object.append_nparray(self.output_file_name, '/clustering/as_dataframe/mz_weighted_average', clusters['mz_values'])
+        self.zarr_object.append_nparray(self.output_file_name, '/clustering/as_dataframe/im_weighted_average', clusters['im_values'])
+        self.zarr_object.append_nparray(self.output_file_name, '/clustering/as_dataframe/rt_weighted_average', clusters['rt_values'])
+        self.zarr_object.append_nparray(self.output_file_name, '/clustering/as_dataframe/summed_intensity', clusters['intensity_values'])
+
     def print_clustering_rt_projection(
         self,
         clusters3d_stats: np.ndarray,
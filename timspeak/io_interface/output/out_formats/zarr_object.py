@@ -2,6 +2,17 @@
 import zarr
 import numpy as np
 import mmap
+import os
+import shutil
+import threading
+import timspeak.performance_utilities.tracing
+
+
+# Attributes are stored as json files that are rewritten on every
+# update; stages running concurrently must not update them at once.
+ZARR_LOCK = threading.RLock()
+APPEND_CHUNK_SIZE = 2**16
+
 
 class ZARRObject:
 
@@ -12,7 +23,7 @@ class ZARRObject:
         attribute_key: str,
         attribute_val: any
     ) -> None:
-        with zarr.open(file_name, mode='a') as file:
+        with ZARR_LOCK, zarr.open(file_name, mode='a') as file:
             if group_name in file:
                 group = file[group_name]
             else:
@@ -24,26 +35,107 @@ class ZARRObject:
          file_name: str,
          group_name: str,
     ) -> None:
-        with zarr.open(file_name, mode='a') as file:
+        with ZARR_LOCK, zarr.open(file_name, mode='a') as file:
             if group_name not in file:
                 file.create_group(group_name)
 
+    @staticmethod
+    def remove_group(
+         file_name: str,
+         group_name: str,
+    ) -> None:
+        with ZARR_LOCK, zarr.open(file_name, mode='a') as file:
+            if group_name in file:
+                del file[group_name]
+
+    @staticmethod
+    def copy_store(
+         source_file_name: str,
+         file_name: str,
+         excluded_groups: tuple = (),
+    ) -> None:
+        excluded_paths = {
+            os.path.join(source_file_name, group_name.strip('/')) for group_name in excluded_groups
+        }
+        def ignore(path_name, names):
+            return [name for name in names if os.path.join(path_name, name) in excluded_paths]
+        with ZARR_LOCK:
+            if os.path.exists(file_name):
+                shutil.rmtree(file_name)
+            shutil.copytree(source_file_name, file_name, ignore=ignore)
+
+    @staticmethod
+    def read_attributes(
+         file_name: str,
+         group_name: str,
+    ) -> dict:
+        with ZARR_LOCK, zarr.open(file_name, mode='r') as file:
+            if group_name not in file:
+                return {}
+            return dict(file[group_name].attrs)
+
+    @staticmethod
+    def read_dataset_sizes(
+         file_name: str,
+    ) -> dict:
+        dataset_sizes = {}
+
+        def add_dataset_size(name, zarr_object):
+            if isinstance(zarr_object, zarr.Array):
+                dataset_sizes[name] = zarr_object.nbytes
+
+        with ZARR_LOCK, zarr.open(file_name, mode='r') as file:
+            file.visititems(add_dataset_size)
+        return dataset_sizes
+
     @staticmethod
     def set_new_nparray(
          file_name: str,
          nparray_key: str,
          nparray_val: np.array,
     ) -> None:
-        with zarr.open(file_name, mode='a') as file:
+        with timspeak.performance_utilities.tracing.span(
+            nparray_key,
+            'output',
+            nbytes=nparray_val.nbytes
+        ), ZARR_LOCK, zarr.open(file_name, mode='a') as file:
+            file.create_dataset(
+                nparray_key,
+                data=nparray_val,
+                shape=nparray_val.shape,
+                dtype=nparray_val.dtype,
+                chunks=(None,),
+                compressor=None,
+                overwrite=True
+            )
+
+    @staticmethod
+    def append_nparray(
+         file_name: str,
+         nparray_key: str,
+         nparray_val: np.array,
+         continue_pointers: bool = False,
+    ) -> int:
+        with timspeak.performance_utilities.tracing.span(
+            nparray_key,
+            'output',
+            nbytes=nparray_val.nbytes
+        ), ZARR_LOCK, zarr.open(file_name, mode='a') as file:
             if nparray_key not in file:
                 file.create_dataset(
                     nparray_key,
                     data=nparray_val,
                     shape=nparray_val.shape,
                     dtype=nparray_val.dtype,
-                    chunks=(None,),
+                    chunks=(APPEND_CHUNK_SIZE,),
                     compressor=None
                 )
+                return len(nparray_val)
+            array = file[nparray_key]
+            if continue_pointers:
+                nparray_val = nparray_val[1:] + array[-1]
+            array.append(nparray_val)
+            return len(array)
 
     @staticmethod
     def read_nparray(
@@ -54,11 +146,14 @@ class ZARRObject:
         shape = None
         dtype = None
         nchunks = None
-        with zarr.open(file_name, mode='r') as file:
+        with ZARR_LOCK, zarr.open(file_name, mode='r') as file:
             array = file[mmap_name]
             shape = array.shape
             dtype = array.dtype
             nchunks = array.nchunks
+            if nchunks != 1:
+                # appended arrays are stored in several chunks and cannot be mapped
+                return array[...]
         mapped_file = file_name + '/' + mmap_name + '/0'
         with open(mapped_file, "rb") as file:
             mmap_obj = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
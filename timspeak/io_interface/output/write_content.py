@@ -22,6 +22,7 @@ class WriteObject:
     @staticmethod
     def init_writing_object(
             output_file_name: str,
+            resume: bool = False,
     ) -> None:
         file_extension = output_file_name.split('.')[-1]
-        return output_function(file_extension)(output_file_name)
+        return output_function(file_extension)(output_file_name, resume)
@@ -2,12 +2,168 @@
 def main(
 	input_file_name: str,
 	sample_file_name: str = None,
-	output_file_name: str = None
+	output_file_name: str = None,
+	resume: bool = False
 ) -> None:
 	import timspeak.execution_pipeline.main_pipeline
-	object_execute_pipeline = timspeak.execution_pipeline.main_pipeline.MainPipeline(input_file_name, sample_file_name, output_file_name)
+	object_execute_pipeline = timspeak.execution_pipeline.main_pipeline.MainPipeline(input_file_name, sample_file_name, output_file_name, resume)
 	object_execute_pipeline.run()
 
+def batch(
+	input_file_name: str,
+	sample_file_names: list,
+	output_directory: str = None,
+	max_concurrent_samples: int = 1,
+	resume: bool = False,
+	processes: bool = False
+) -> dict:
+	import timspeak.execution_pipeline.batch_pipeline
+	object_execute_batch = timspeak.execution_pipeline.batch_pipeline.BatchPipeline(
+		input_file_name,
+		sample_file_names,
+		output_directory,
+		max_concurrent_samples,
+		resume,
+		processes
+	)
+	return object_execute_batch.run()
+
+def sweep(
+	input_file_name: str,
+	grid_file_name: str,
+	sample_file_name: str = None,
+	output_directory: str = None
+) -> list:
+	import timspeak.io_interface.input.read_content
+	import timspeak.execution_pipeline.sweep_pipeline
+	grid = timspeak.io_interface.input.read_content.ReadContent().start_reading(grid_file_name)
+	object_execute_sweep = timspeak.execution_pipeline.sweep_pipeline.SweepPipeline(
+		input_file_name,
+		grid,
+		sample_file_name,
+		output_directory
+	)
+	return object_execute_sweep.run()
+
+def shard(
+	input_file_name: str,
+	shard_index: int,
+	sample_file_name: str = None,
+	output_file_name: str = None
+) -> str:
+	import timspeak.execution_pipeline.main_pipeline
+	object_execute_pipeline = timspeak.execution_pipeline.main_pipeline.MainPipeline(input_file_name, sample_file_name, output_file_name)
+	return object_execute_pipeline.run_shard(shard_index)
+
+def estimate(
+	input_file_name: str,
+	sample_file_name: str = None,
+	thread_count: int = None,
+	sample_fraction: float = 0.01,
+	reference_file_name: str = None,
+	estimate_file_name: str = 'timspeak_estimate.json'
+) -> dict:
+	import timspeak.execution_pipeline.estimate_pipeline
+	object_execute_estimate = timspeak.execution_pipeline.estimate_pipeline.EstimatePipeline(
+		input_file_name,
+		sample_file_name,
+		thread_count,
+		sample_fraction,
+		reference_file_name,
+		estimate_file_name
+	)
+	return object_execute_estimate.run()
+
+def stream(
+	input_file_name: str,
+	stream_directory: str,
+	output_file_name: str = None,
+	poll_interval: float = 1.0,
+	timeout: float = None
+) -> None:
+	import timspeak.execution_pipeline.stream_pipeline
+	object_execute_stream = timspeak.execution_pipeline.stream_pipeline.StreamPipeline(
+		input_file_name,
+		stream_directory,
+		output_file_name,
+		poll_interval,
+		timeout
+	)
+	object_execute_stream.run()
+
+def benchmark(
+	input_file_name: str = None,
+	sizes: list = None,
+	repeats: int = 3,
+	output_file_name: str = 'timspeak_benchmark.json',
+	baseline_file_name: str = None,
+	save_baseline: bool = False,
+	tolerance: float = 0.25,
+	thread_counts: list = None,
+	imbalance_threshold: float = 0.2,
+	backends: list = None
+) -> dict:
+	import timspeak.execution_pipeline.benchmark_pipeline
+	object_execute_benchmark = timspeak.execution_pipeline.benchmark_pipeline.BenchmarkPipeline(
+		input_file_name,
+		sizes,
+		repeats,
+		output_file_name,
+		baseline_file_name,
+		save_baseline,
+		tolerance,
+		thread_counts,
+		imbalance_threshold,
+		backends
+	)
+	return object_execute_benchmark.run()
+
+
+def benchmark_startup(
+	input_file_name: str = None,
+	output_file_name: str = 'timspeak_startup.json',
+	cache_directory: str = None,
+	runs: list = None
+) -> dict:
+	import timspeak.io_interface.logger
+	import timspeak.execution_pipeline.benchmark_pipeline
+	import timspeak.performance_utilities.startup
+	logger = timspeak.io_interface.logger.Logger()
+	logger.root_logger.info('---------- STARTUP BENCHMARK ----------')
+	results = timspeak.performance_utilities.startup.benchmark_startup(
+		input_file_name or timspeak.execution_pipeline.benchmark_pipeline.get_default_config_file_name(),
+		output_file_name,
+		cache_directory,
+		runs,
+		logger.root_logger
+	)
+	logger.root_logger.info(f'startup benchmark results saved to {output_file_name}')
+	return results
+
+
+def benchmark_io(
+	input_file_name: str = None,
+	size: str = 'medium',
+	output_formats: list = None,
+	settings: list = None,
+	repeats: int = 3,
+	output_file_name: str = 'timspeak_io_benchmark.json',
+	directory: str = None,
+	evict: bool = True
+) -> dict:
+	import timspeak.execution_pipeline.io_benchmark_pipeline
+	object_execute_io_benchmark = timspeak.execution_pipeline.io_benchmark_pipeline.IOBenchmarkPipeline(
+		input_file_name,
+		size,
+		output_formats,
+		settings,
+		repeats,
+		output_file_name,
+		directory,
+		evict=evict
+	)
+	return object_execute_io_benchmark.run()
+
 if __name__ == '__main__':
 	import os
 	input_file_name = os.path.join(os.getcwd(), 'timspeak/configuration_files/default_configuration.json')
@@ -10,6 +10,7 @@ import timspeak.data_handlers.indexing
 import timspeak.statistical_utilities.stats
 import timspeak.performance_utilities.compiling
 import timspeak.performance_utilities.multiprocessing
+import timspeak.performance_utilities.memory
 import timspeak.data_handlers.sample_iterator
 import timspeak.peak_picker_algorithms.cluster.cluster_templates
 
@@ -97,12 +98,13 @@ class Clusterer(
         - index_3d: tuple[np.ndarray]
             The index 3D array.
         """
-        cluster_pointers = np.arange(len(self.dia_data.intensity_values))
+        cluster_pointers = timspeak.performance_utilities.memory.arange(len(self.dia_data.intensity_values))
         timspeak.performance_utilities.multiprocessing.parallel(
             self.find_most_intense_neighbors_of_scan
         )(
             range(len(self.dia_data.tof_indptr) - 1),
             cluster_pointers,
+            costs=np.diff(self.dia_data.tof_indptr),
         )
         cluster_count = self.update_and_count_cluster_pointers_from_paths(
             cluster_pointers
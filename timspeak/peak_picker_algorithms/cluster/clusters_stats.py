@@ -7,6 +7,7 @@ import dataclasses
 import timspeak.data_handlers.indexing
 import timspeak.statistical_utilities.stats
 import timspeak.performance_utilities.compiling
+import timspeak.performance_utilities.memory
 
 @timspeak.performance_utilities.compiling.njit_class
 @dataclasses.dataclass(kw_only=True, frozen=False)
@@ -27,9 +28,8 @@ class Clusters3D:
 		return len(self.mz_values)
 
 	def __post_init__(self):
-		expanded_index_pointers = np.repeat(
-			np.arange(len(self.dia_data.tof_indptr) - 1),
-			np.diff(self.dia_data.tof_indptr),
+		expanded_index_pointers = timspeak.performance_utilities.memory.expand_indptr(
+			self.dia_data.tof_indptr
 		)
 		rt_boundaries = self.__calculate_rt_boundaries(
 			expanded_index_pointers
@@ -105,6 +105,7 @@ class ChargeDeisotoper:
         )(
             range(len(self.index.indptr) - 1),
             charge_pointers,
+            costs=np.diff(self.index.indptr),
         )
         return charge_pointers
 
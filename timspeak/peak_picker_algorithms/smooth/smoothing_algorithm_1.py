@@ -7,6 +7,7 @@ import alphatims.dia_data
 # local
 import timspeak.performance_utilities.compiling
 import timspeak.performance_utilities.multiprocessing
+import timspeak.performance_utilities.memory
 import timspeak.data_handlers.sample_iterator
 import timspeak.peak_picker_algorithms.smooth.smooth_templates
 
@@ -88,10 +89,11 @@ class Smoother(
         Returns:
         - np.ndarray: An array containing the smoothed intensity values.
         """
-        buffer_array = np.zeros_like(self.dia_data.intensity_values)
+        buffer_array = timspeak.performance_utilities.memory.zeros_like(self.dia_data.intensity_values)
         timspeak.performance_utilities.multiprocessing.parallel(self.smooth_scan)(
             range(len(self.dia_data.tof_indptr) - 1),
             buffer_array,
+            costs=np.diff(self.dia_data.tof_indptr),
         )
         return buffer_array
 
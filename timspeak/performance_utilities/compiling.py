@@ -1,19 +1,96 @@
 # builtin
 import ast
+import time
 import textwrap
 import inspect
 import types
+import threading
+import contextlib
 
 
 # external
 import numba
+import numba.core.event
 import pandas as pd
 import numpy as np
 
 
+COMPILE_PROFILE_LOCK = threading.Lock()
+COMPILE_PROFILE = None
+
+
+@contextlib.contextmanager
+def profile_compilation():
+    """
+    Record the time spent on preparing the njit methods of njit_class
+    instances and on compiling all numba functions within this context.
+
+    Yields:
+    - dict: Filled when the context is left, with for every class (or
+        module-level function) the number of instances prepared, the time
+        (in seconds) spent preparing them, and the number of compilations
+        and the time spent compiling, excluding the numba functions that
+        were compiled as part of them.
+    """
+    global COMPILE_PROFILE
+    owners = {}
+    profile = {}
+    with COMPILE_PROFILE_LOCK:
+        COMPILE_PROFILE = {"owners": owners, "profile": profile}
+    try:
+        with numba.core.event.install_recorder("numba:compile") as recorder:
+            yield profile
+    finally:
+        with COMPILE_PROFILE_LOCK:
+            COMPILE_PROFILE = None
+        add_compile_times(profile, owners, recorder.buffer)
+
+
+def get_owner_profile(profile: dict, owner: str) -> dict:
+    return profile.setdefault(
+        owner,
+        {"instances": 0, "wrap_time_s": 0.0, "compilations": 0, "compile_time_s": 0.0}
+    )
+
+
+def get_dispatcher_owner(dispatcher, owners: dict) -> str:
+    if id(dispatcher) in owners:
+        return owners[id(dispatcher)]
+    py_func = dispatcher.py_func
+    # e.g. the worker of a parallel function belongs to the function it calls
+    for cell in py_func.__closure__ or ():
+        try:
+            cell_contents = cell.cell_contents
+        except ValueError:
+            continue
+        if id(cell_contents) in owners:
+            return owners[id(cell_contents)]
+    return f"{py_func.__module__}.{py_func.__qualname__}"
+
+
+def add_compile_times(profile: dict, owners: dict, events: list) -> None:
+    # compilations nest (and hold the numba compiler lock, so they never
+    # interleave), so the time of a compilation excludes that of its callees
+    stack = []
+    for timestamp, event in events:
+        if event.is_start:
+            stack.append([timestamp, 0.0])
+            continue
+        start_time, callee_time = stack.pop()
+        duration = timestamp - start_time
+        if stack:
+            stack[-1][1] += duration
+        owner_profile = get_owner_profile(profile, get_dispatcher_owner(event.data["dispatcher"], owners))
+        owner_profile["compilations"] += 1
+        owner_profile["compile_time_s"] += duration - callee_time
+
+
 def precompile_njit_functions_from_object(object_):
     if not is_regular_object_with_dict(object_):
         return
+    compile_profile = COMPILE_PROFILE
+    if compile_profile is not None:
+        start_time = time.perf_counter()
     create_njit_module_for_object(object_)
     for func in iterate_over_callables_from_object(object_):
         try:
@@ -24,6 +101,12 @@ def precompile_njit_functions_from_object(object_):
             if tree_has_decorator_containing_name(tree, "njit"):
                 add_njit_function_to_object_njit_module(object_, func, tree)
                 overwrite_object_function_with_njit_function(object_, func)
+                if compile_profile is not None:
+                    compile_profile["owners"][id(getattr(object_.__njit__, func.__name__))] = object_.__class__.__name__
+    if compile_profile is not None:
+        owner_profile = get_owner_profile(compile_profile["profile"], object_.__class__.__name__)
+        owner_profile["instances"] += 1
+        owner_profile["wrap_time_s"] += time.perf_counter() - start_time
 
 
 def is_regular_object_with_dict(object_):
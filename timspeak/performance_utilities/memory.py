@@ -0,0 +1,278 @@
+# builtin
+import os
+import sys
+import atexit
+import tempfile
+import threading
+
+# external
+import numba
+import numpy as np
+import psutil
+
+# local
+import timspeak.performance_utilities.multiprocessing
+
+
+MAX_MEMORY_BYTES = None
+SCRATCH_DIRECTORY = None
+SCRATCH_FILE_NAMES = []
+SCRATCH_LOCK = threading.Lock()
+CHUNK_SIZE = 2**24
+# buffers of at least this size are initialized by the pinned worker threads
+# that use them, so that their pages are on the NUMA nodes of these threads
+FIRST_TOUCH_MIN_BYTES = 2**24
+
+
+def set_max_memory(max_memory_gb: float = None) -> int:
+    """
+    Set the memory budget of the process. Buffers that would make the
+    resident memory of the process exceed it are allocated as memory-mapped
+    files in the scratch directory instead.
+
+    Parameters:
+    - max_memory_gb: float
+        (Default: None)
+        The memory budget in GB. None means no budget.
+
+    Returns:
+    - int: The memory budget in bytes, or None.
+    """
+    global MAX_MEMORY_BYTES
+    if max_memory_gb is None:
+        MAX_MEMORY_BYTES = None
+    else:
+        MAX_MEMORY_BYTES = int(max_memory_gb * 1024**3)
+    return MAX_MEMORY_BYTES
+
+
+def set_scratch_directory(scratch_directory: str = None) -> str:
+    """
+    Set the directory for memory-mapped buffers.
+
+    Parameters:
+    - scratch_directory: str
+        (Default: None)
+        The scratch directory. None means the temporary directory of the system.
+
+    Returns:
+    - str: The scratch directory.
+    """
+    global SCRATCH_DIRECTORY
+    if scratch_directory is None:
+        scratch_directory = tempfile.gettempdir()
+    os.makedirs(scratch_directory, exist_ok=True)
+    SCRATCH_DIRECTORY = scratch_directory
+    return SCRATCH_DIRECTORY
+
+
+def get_used_memory() -> int:
+    return psutil.Process().memory_info().rss
+
+
+def get_peak_memory() -> int:
+    """
+    Get the highest resident memory (in bytes) of the process since it
+    started, or on Linux since the last reset_peak_memory.
+    """
+    memory_info = psutil.Process().memory_info()
+    if hasattr(memory_info, "peak_wset"):
+        # Windows
+        return memory_info.peak_wset
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/status") as status_file:
+                for line in status_file:
+                    if line.startswith("VmHWM:"):
+                        # kilobytes
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+    import resource
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak_memory
+    # kilobytes on Linux
+    return peak_memory * 1024
+
+
+def reset_peak_memory() -> bool:
+    """
+    Reset the highest resident memory of the process to its current
+    resident memory. This is only possible on Linux.
+
+    Returns:
+    - bool: True if the peak was reset.
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs_file:
+            # 5 resets the peak resident set size (VmHWM)
+            clear_refs_file.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def use_scratch(nbytes: int) -> bool:
+    if (MAX_MEMORY_BYTES is None) or (nbytes == 0):
+        return False
+    return get_used_memory() + nbytes > MAX_MEMORY_BYTES
+
+
+def create_scratch_array(shape: tuple, dtype: np.dtype) -> np.ndarray:
+    if SCRATCH_DIRECTORY is None:
+        set_scratch_directory()
+    file_descriptor, file_name = tempfile.mkstemp(
+        prefix="timspeak_",
+        suffix=".scratch",
+        dir=SCRATCH_DIRECTORY,
+    )
+    os.close(file_descriptor)
+    array = np.memmap(file_name, dtype=dtype, mode="w+", shape=shape)
+    try:
+        # the mapping stays valid, the file is gone once the array is
+        # garbage collected or the process ends, whatever the reason
+        os.remove(file_name)
+    except OSError:
+        with SCRATCH_LOCK:
+            SCRATCH_FILE_NAMES.append(file_name)
+    return np.asarray(array)
+
+
+@atexit.register
+def cleanup() -> None:
+    """
+    Remove the scratch files that could not be removed when created.
+    """
+    with SCRATCH_LOCK:
+        remaining_file_names = []
+        for file_name in SCRATCH_FILE_NAMES:
+            try:
+                os.remove(file_name)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                remaining_file_names.append(file_name)
+        SCRATCH_FILE_NAMES[:] = remaining_file_names
+
+
+def empty(shape, dtype=np.float64) -> np.ndarray:
+    """
+    Same as np.empty, but memory-mapped in the scratch directory if
+    the memory budget would be exceeded. Filled with zeros in a block per
+    worker thread if threads are pinned (see fill_zeros).
+    """
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    if use_scratch(nbytes):
+        return create_scratch_array(shape, dtype)
+    array = np.empty(shape, dtype=dtype)
+    if use_first_touch(array):
+        fill_zeros(array)
+    return array
+
+
+def zeros(shape, dtype=np.float64) -> np.ndarray:
+    """
+    Same as np.zeros, but memory-mapped in the scratch directory if
+    the memory budget would be exceeded. Filled in a block per worker
+    thread if threads are pinned (see fill_zeros).
+    """
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    if use_scratch(nbytes):
+        # new files are filled with zeros
+        return create_scratch_array(shape, dtype)
+    # large zeroed buffers are mapped without touching their pages
+    array = np.zeros(shape, dtype=dtype)
+    if use_first_touch(array):
+        fill_zeros(array)
+    return array
+
+
+def zeros_like(array: np.ndarray) -> np.ndarray:
+    return zeros(array.shape, dtype=array.dtype)
+
+
+def use_first_touch(array: np.ndarray) -> bool:
+    return (
+        (timspeak.performance_utilities.multiprocessing.THREAD_PLACEMENT != "none")
+        and (array.nbytes >= FIRST_TOUCH_MIN_BYTES)
+        and (array.dtype.kind in "biuf")
+        and not isinstance(array.base, np.memmap)
+    )
+
+
+@timspeak.performance_utilities.multiprocessing.parallel(include_progress_callback=False)
+@numba.njit(nogil=True)
+def fill_zeros_block(block_index, array, block_size):
+    start = block_index * block_size
+    end = min(start + block_size, len(array))
+    for index in range(start, end):
+        array[index] = 0
+
+
+def fill_zeros(array: np.ndarray) -> None:
+    """
+    Fill an array with zeros in a contiguous block per worker thread, so
+    that the pages of every block are placed on the NUMA node of the pinned
+    thread that fills it. Parallel functions take their items in chunks or
+    strides rather than in these blocks, so a kernel does not necessarily
+    find its items on its own node, but the array is spread evenly over the
+    NUMA nodes of all threads instead of lying on a single node.
+
+    Parameters:
+    - array: np.ndarray
+        The (C-contiguous) array to fill.
+    """
+    flat_array = array.reshape(-1)
+    block_count = timspeak.performance_utilities.multiprocessing.get_threads()
+    fill_zeros_block(range(block_count), flat_array, -(-len(flat_array) // block_count))
+
+
+@timspeak.performance_utilities.multiprocessing.parallel(include_progress_callback=False)
+@numba.njit(nogil=True)
+def fill_arange_block(block_index, array, block_size):
+    start = block_index * block_size
+    end = min(start + block_size, len(array))
+    for index in range(start, end):
+        array[index] = index
+
+
+def arange(stop: int, dtype=np.int64) -> np.ndarray:
+    """
+    Same as np.arange(stop), but memory-mapped in the scratch directory if
+    the memory budget would be exceeded. Filled in a block per worker thread
+    if threads are pinned (see
+    timspeak.performance_utilities.multiprocessing.set_thread_placement).
+    """
+    array = empty(stop, dtype=dtype)
+    if use_first_touch(array):
+        block_count = timspeak.performance_utilities.multiprocessing.get_threads()
+        fill_arange_block(range(block_count), array, -(-stop // block_count))
+        return array
+    for start in range(0, stop, CHUNK_SIZE):
+        end = min(start + CHUNK_SIZE, stop)
+        array[start:end] = np.arange(start, end, dtype=dtype)
+    return array
+
+
+def expand_indptr(indptr: np.ndarray, dtype=np.int64) -> np.ndarray:
+    """
+    Same as np.repeat(np.arange(len(indptr) - 1), np.diff(indptr)), but
+    memory-mapped in the scratch directory if the memory budget would
+    be exceeded.
+    """
+    array = empty(indptr[-1] - indptr[0], dtype=dtype)
+    offset = indptr[0]
+    rows = len(indptr) - 1
+    step = max(1, CHUNK_SIZE * rows // max(1, len(array)))
+    for start in range(0, rows, step):
+        end = min(start + step, rows)
+        array[indptr[start] - offset: indptr[end] - offset] = np.repeat(
+            np.arange(start, end, dtype=dtype),
+            np.diff(indptr[start: end + 1]),
+        )
+    return array
@@ -0,0 +1,119 @@
+# builtin
+import time
+import shutil
+import threading
+
+# external
+import psutil
+
+# local
+import timspeak.performance_utilities.memory
+import timspeak.performance_utilities.tracing
+
+
+MEMORY_SAMPLE_NAMES = (
+    "rss_bytes",
+    "anonymous_bytes",
+    "file_backed_bytes",
+    "scratch_disk_bytes",
+)
+
+
+class MemorySampler:
+    """
+    Sample the memory of the process in a background thread, and attribute
+    every sample to the stages running at that time.
+
+    Every sample holds the resident memory (rss_bytes), split into anonymous
+    memory (anonymous_bytes) and resident pages backed by files such as
+    memory-mapped arrays (file_backed_bytes), and the growth of the used
+    space on the disk of the scratch directory since sampling started
+    (scratch_disk_bytes).
+
+    Parameters:
+    - interval: float
+        (Default: 1.0)
+        The time (in seconds) between two samples.
+    """
+
+    def __init__(self, interval: float = 1.0) -> None:
+        self.interval = interval
+        self.process = psutil.Process()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.running_stages = set()
+        self.samples = []
+        self.stage_maxima = {}
+        self.start_time = time.perf_counter()
+        self.scratch_directory = timspeak.performance_utilities.memory.SCRATCH_DIRECTORY
+        self.scratch_start_bytes = self.get_scratch_used_bytes()
+        self.thread = threading.Thread(target=self.run, name="timspeak_memory_sampler", daemon=True)
+
+    def get_scratch_used_bytes(self) -> int:
+        if self.scratch_directory is None:
+            return 0
+        return shutil.disk_usage(self.scratch_directory).used
+
+    def get_sample(self) -> dict:
+        memory_info = self.process.memory_info()
+        # only Linux tells file-backed (shared) from anonymous resident pages
+        file_backed_bytes = getattr(memory_info, "shared", 0)
+        return {
+            "time_s": time.perf_counter() - self.start_time,
+            "rss_bytes": memory_info.rss,
+            "anonymous_bytes": memory_info.rss - file_backed_bytes,
+            "file_backed_bytes": file_backed_bytes,
+            "scratch_disk_bytes": max(0, self.get_scratch_used_bytes() - self.scratch_start_bytes),
+        }
+
+    def add_sample(self) -> None:
+        sample = self.get_sample()
+        with self.lock:
+            sample["stages"] = sorted(self.running_stages)
+            self.samples.append(sample)
+            for stage_name in self.running_stages:
+                self.update_stage_maxima(stage_name, sample)
+        timspeak.performance_utilities.tracing.add_counter(
+            "memory",
+            **{name: sample[name] for name in MEMORY_SAMPLE_NAMES}
+        )
+
+    def update_stage_maxima(self, stage_name: str, sample: dict) -> None:
+        stage_maxima = self.stage_maxima.setdefault(stage_name, {})
+        for name in MEMORY_SAMPLE_NAMES:
+            stage_maxima[name] = max(stage_maxima.get(name, 0), sample[name])
+
+    def run(self) -> None:
+        timspeak.performance_utilities.tracing.name_thread("memory sampler")
+        while not self.stop_event.wait(self.interval):
+            self.add_sample()
+
+    def start(self) -> None:
+        self.add_sample()
+        self.thread.start()
+
+    def stop(self) -> None:
+        if self.stop_event.is_set():
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.add_sample()
+
+    def start_stage(self, stage_name: str) -> None:
+        with self.lock:
+            self.running_stages.add(stage_name)
+        # also stages shorter than the interval get a sample
+        self.add_sample()
+
+    def stop_stage(self, stage_name: str) -> None:
+        self.add_sample()
+        with self.lock:
+            self.running_stages.discard(stage_name)
+
+    def get_stage_maxima(self, stage_name: str) -> dict:
+        with self.lock:
+            return dict(self.stage_maxima.get(stage_name, {}))
+
+    def get_timeline(self) -> list:
+        with self.lock:
+            return list(self.samples)
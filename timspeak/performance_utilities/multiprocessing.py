@@ -1,16 +1,65 @@
 # builtin
+import os
+import time
+import queue
 import multiprocessing
 import multiprocessing.pool
+import multiprocessing.shared_memory
+import concurrent.futures
 import functools
 import threading
+import bisect
+import itertools
+import contextlib
 
 # external
 import tqdm
 import numba
 import numpy as np
 
+# local
+import timspeak.performance_utilities.tracing
+
 
 MAX_THREADS = multiprocessing.cpu_count()
+THREAD_BUDGET = threading.local()
+PARALLEL_PROFILES_LOCK = threading.Lock()
+PARALLEL_PROFILES = None
+# with costs, parallel functions split their work items in contiguous chunks
+# of about equal cost (balanced) instead of every thread taking every n-th
+# item (stride); threads take the next chunk when done with their previous one
+PARALLEL_SCHEDULES = ("balanced", "stride")
+PARALLEL_SCHEDULE = "balanced"
+CHUNKS_PER_THREAD = 16
+# worker threads are kept alive in a pool between calls of parallel functions
+WORKER_POOL_LOCK = threading.Lock()
+WORKER_POOL = None
+PROGRESS_INTERVAL = 0.1
+# parallel functions run on the worker pool (threads) or in a prange loop
+# compiled with parallel=True on the threading layer of numba (numba),
+# which can be chosen for every kernel by its name
+PARALLEL_BACKENDS = ("threads", "numba")
+PARALLEL_BACKEND = "threads"
+PARALLEL_BACKEND_OVERRIDES = {}
+FORCED_BACKEND = threading.local()
+NUMBA_THREADING_LAYERS = ("default", "safe", "threadsafe", "forksafe", "tbb", "omp", "workqueue")
+NUMBA_BACKEND_LOCK = threading.Lock()
+# worker threads of the pool are pinned to the CPUs of THREAD_PLACEMENT_CPUS
+# in order: compact fills the CPUs of one NUMA node before the next node,
+# scatter alternates between the NUMA nodes, none does not pin threads
+THREAD_PLACEMENTS = ("none", "compact", "scatter")
+THREAD_PLACEMENT = "none"
+THREAD_PLACEMENT_CPUS = None
+if hasattr(os, "sched_getaffinity"):
+    PROCESS_CPUS = sorted(os.sched_getaffinity(0))
+else:
+    PROCESS_CPUS = list(range(multiprocessing.cpu_count()))
+# process pools are kept alive between calls of processpool functions, by
+# their number of processes; arrays of at least SHARED_ARRAY_MIN_BYTES are
+# passed to and from their processes through shared memory
+PROCESS_POOLS_LOCK = threading.Lock()
+PROCESS_POOLS = {}
+SHARED_ARRAY_MIN_BYTES = 2**20
 
 
 def set_threads(threads: int, set_global: bool = True) -> int:
@@ -26,6 +75,821 @@ def set_threads(threads: int, set_global: bool = True) -> int:
     return threads
 
 
+def get_threads() -> int:
+    return getattr(THREAD_BUDGET, "threads", MAX_THREADS)
+
+
+@contextlib.contextmanager
+def thread_budget(threads: int):
+    """
+    Limit the number of threads used by parallel functions that are
+    called from the current thread, without changing MAX_THREADS for
+    any other thread.
+
+    Parameters:
+    - threads: int
+        The number of threads available within this context.
+    """
+    previous_threads = getattr(THREAD_BUDGET, "threads", None)
+    THREAD_BUDGET.threads = set_threads(threads, set_global=False)
+    try:
+        yield THREAD_BUDGET.threads
+    finally:
+        if previous_threads is None:
+            del THREAD_BUDGET.threads
+        else:
+            THREAD_BUDGET.threads = previous_threads
+
+
+def set_parallel_schedule(schedule: str) -> str:
+    if schedule not in PARALLEL_SCHEDULES:
+        raise ValueError(
+            f"Unknown parallel schedule {schedule}, expected one of {', '.join(PARALLEL_SCHEDULES)}"
+        )
+    global PARALLEL_SCHEDULE
+    PARALLEL_SCHEDULE = schedule
+    return schedule
+
+
+def set_parallel_backend(backend: str, overrides: dict = None) -> str:
+    """
+    Set the backend of all parallel functions.
+
+    Parameters:
+    - backend: str
+        The backend in PARALLEL_BACKENDS.
+    - overrides: dict
+        (Default: None)
+        The backend of specific parallel functions, by the name of the
+        function they call for every work item, e.g. "smooth_scan".
+
+    Returns:
+    - str: The backend.
+    """
+    overrides = dict(overrides or {})
+    for name, override in [("parallel_backend", backend)] + list(overrides.items()):
+        if override not in PARALLEL_BACKENDS:
+            raise ValueError(
+                f"Unknown parallel backend {override} for {name}, expected one of {', '.join(PARALLEL_BACKENDS)}"
+            )
+    global PARALLEL_BACKEND, PARALLEL_BACKEND_OVERRIDES
+    PARALLEL_BACKEND = backend
+    PARALLEL_BACKEND_OVERRIDES = overrides
+    return backend
+
+
+def get_parallel_backend(name: str) -> str:
+    return getattr(
+        FORCED_BACKEND,
+        "backend",
+        PARALLEL_BACKEND_OVERRIDES.get(name, PARALLEL_BACKEND)
+    )
+
+
+@contextlib.contextmanager
+def parallel_backend(backend: str):
+    """
+    Use a backend for all parallel functions that are called from the
+    current thread, regardless of their overrides.
+
+    Parameters:
+    - backend: str
+        The backend in PARALLEL_BACKENDS.
+    """
+    if backend not in PARALLEL_BACKENDS:
+        raise ValueError(
+            f"Unknown parallel backend {backend}, expected one of {', '.join(PARALLEL_BACKENDS)}"
+        )
+    previous_backend = getattr(FORCED_BACKEND, "backend", None)
+    FORCED_BACKEND.backend = backend
+    try:
+        yield backend
+    finally:
+        if previous_backend is None:
+            del FORCED_BACKEND.backend
+        else:
+            FORCED_BACKEND.backend = previous_backend
+
+
+def set_numba_threading_layer(threading_layer: str) -> str:
+    """
+    Set the threading layer of numba for the numba backend. It only has an
+    effect before the first function compiled with parallel=True runs.
+
+    Parameters:
+    - threading_layer: str
+        The threading layer in NUMBA_THREADING_LAYERS.
+
+    Returns:
+    - str: The threading layer.
+    """
+    if threading_layer not in NUMBA_THREADING_LAYERS:
+        raise ValueError(
+            f"Unknown numba threading layer {threading_layer}, expected one of {', '.join(NUMBA_THREADING_LAYERS)}"
+        )
+    numba.config.THREADING_LAYER = threading_layer
+    return threading_layer
+
+
+@numba.njit(nogil=True, parallel=True)
+def fill_range(values):
+    for i in numba.prange(len(values)):
+        values[i] = i
+
+
+def start_numba_threads() -> str:
+    """
+    Start the threading layer of numba from the current thread, which should
+    be the main thread: the TBB layer hangs when its process exits if it was
+    started from another thread, e.g. that of a stage.
+
+    Returns:
+    - str: The threading layer that was started.
+    """
+    fill_range(np.empty(1, dtype=np.int64))
+    return numba.threading_layer()
+
+
+def get_numba_backend_lock():
+    # the workqueue threading layer must not run two parallel functions at
+    # the same time, e.g. from stages that run concurrently
+    try:
+        threadsafe = numba.threading_layer() != "workqueue"
+    except ValueError:
+        threadsafe = False
+    if threadsafe:
+        return contextlib.nullcontext()
+    return NUMBA_BACKEND_LOCK
+
+
+def parse_cpu_list(cpu_list: str) -> list:
+    """
+    Parse a list of CPUs as written by Linux, e.g. "0-3,8-11".
+    """
+    cpus = []
+    for cpu_range in cpu_list.strip().split(","):
+        if not cpu_range:
+            continue
+        first_cpu, _, last_cpu = cpu_range.partition("-")
+        cpus.extend(range(int(first_cpu), int(last_cpu or first_cpu) + 1))
+    return cpus
+
+
+def get_numa_nodes() -> list:
+    """
+    Get the CPUs of every NUMA node that this process may use.
+
+    Returns:
+    - list: The sorted CPUs of every NUMA node with any, or all CPUs as a
+        single node if the NUMA nodes are unknown, e.g. outside Linux.
+    """
+    nodes = []
+    node_directory = "/sys/devices/system/node"
+    if os.path.isdir(node_directory):
+        node_names = [
+            name for name in os.listdir(node_directory)
+            if name.startswith("node") and name[4:].isdigit()
+        ]
+        for node_name in sorted(node_names, key=lambda name: int(name[4:])):
+            with open(os.path.join(node_directory, node_name, "cpulist")) as cpu_list_file:
+                cpus = sorted(set(parse_cpu_list(cpu_list_file.read())) & set(PROCESS_CPUS))
+            if cpus:
+                nodes.append(cpus)
+    return nodes or [list(PROCESS_CPUS)]
+
+
+def get_placement_cpus(placement: str, nodes: list) -> list:
+    """
+    Order the CPUs of all NUMA nodes in which worker threads are pinned.
+
+    Parameters:
+    - placement: str
+        "compact" or "scatter" (see THREAD_PLACEMENTS).
+    - nodes: list
+        The CPUs of every NUMA node (see get_numa_nodes).
+
+    Returns:
+    - list: The CPU of every thread_id, after which the order repeats.
+    """
+    if placement == "compact":
+        return [cpu for cpus in nodes for cpu in cpus]
+    return [
+        cpus[index] for index in range(max(len(cpus) for cpus in nodes))
+        for cpus in nodes if index < len(cpus)
+    ]
+
+
+def set_thread_placement(placement: str) -> list:
+    """
+    Pin the worker threads of parallel functions to CPUs by the thread_id of
+    their task (see WorkerPool), which the threads apply before their next
+    task. The numba backend is not pinned.
+
+    Parameters:
+    - placement: str
+        The placement in THREAD_PLACEMENTS.
+
+    Returns:
+    - list: The CPU of every thread_id (see get_placement_cpus), or
+        None if threads are not pinned, also where this is not supported.
+    """
+    if placement not in THREAD_PLACEMENTS:
+        raise ValueError(
+            f"Unknown thread placement {placement}, expected one of {', '.join(THREAD_PLACEMENTS)}"
+        )
+    global THREAD_PLACEMENT, THREAD_PLACEMENT_CPUS
+    if (placement == "none") or not hasattr(os, "sched_setaffinity"):
+        THREAD_PLACEMENT = "none"
+        THREAD_PLACEMENT_CPUS = None
+    else:
+        THREAD_PLACEMENT = placement
+        THREAD_PLACEMENT_CPUS = get_placement_cpus(placement, get_numa_nodes())
+    return THREAD_PLACEMENT_CPUS
+
+
+def pin_thread(thread_id: int, placement_cpus: list) -> None:
+    # on Linux, pid 0 sets the affinity of the calling thread only
+    if not hasattr(os, "sched_setaffinity"):
+        return
+    if placement_cpus is None:
+        os.sched_setaffinity(0, PROCESS_CPUS)
+    else:
+        os.sched_setaffinity(0, [placement_cpus[thread_id % len(placement_cpus)]])
+
+
+def get_chunk_borders(costs: np.ndarray, chunk_count: int) -> np.ndarray:
+    """
+    Split work items in contiguous chunks of about equal cost. Every item
+    belongs to the chunk that holds the middle of its cost, and costs one
+    more than given, so that items without cost are spread as well.
+
+    Parameters:
+    - costs: np.ndarray
+        The cost of every work item.
+    - chunk_count: int
+        The maximum number of chunks.
+
+    Returns:
+    - np.ndarray: The first item of every chunk, followed by the number of
+        items. An item that costs more than two chunks is a chunk of its own.
+    """
+    costs = np.asarray(costs, dtype=np.float64) + 1
+    if len(costs) == 0:
+        return np.zeros(1, dtype=np.int64)
+    cumulative_costs = np.cumsum(costs)
+    targets = np.linspace(0, cumulative_costs[-1], chunk_count + 1)[1:-1]
+    chunk_borders = np.searchsorted(cumulative_costs - costs / 2, targets)
+    return np.unique(
+        np.concatenate([[0], chunk_borders, [len(costs)]])
+    ).astype(np.int64)
+
+
+def run_chunked_worker(
+    worker_func,
+    iterable,
+    chunk_borders: np.ndarray,
+    chunk_counter: itertools.count,
+    *args
+) -> None:
+    # args are those of the compiled worker of parallel, of which the
+    # iterable, start, stop and step are replaced by those of every chunk;
+    # next on an itertools.count holds the GIL, so every chunk is taken once
+    thread_id, progress_counter = args[1:3]
+    while True:
+        chunk_index = next(chunk_counter)
+        if chunk_index >= len(chunk_borders) - 1:
+            break
+        chunk = iterable[chunk_borders[chunk_index]: chunk_borders[chunk_index + 1]]
+        if isinstance(chunk, range):
+            worker_func(args[0], thread_id, progress_counter, chunk.start, chunk.stop, chunk.step, *args[6:])
+        else:
+            worker_func(chunk, thread_id, progress_counter, -1, -1, -1, *args[6:])
+
+
+class TaskBatch:
+    """
+    The tasks of a single call of a parallel function, of which the caller
+    waits for the last one to finish.
+
+    Parameters:
+    - task_count: int
+        The number of tasks.
+    """
+
+    def __init__(self, task_count: int) -> None:
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.remaining_task_count = task_count
+        self.exception = None
+        if task_count == 0:
+            self.finished.set()
+
+    def finish_task(self, exception: BaseException = None) -> None:
+        with self.lock:
+            if (exception is not None) and (self.exception is None):
+                self.exception = exception
+            self.remaining_task_count -= 1
+            if self.remaining_task_count == 0:
+                self.finished.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Wait for all tasks to finish, and raise the first exception of a task.
+
+        Parameters:
+        - timeout: float
+            (Default: None)
+            The maximum time (in seconds) to wait. None waits until all tasks
+            are finished.
+
+        Returns:
+        - bool: Whether all tasks are finished.
+        """
+        if not self.finished.wait(timeout):
+            return False
+        if self.exception is not None:
+            raise self.exception
+        return True
+
+
+class WorkerPool:
+    """
+    Daemon threads that stay alive between calls of parallel functions, so
+    that a call hands its tasks to waiting threads instead of starting new
+    ones. Threads are added when more tasks run at the same time than
+    there are threads, e.g. for stages that run concurrently, so that every
+    task starts as soon as it is dispatched. The tasks of a call go to the
+    idle threads with the lowest numbers, in order, so that the same thread
+    mostly runs the same thread_id. If threads are pinned (see
+    set_thread_placement), every task runs on the CPU of its position in
+    the call, i.e. of its thread_id, also if it runs on another thread
+    because lower threads are busy with a concurrent call.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.threads = []
+        self.task_queues = []
+        self.idle_thread_indices = []
+
+    def dispatch(self, worker_func, task_args: list) -> TaskBatch:
+        """
+        Run worker_func once for every tuple of arguments in task_args, each
+        on its own thread.
+
+        Parameters:
+        - worker_func: callable
+            The function to run.
+        - task_args: list
+            The arguments of every task.
+
+        Returns:
+        - TaskBatch: The tasks, to wait for.
+        """
+        batch = TaskBatch(len(task_args))
+        with self.lock:
+            while len(self.idle_thread_indices) < len(task_args):
+                self.start_thread()
+            thread_indices = self.idle_thread_indices[:len(task_args)]
+            del self.idle_thread_indices[:len(task_args)]
+        for task_index, (thread_index, args) in enumerate(zip(thread_indices, task_args)):
+            self.task_queues[thread_index].put((worker_func, args, batch, task_index))
+        return batch
+
+    def start_thread(self) -> None:
+        thread_index = len(self.threads)
+        thread = threading.Thread(
+            target=self.run_thread,
+            args=(thread_index,),
+            name=f"parallel worker {thread_index}",
+            daemon=True
+        )
+        self.threads.append(thread)
+        self.task_queues.append(queue.SimpleQueue())
+        bisect.insort(self.idle_thread_indices, thread_index)
+        thread.start()
+
+    def run_thread(self, thread_index: int) -> None:
+        task_queue = self.task_queues[thread_index]
+        placement_cpus = None
+        placement_index = None
+        while True:
+            worker_func, args, batch, task_index = task_queue.get()
+            if (placement_cpus is not THREAD_PLACEMENT_CPUS) or (
+                (placement_cpus is not None) and (placement_index != task_index)
+            ):
+                placement_cpus = THREAD_PLACEMENT_CPUS
+                placement_index = task_index
+                pin_thread(placement_index, placement_cpus)
+            exception = None
+            try:
+                worker_func(*args)
+            except BaseException as task_exception:
+                exception = task_exception
+            with self.lock:
+                bisect.insort(self.idle_thread_indices, thread_index)
+            batch.finish_task(exception)
+            del worker_func, args, batch, task_index
+
+
+def get_worker_pool() -> WorkerPool:
+    global WORKER_POOL
+    with WORKER_POOL_LOCK:
+        if WORKER_POOL is None:
+            WORKER_POOL = WorkerPool()
+        return WORKER_POOL
+
+
+def reset_worker_pool() -> None:
+    # the threads of the pool do not exist in a forked process
+    global WORKER_POOL, WORKER_POOL_LOCK
+    WORKER_POOL_LOCK = threading.Lock()
+    WORKER_POOL = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_worker_pool)
+
+
+@contextlib.contextmanager
+def profile_parallel():
+    """
+    Record how the work of every parallel function called within this
+    context was spread over its threads.
+
+    Yields:
+    - list: Filled with a dict for every call of a parallel function, with
+        its name, number of threads, wall time (in seconds), and the number
+        of work items and finish time (in seconds after the start of the
+        call) of every thread.
+    """
+    global PARALLEL_PROFILES
+    with PARALLEL_PROFILES_LOCK:
+        PARALLEL_PROFILES = []
+        profiles = PARALLEL_PROFILES
+    try:
+        yield profiles
+    finally:
+        with PARALLEL_PROFILES_LOCK:
+            PARALLEL_PROFILES = None
+
+
+def add_parallel_profile(profile: dict) -> None:
+    with PARALLEL_PROFILES_LOCK:
+        if PARALLEL_PROFILES is not None:
+            PARALLEL_PROFILES.append(profile)
+
+
+def run_timed_worker(worker_func, start_time: float, finish_times: np.ndarray, *args) -> None:
+    thread_id = args[1]
+    worker_func(*args)
+    finish_times[thread_id] = time.perf_counter() - start_time
+
+
+def run_traced_worker(worker_func, name: str, *args) -> None:
+    # args are those of the compiled worker of parallel: iterable, thread_id, progress_counter, ...
+    thread_id = args[1]
+    progress_counter = args[2]
+    timspeak.performance_utilities.tracing.name_thread(threading.current_thread().name)
+    start_time = timspeak.performance_utilities.tracing.get_timestamp()
+    worker_func(*args)
+    timspeak.performance_utilities.tracing.add_span(
+        name,
+        "worker",
+        start_time,
+        thread_id=thread_id,
+        work_items=int(progress_counter[thread_id]),
+    )
+
+
+class SharedBlock:
+    """
+    A block of shared memory, which is closed when no array uses it anymore,
+    and then also removed by the process that owns it.
+
+    Parameters:
+    - block: multiprocessing.shared_memory.SharedMemory
+        The block.
+    - owner: bool
+        Remove the block when it is closed.
+    """
+
+    def __init__(
+        self,
+        block: multiprocessing.shared_memory.SharedMemory,
+        owner: bool
+    ) -> None:
+        self.block = block
+        self.owner = owner
+        self.bytes = np.frombuffer(block.buf, dtype=np.uint8)
+        self.address = self.bytes.ctypes.data
+
+    def get_array(self, offset: int, shape: tuple, dtype) -> np.ndarray:
+        return np.asarray(SharedArrayBase(self, offset, shape, dtype))
+
+    def __del__(self) -> None:
+        del self.bytes
+        self.block.close()
+        if self.owner:
+            self.block.unlink()
+
+
+class SharedArrayBase:
+    """
+    The base of an array in a SharedBlock, which keeps the block open as
+    long as the array or any of its views exist.
+    """
+
+    def __init__(self, block: SharedBlock, offset: int, shape: tuple, dtype) -> None:
+        dtype = np.dtype(dtype)
+        self.block = block
+        self.offset = offset
+        self.__array_interface__ = {
+            "data": (block.address + offset, False),
+            "shape": tuple(shape),
+            "typestr": dtype.str,
+            "descr": dtype.descr,
+            "version": 3,
+        }
+
+
+class SharedArray:
+    """
+    A reference to an array in shared memory, which is pickled instead of
+    the array and opened as a view of the same memory in another process.
+
+    Parameters:
+    - name: str
+        The name of the shared memory block.
+    - offset: int
+        The offset (in bytes) of the array in the block.
+    - shape: tuple
+        The shape of the array.
+    - dtype: np.dtype
+        The dtype of the array.
+    - owner: bool
+        (Default: False)
+        The process that opens the array owns the block, e.g. for the result
+        of another process.
+    """
+
+    def __init__(self, name: str, offset: int, shape: tuple, dtype, owner: bool = False) -> None:
+        self.name = name
+        self.offset = offset
+        self.shape = shape
+        self.dtype = dtype
+        self.owner = owner
+
+    def open(self) -> np.ndarray:
+        block = SharedBlock(
+            multiprocessing.shared_memory.SharedMemory(name=self.name),
+            self.owner
+        )
+        return block.get_array(self.offset, self.shape, self.dtype)
+
+
+def create_shared_block(size: int, owner: bool = True) -> SharedBlock:
+    return SharedBlock(
+        multiprocessing.shared_memory.SharedMemory(create=True, size=max(size, 1)),
+        owner
+    )
+
+
+def shared_empty(shape, dtype=np.float64) -> np.ndarray:
+    """
+    Create an array in shared memory, which processpool functions read and
+    write in their processes without copying it.
+
+    Parameters:
+    - shape: int or tuple
+        The shape of the array.
+    - dtype: np.dtype
+        (Default: np.float64)
+        The dtype of the array.
+
+    Returns:
+    - np.ndarray: The uninitialized array, whose memory is released when
+        it and all its views are deleted.
+    """
+    shape = tuple(np.atleast_1d(shape).astype(np.int64).tolist())
+    dtype = np.dtype(dtype)
+    block = create_shared_block(int(np.prod(shape)) * dtype.itemsize)
+    return block.get_array(0, shape, dtype)
+
+
+def shared_copy(array: np.ndarray) -> np.ndarray:
+    """
+    Copy an array to shared memory (see shared_empty).
+
+    Parameters:
+    - array: np.ndarray
+        The array.
+
+    Returns:
+    - np.ndarray: The copy in shared memory.
+    """
+    copy = shared_empty(array.shape, array.dtype)
+    copy[...] = array
+    return copy
+
+
+def get_shared_array_base(array: np.ndarray) -> SharedArrayBase:
+    base = array
+    while isinstance(base, np.ndarray):
+        base = base.base
+    if isinstance(base, SharedArrayBase):
+        return base
+    return None
+
+
+def share_arrays(value, blocks: list = None, transfer: bool = False):
+    """
+    Replace the arrays in a value by references to shared memory, so that
+    they are not copied when the value is sent to another process.
+
+    Parameters:
+    - value:
+        An array, or a tuple, list or dict of values. Other values are kept.
+    - blocks: list
+        (Default: None)
+        The list to which the blocks of copied arrays are appended, which
+        must be kept until the other process opened them.
+    - transfer: bool
+        (Default: False)
+        The other process owns the copied arrays instead of this one, e.g.
+        for the results of a process.
+
+    Returns:
+    - The value with references instead of arrays. Arrays that are already
+        in shared memory (see shared_empty) are not copied, other arrays are
+        copied to shared memory if they have at least SHARED_ARRAY_MIN_BYTES.
+    """
+    if isinstance(value, tuple):
+        return tuple(share_arrays(item, blocks, transfer) for item in value)
+    if isinstance(value, list):
+        return [share_arrays(item, blocks, transfer) for item in value]
+    if isinstance(value, dict):
+        return {key: share_arrays(item, blocks, transfer) for key, item in value.items()}
+    if not isinstance(value, np.ndarray) or value.dtype.hasobject:
+        return value
+    base = get_shared_array_base(value)
+    owner = False
+    if (base is None) or (not value.flags.c_contiguous):
+        if value.nbytes < SHARED_ARRAY_MIN_BYTES:
+            return value
+        block = create_shared_block(value.nbytes, owner=not transfer)
+        copy = block.get_array(0, value.shape, value.dtype)
+        copy[...] = value
+        value = copy
+        base = get_shared_array_base(copy)
+        owner = transfer
+        if blocks is not None:
+            blocks.append(block)
+    return SharedArray(
+        base.block.block.name,
+        value.ctypes.data - base.block.address,
+        value.shape,
+        value.dtype,
+        owner
+    )
+
+
+def open_shared_arrays(value):
+    """
+    Replace the references to shared memory in a value by arrays (see
+    share_arrays).
+    """
+    if isinstance(value, tuple):
+        return tuple(open_shared_arrays(item) for item in value)
+    if isinstance(value, list):
+        return [open_shared_arrays(item) for item in value]
+    if isinstance(value, dict):
+        return {key: open_shared_arrays(item) for key, item in value.items()}
+    if isinstance(value, SharedArray):
+        return value.open()
+    return value
+
+
+def run_in_process(func, item, args: tuple, kwargs: dict, threads: int):
+    set_threads(threads)
+    item, args, kwargs = open_shared_arrays((item, args, kwargs))
+    result = func(item, *args, **kwargs)
+    # the process that called the processpool function owns the results
+    return share_arrays(result, transfer=True)
+
+
+def release_results(futures: list) -> None:
+    # results that are not returned, e.g. after an exception, are opened to
+    # remove the shared memory they own
+    for future in futures:
+        if future.done() and not future.cancelled() and future.exception() is None:
+            open_shared_arrays(future.result())
+
+
+def get_process_pool(process_count: int) -> concurrent.futures.ProcessPoolExecutor:
+    with PROCESS_POOLS_LOCK:
+        if process_count not in PROCESS_POOLS:
+            PROCESS_POOLS[process_count] = concurrent.futures.ProcessPoolExecutor(
+                process_count,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return PROCESS_POOLS[process_count]
+
+
+def reset_process_pools() -> None:
+    # the processes of the pools belong to the parent of a forked process
+    global PROCESS_POOLS, PROCESS_POOLS_LOCK
+    PROCESS_POOLS_LOCK = threading.Lock()
+    PROCESS_POOLS = {}
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_process_pools)
+
+
+def processpool(
+    _func=None,
+    *,
+    process_count=None,
+    return_results: bool = False,
+    include_progress_callback: bool = True,
+):
+    """
+    Call a function for every item of an iterable in a pool of processes,
+    for work that holds the GIL. Arrays in the items, the arguments and the
+    results are passed through shared memory (see share_arrays), and
+    arrays created with shared_empty can be written by the function in
+    place. The function must be importable, e.g. defined in a module.
+
+    Parameters:
+    - process_count: int
+        (Default: the number of threads)
+        The number of processes, among which the threads are split.
+    - return_results: bool
+        (Default: False)
+        Return the results of all items, in the order of the iterable.
+    - include_progress_callback: bool
+        (Default: True)
+        Show a progress bar.
+    """
+
+    def processpool_func_inner(func):
+        def wrapper(iterable, *args, **kwargs):
+            try:
+                iter(iterable)
+            except TypeError:
+                return func(iterable, *args, **kwargs)
+            threads = get_threads()
+            if process_count is None:
+                current_process_count = threads
+            else:
+                current_process_count = set_threads(process_count, set_global=False)
+            threads_per_process = max(1, threads // current_process_count)
+            blocks = []
+            shared_args = share_arrays((args, kwargs), blocks=blocks)
+            executor = get_process_pool(current_process_count)
+            with timspeak.performance_utilities.tracing.span(
+                func.__name__,
+                "processpool",
+                processes=current_process_count,
+                work_items=len(iterable),
+            ):
+                futures = [
+                    executor.submit(
+                        run_in_process,
+                        func,
+                        share_arrays(item, blocks=blocks),
+                        *shared_args,
+                        threads_per_process
+                    ) for item in iterable
+                ]
+                results = []
+                opened_count = 0
+                try:
+                    for future in tqdm.tqdm(
+                        futures,
+                        disable=not include_progress_callback,
+                    ):
+                        result = future.result()
+                        opened_count += 1
+                        result = open_shared_arrays(result)
+                        if return_results:
+                            results.append(result)
+                finally:
+                    for future in futures:
+                        future.cancel()
+                    concurrent.futures.wait(futures)
+                    release_results(futures[opened_count:])
+                    del blocks
+            if return_results:
+                return results
+        return functools.wraps(func)(wrapper)
+    if _func is None:
+        return processpool_func_inner
+    else:
+        return processpool_func_inner(_func)
+
+
 def threadpool(
     _func=None,
     *,
@@ -44,7 +908,7 @@ def threadpool(
             except TypeError:
                 return func(iterable, *args, **kwargs)
             if thread_count is None:
-                current_thread_count = MAX_THREADS
+                current_thread_count = get_threads()
             else:
                 current_thread_count = set_threads(
                     thread_count,
@@ -73,6 +937,65 @@ def threadpool(
 
 
 
+def get_parallel_workers(numba_func) -> tuple:
+    """
+    Get the compiled workers of the threads and numba backends that call
+    numba_func for every work item. They are kept with numba_func, so that
+    they are compiled once per kernel instead of for every call of parallel.
+
+    Parameters:
+    - numba_func: numba.core.registry.CPUDispatcher
+        The function called for every work item.
+
+    Returns:
+    - tuple: The worker of the threads backend and of the numba backend.
+    """
+    workers = getattr(numba_func, "_parallel_workers", None)
+    if workers is not None:
+        return workers
+
+    @numba.njit(nogil=True)
+    def numba_func_parallel(
+        iterable,
+        thread_id,
+        progress_counter,
+        start,
+        stop,
+        step,
+        *args,
+    ):
+        if len(iterable) == 0:
+            for i in range(start, stop, step):
+                numba_func(i, *args)
+                progress_counter[thread_id] += 1
+        else:
+            for i in iterable:
+                numba_func(i, *args)
+                progress_counter[thread_id] += 1
+
+    @numba.njit(nogil=True, parallel=True)
+    def numba_func_prange(
+        iterable,
+        start,
+        step,
+        count,
+        *args,
+    ):
+        if len(iterable) == 0:
+            for i in numba.prange(count):
+                numba_func(start + i * step, *args)
+        else:
+            for i in numba.prange(count):
+                numba_func(iterable[i], *args)
+
+    workers = (numba_func_parallel, numba_func_prange)
+    try:
+        numba_func._parallel_workers = workers
+    except AttributeError:
+        pass
+    return workers
+
+
 def parallel(
     _func=None,
     *,
@@ -80,39 +1003,92 @@ def parallel(
     include_progress_callback: bool = True,
 ):
     def parallel_compiled_func_inner(func):
-        numba_func = func
-
-        @numba.njit(nogil=True)
-        def numba_func_parallel(
-            iterable,
-            thread_id,
-            progress_counter,
-            start,
-            stop,
-            step,
-            *args,
-        ):
-            if len(iterable) == 0:
-                for i in range(start, stop, step):
-                    numba_func(i, *args)
-                    progress_counter[thread_id] += 1
-            else:
-                for i in iterable:
-                    numba_func(i, *args)
-                    progress_counter[thread_id] += 1
+        numba_func_parallel, numba_func_prange = get_parallel_workers(func)
 
-        def wrapper(iterable, *args):
+        def wrapper(iterable, *args, costs=None):
             if thread_count is None:
-                current_thread_count = MAX_THREADS
+                current_thread_count = get_threads()
             else:
                 current_thread_count = set_threads(
                     thread_count,
                     set_global=False
                 )
-            threads = []
+            if (costs is not None) and (len(costs) != len(iterable)):
+                raise ValueError(
+                    f"{func.__name__} got {len(costs)} costs for {len(iterable)} work items"
+                )
+            backend = get_parallel_backend(func.__name__)
+            schedule = "stride" if costs is None else PARALLEL_SCHEDULE
+            if backend == "numba":
+                # numba schedules the iterations of a prange loop itself
+                schedule = "numba"
+            with timspeak.performance_utilities.tracing.span(
+                func.__name__,
+                "parallel",
+                threads=current_thread_count,
+                work_items=len(iterable),
+                backend=backend,
+                schedule=schedule,
+            ):
+                if backend == "numba":
+                    run_prange(iterable, current_thread_count, *args)
+                else:
+                    run_parallel(iterable, current_thread_count, costs, schedule, *args)
+
+        def run_prange(iterable, current_thread_count, *args):
+            count = len(iterable)
+            if isinstance(iterable, range):
+                start = iterable.start
+                step = iterable.step
+                iterable = np.array([], dtype=np.int64)
+            else:
+                start = -1
+                step = -1
+            start_time = time.perf_counter()
+            with get_numba_backend_lock():
+                numba.set_num_threads(min(current_thread_count, numba.config.NUMBA_NUM_THREADS))
+                numba_func_prange(iterable, start, step, count, *args)
+            wall_time = time.perf_counter() - start_time
+            # the threads of numba are not observed, so the call counts as a
+            # single thread that processed all work items
+            add_parallel_profile(
+                {
+                    "name": func.__name__,
+                    "threads": current_thread_count,
+                    "wall_time_s": wall_time,
+                    "work_items": [count],
+                    "finish_times_s": [wall_time],
+                }
+            )
+
+        def run_parallel(iterable, current_thread_count, costs, schedule, *args):
+            if len(iterable) == 0:
+                # nothing to dispatch, nor any progress to report
+                return
+            tracing = timspeak.performance_utilities.tracing.is_tracing()
+            profiling = PARALLEL_PROFILES is not None
+            worker_func = numba_func_parallel
+            if schedule == "balanced":
+                worker_func = functools.partial(
+                    run_chunked_worker,
+                    worker_func,
+                    iterable,
+                    get_chunk_borders(costs, current_thread_count * CHUNKS_PER_THREAD),
+                    itertools.count()
+                )
+            if tracing:
+                worker_func = functools.partial(run_traced_worker, worker_func, func.__name__)
+            if profiling:
+                start_time = time.perf_counter()
+                finish_times = np.zeros(current_thread_count)
+                worker_func = functools.partial(run_timed_worker, worker_func, start_time, finish_times)
             progress_counter = np.zeros(current_thread_count, dtype=np.int64)
+            task_args = []
             for thread_id in range(current_thread_count):
                 local_iterable = iterable[thread_id::current_thread_count]
+                if schedule == "balanced":
+                    # the chunks are taken in run_chunked_worker
+                    local_iterable = range(0)
                 if isinstance(local_iterable, range):
                     start = local_iterable.start
                     stop = local_iterable.stop
@@ -122,9 +1098,8 @@ def parallel(
                     start = -1
                     stop = -1
                     step = -1
-                thread = threading.Thread(
-                    target=numba_func_parallel,
-                    args=(
+                task_args.append(
+                    (
                         local_iterable,
                         thread_id,
                         progress_counter,
@@ -132,29 +1107,37 @@ def parallel(
                         stop,
                         step,
                         *args
-                    ),
-                    daemon=True
+                    )
                 )
-                thread.start()
-                threads.append(thread)
+            batch = get_worker_pool().dispatch(worker_func, task_args)
             if include_progress_callback:
-                import time
                 if len(iterable) > 10**6:
                     granularity = 1000
                 else:
                     granularity = len(iterable)
-                progress_bar = 0
-                progress_count = np.sum(progress_counter)
-                for result in tqdm.tqdm(
-                    range(granularity),
-                ):
-                    while progress_bar >= progress_count:
-                        time.sleep(0.01)
-                        progress_count = granularity * np.sum(progress_counter) / len(iterable)
-                    progress_bar += 1
-            for thread in threads:
-                thread.join()
-                del thread
+                with tqdm.tqdm(total=granularity) as progress_bar:
+                    while not batch.wait(PROGRESS_INTERVAL):
+                        progress_bar.update(
+                            granularity * int(np.sum(progress_counter)) // len(iterable) - progress_bar.n
+                        )
+                        if tracing:
+                            timspeak.performance_utilities.tracing.add_counter(
+                                f"{func.__name__} work items",
+                                **{str(thread_id): int(count) for thread_id, count in enumerate(progress_counter)}
+                            )
+                    progress_bar.update(granularity - progress_bar.n)
+            else:
+                batch.wait()
+            if profiling:
+                add_parallel_profile(
+                    {
+                        "name": func.__name__,
+                        "threads": current_thread_count,
+                        "wall_time_s": time.perf_counter() - start_time,
+                        "work_items": progress_counter.tolist(),
+                        "finish_times_s": finish_times.tolist(),
+                    }
+                )
         return functools.wraps(func)(wrapper)
     if _func is None:
         return parallel_compiled_func_inner
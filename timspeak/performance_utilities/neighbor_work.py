@@ -0,0 +1,144 @@
+# builtin
+import dataclasses
+
+# external
+import numpy as np
+
+# local
+import timspeak.performance_utilities.compiling
+import timspeak.performance_utilities.multiprocessing
+import timspeak.data_handlers.sample_iterator
+
+
+NEIGHBOR_WORK_NAMES = (
+    "neighbor_scans",
+    "empty_neighbor_scans",
+    "ion_pairs",
+)
+
+
+@timspeak.performance_utilities.compiling.njit_class
+@dataclasses.dataclass(kw_only=True, frozen=True)
+class NeighborWorkCounter:
+    """
+    Enumerate the same neighbours as a smoothing, clustering or deisotoping
+    kernel, but only count them.
+
+    Parameters:
+    - frame_generator: timspeak.data_handlers.sample_iterator.CyclicRtNeighborGenerator
+        The RT neighbour generator of the kernel.
+    - scan_generator: timspeak.data_handlers.sample_iterator.ImNeighborGenerator
+        The IM neighbour generator of the kernel.
+    - ion_pair_generator: timspeak.data_handlers.sample_iterator.MZIonPairGenerator
+        The ion pair generator of the kernel.
+    - indptr: np.ndarray
+        The start of every scan in the values the kernel iterates over.
+    """
+
+    frame_generator: timspeak.data_handlers.sample_iterator.CyclicRtNeighborGenerator
+    scan_generator: timspeak.data_handlers.sample_iterator.ImNeighborGenerator
+    ion_pair_generator: timspeak.data_handlers.sample_iterator.MZIonPairGenerator
+    indptr: np.ndarray
+
+    def __post_init__(self):
+        object.__setattr__(self, "scan_count", len(self.indptr) - 1)
+
+    def count_all_scans(self) -> tuple:
+        """
+        Count the neighbour work of every scan.
+
+        Returns:
+        - tuple: The number of neighbour scans visited, the number of those
+            that were empty and the number of ion pairs yielded, per scan.
+        """
+        return self.count_scans(range(self.scan_count))
+
+    def count_scans(self, scan_indices) -> tuple:
+        """
+        Count the neighbour work of some scans.
+
+        Parameters:
+        - scan_indices: range or np.ndarray
+            The scans to count.
+
+        Returns:
+        - tuple: The number of neighbour scans visited, the number of those
+            that were empty and the number of ion pairs yielded, per scan,
+            which are zero for the scans that were not counted.
+        """
+        neighbor_scans = np.zeros(self.scan_count, dtype=np.int64)
+        empty_neighbor_scans = np.zeros(self.scan_count, dtype=np.int64)
+        ion_pairs = np.zeros(self.scan_count, dtype=np.int64)
+        timspeak.performance_utilities.multiprocessing.parallel(self.count_scan)(
+            scan_indices,
+            neighbor_scans,
+            empty_neighbor_scans,
+            ion_pairs,
+            costs=np.diff(self.indptr)[scan_indices],
+        )
+        return neighbor_scans, empty_neighbor_scans, ion_pairs
+
+    @timspeak.performance_utilities.compiling.njit(nogil=True)
+    def count_scan(
+        self,
+        scan_index: int,
+        neighbor_scans: np.ndarray,
+        empty_neighbor_scans: np.ndarray,
+        ion_pairs: np.ndarray,
+    ) -> None:
+        if self.is_empty_scan(scan_index):
+            return
+        for other_rt_scan in self.frame_generator.from_scan(scan_index):
+            for other_im_scan in self.scan_generator.from_scan(other_rt_scan):
+                neighbor_scans[scan_index] += 1
+                if self.is_empty_scan(other_im_scan):
+                    empty_neighbor_scans[scan_index] += 1
+                    continue
+                for index1, index2 in self.ion_pair_generator.from_scan_pair(
+                    scan_index,
+                    other_im_scan
+                ):
+                    ion_pairs[scan_index] += 1
+
+    @timspeak.performance_utilities.compiling.njit(nogil=True)
+    def is_empty_scan(self, scan_index: int) -> bool:
+        return self.indptr[scan_index] == self.indptr[scan_index + 1]
+
+
+def count_neighbor_work(kernel) -> dict:
+    """
+    Count the neighbour scans visited, the empty neighbour scans skipped and
+    the ion pairs yielded by a kernel for every scan, as frame x scan heat maps.
+
+    Parameters:
+    - kernel:
+        A Smoother, Clusterer or ChargeDeisotoper.
+
+    Returns:
+    - dict: A frame x scan array for every name in NEIGHBOR_WORK_NAMES.
+    """
+    counter = get_neighbor_work_counter(kernel)
+    scans_per_frame = len(kernel.dia_data.im_values)
+    return {
+        name: counts.reshape(-1, scans_per_frame)
+        for name, counts in zip(NEIGHBOR_WORK_NAMES, counter.count_all_scans())
+    }
+
+
+def get_neighbor_work_counter(kernel) -> NeighborWorkCounter:
+    """
+    Get a counter of the neighbour work of a Smoother, Clusterer or
+    ChargeDeisotoper.
+    """
+    if hasattr(kernel, "isotope_pair_generator"):
+        ion_pair_generator = kernel.isotope_pair_generator
+        indptr = kernel.index.indptr
+    else:
+        ion_pair_generator = kernel.ion_pair_generator
+        indptr = kernel.dia_data.tof_indptr
+    return NeighborWorkCounter(
+        frame_generator=kernel.frame_generator,
+        scan_generator=kernel.scan_generator,
+        ion_pair_generator=ion_pair_generator,
+        indptr=indptr,
+    )
@@ -0,0 +1,199 @@
+# builtin
+import os
+import json
+import time
+import threading
+import contextlib
+import dataclasses
+
+# local
+import timspeak.performance_utilities.memory
+import timspeak.performance_utilities.multiprocessing
+
+
+# stages measured right now, which all need the current peak before it is reset
+MEASURED_STAGES = []
+MEASURED_STAGES_LOCK = threading.Lock()
+
+
+@dataclasses.dataclass
+class StagePerformance:
+    """
+    The resources used by a single stage of the execution pipeline.
+
+    Parameters:
+    - wall_time_s: float
+        The elapsed time, without the time of counting neighbour work.
+    - cpu_time_s: float
+        The CPU time of the process, summed over all its threads, without
+        the time of counting neighbour work. Stages that run concurrently
+        are all charged for each other's CPU time.
+    - rss_bytes_before: int
+        The resident memory of the process when the stage started.
+    - rss_bytes_after: int
+        The resident memory of the process when the stage ended.
+    - peak_rss_bytes: int
+        The highest resident memory of the process while the stage ran.
+        The peak is reset when a stage starts on Linux only, elsewhere this
+        is the highest resident memory of the process up to the end of the
+        stage.
+    - threads: int
+        The number of threads available to the stage.
+    - bytes_written: int
+        The size of the arrays the stage stored in the output file.
+    - item_counts: dict
+        The number of items (e.g. ions, clusters or pairs) of the inputs and
+        outputs of the stage.
+    - memory_maxima: dict
+        The highest values of the memory samples taken while the stage ran
+        (see timspeak.performance_utilities.memory_sampler), if sampled.
+    - neighbor_work_time_s: float
+        The elapsed time of counting the neighbour work of the kernels of
+        the stage, if counted.
+    """
+
+    wall_time_s: float = 0.0
+    cpu_time_s: float = 0.0
+    rss_bytes_before: int = 0
+    rss_bytes_after: int = 0
+    peak_rss_bytes: int = 0
+    threads: int = 0
+    bytes_written: int = 0
+    item_counts: dict = dataclasses.field(default_factory=dict)
+    memory_maxima: dict = dataclasses.field(default_factory=dict)
+    neighbor_work_time_s: float = 0.0
+
+    def as_dict(self) -> dict:
+        """
+        Get all values as a flat dictionary, with item counts as
+        <name>_count entries and memory maxima as max_<name> entries.
+        """
+        performance = dataclasses.asdict(self)
+        item_counts = performance.pop("item_counts")
+        for name, count in item_counts.items():
+            performance[f"{name}_count"] = count
+        memory_maxima = performance.pop("memory_maxima")
+        for name, value in memory_maxima.items():
+            performance[f"max_{name}"] = value
+        return performance
+
+
+def update_peak_memory(performance: StagePerformance) -> None:
+    performance.peak_rss_bytes = max(
+        performance.peak_rss_bytes,
+        timspeak.performance_utilities.memory.get_peak_memory(),
+        timspeak.performance_utilities.memory.get_used_memory(),
+    )
+
+
+@contextlib.contextmanager
+def measure_stage():
+    """
+    Measure the time and memory used within this context. On Linux the
+    peak memory of the process is reset when the context is entered, after
+    handing the peak so far to all other stages that are being measured.
+
+    Yields:
+    - StagePerformance: Filled in when the context is left.
+    """
+    performance = StagePerformance(
+        rss_bytes_before=timspeak.performance_utilities.memory.get_used_memory(),
+        threads=timspeak.performance_utilities.multiprocessing.get_threads(),
+    )
+    with MEASURED_STAGES_LOCK:
+        for measured_performance in MEASURED_STAGES:
+            update_peak_memory(measured_performance)
+        timspeak.performance_utilities.memory.reset_peak_memory()
+        MEASURED_STAGES.append(performance)
+    start_wall_time = time.perf_counter()
+    start_cpu_time = time.process_time()
+    try:
+        yield performance
+    finally:
+        performance.wall_time_s = time.perf_counter() - start_wall_time
+        performance.cpu_time_s = time.process_time() - start_cpu_time
+        performance.rss_bytes_after = timspeak.performance_utilities.memory.get_used_memory()
+        with MEASURED_STAGES_LOCK:
+            MEASURED_STAGES.remove(performance)
+            update_peak_memory(performance)
+
+
+def get_item_count(value: any) -> int:
+    if hasattr(value, "intensity_values"):
+        # a DiaData object counts its ions
+        value = value.intensity_values
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def get_bytes_written(dataset_sizes: dict, stage_groups: dict) -> dict:
+    """
+    Assign every dataset of the output file to the stage owning the
+    dataset itself or else the innermost group that contains it. A group
+    or dataset owned by more than one stage raises a ValueError, as its
+    bytes could not be attributed.
+
+    Parameters:
+    - dataset_sizes: dict
+        The size in bytes of every dataset, by its path in the output file.
+    - stage_groups: dict
+        The groups or datasets written by every stage, by stage name.
+
+    Returns:
+    - dict: The number of bytes written by every stage.
+    """
+    group_owners = {}
+    for stage_name, group_names in stage_groups.items():
+        for group_name in group_names:
+            group_name = group_name.strip("/")
+            if group_name in group_owners:
+                raise ValueError(
+                    f"{group_name} is owned by both {group_owners[group_name]} and {stage_name}"
+                )
+            group_owners[group_name] = stage_name
+    bytes_written = {stage_name: 0 for stage_name in stage_groups}
+    for dataset_name, nbytes in dataset_sizes.items():
+        group_name = dataset_name.strip("/")
+        while group_name:
+            if group_name in group_owners:
+                bytes_written[group_owners[group_name]] += nbytes
+                break
+            group_name = group_name.rpartition("/")[0]
+    return bytes_written
+
+
+def get_report_file_name(output_file_name: str) -> str:
+    return f"{os.path.splitext(output_file_name)[0]}_performance.json"
+
+
+def write_report(
+    file_name: str,
+    run_info: dict,
+    stage_performances: dict,
+    memory_timeline: list = None,
+) -> None:
+    """
+    Write the performance of all stages to a JSON file.
+
+    Parameters:
+    - file_name: str
+        The JSON file.
+    - run_info: dict
+        Information about the run, e.g. version, sample and acquisition.
+    - stage_performances: dict
+        The StagePerformance of every stage, by stage name.
+    - memory_timeline: list
+        (Default: None)
+        The samples of a MemorySampler, if memory was sampled.
+    """
+    report = dict(run_info)
+    report["stages"] = {
+        stage_name: performance.as_dict()
+        for stage_name, performance in stage_performances.items()
+    }
+    if memory_timeline is not None:
+        report["memory_timeline"] = memory_timeline
+    with open(file_name, "w") as report_file:
+        json.dump(report, report_file, indent=4)
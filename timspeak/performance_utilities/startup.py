@@ -0,0 +1,209 @@
+# builtin
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import importlib
+import subprocess
+
+
+# modules in the order in which the execution pipeline imports them
+STARTUP_MODULES = (
+    "numpy",
+    "pandas",
+    "numba",
+    "h5py",
+    "alphatims.bruker",
+    "alphatims.dia_data",
+    "timspeak.performance_utilities.compiling",
+    "timspeak.performance_utilities.multiprocessing",
+    "timspeak.data_handlers.sample_iterator",
+    "timspeak.peak_picker_algorithms.smooth.smoothing_algorithm_1",
+    "timspeak.peak_picker_algorithms.cluster.clustering_algorithm_1",
+    "timspeak.peak_picker_algorithms.cluster.clusters_stats",
+    "timspeak.peak_picker_algorithms.isotope.deisotoping",
+    "timspeak.statistical_utilities.ks_algorithms",
+    "timspeak.statistical_utilities.ks_1d",
+    "timspeak.execution_pipeline.main_pipeline",
+)
+
+
+def measure_imports(module_names: tuple) -> dict:
+    """
+    Import modules one after another.
+
+    Returns:
+    - dict: The time (in seconds) every import took, excluding the modules
+        that were already imported before it.
+    """
+    import_times = {}
+    for module_name in module_names:
+        start_time = time.perf_counter()
+        importlib.import_module(module_name)
+        import_times[module_name] = time.perf_counter() - start_time
+    return import_times
+
+
+def measure_startup(config_file_name: str, gradient_length: float = 2.0) -> dict:
+    """
+    Measure where the time of a first run of the execution pipeline on a
+    small generated acquisition goes. Only meaningful in a new process.
+
+    Parameters:
+    - config_file_name: str
+        The configuration file.
+    - gradient_length: float
+        (Default: 2.0)
+        The length (in seconds) of the generated acquisition.
+
+    Returns:
+    - dict: The import time of every module, the time spent preparing and
+        compiling the njit methods of every class during the run, the time
+        of every stage, and the time of the first and a second call of every
+        kernel on new instances after the run.
+    """
+    start_time = time.perf_counter()
+    import_times = measure_imports(STARTUP_MODULES)
+    import_time = time.perf_counter() - start_time
+    import timspeak.io_interface.input.read_content
+    import timspeak.performance_utilities.compiling
+    import timspeak.data_handlers.synthetic_data
+    import timspeak.execution_pipeline.benchmark_pipeline
+    config_file_content = timspeak.io_interface.input.read_content.ReadContent().start_reading(config_file_name)
+    sample = timspeak.data_handlers.synthetic_data.generate_sample(gradient_length=gradient_length)
+    with tempfile.TemporaryDirectory() as directory:
+        pipeline = timspeak.execution_pipeline.benchmark_pipeline.SyntheticPipeline(
+            timspeak.execution_pipeline.benchmark_pipeline.write_synthetic_config_file(
+                config_file_content,
+                directory,
+                "startup"
+            ),
+            sample
+        )
+        pipeline_start_time = time.perf_counter()
+        with timspeak.performance_utilities.compiling.profile_compilation() as classes:
+            pipeline.run()
+        pipeline_time = time.perf_counter() - pipeline_start_time
+        kernels = {}
+        with timspeak.performance_utilities.compiling.profile_compilation() as kernel_classes:
+            for kernel_name, (function, ion_count, pair_count) in pipeline.get_kernels().items():
+                first_call_time, second_call_time = timspeak.execution_pipeline.benchmark_pipeline.time_kernel(
+                    function,
+                    2
+                )
+                kernels[kernel_name] = {
+                    "first_call_s": first_call_time,
+                    "second_call_s": second_call_time,
+                    "dispatch_latency_s": first_call_time - second_call_time,
+                }
+    return {
+        "total_s": time.perf_counter() - start_time,
+        "import_s": import_time,
+        "pipeline_s": pipeline_time,
+        "compile_s": sum(profile["compile_time_s"] for profile in classes.values()),
+        "imports": import_times,
+        "stages": {
+            stage_name: stage_performance.wall_time_s
+            for stage_name, stage_performance in pipeline.stage_performances.items()
+        },
+        "classes": classes,
+        "kernels": kernels,
+        "kernel_classes": kernel_classes,
+    }
+
+
+def run_startup_process(config_file_name: str, cache_directory: str, cold: bool) -> dict:
+    """
+    Run measure_startup in a new Python process, with its bytecode cache in
+    cache_directory. Numba has nothing to cache, as njit methods are compiled
+    per instance from source created at runtime and no kernel is compiled
+    with cache=True, so cold and warm runs only differ in their bytecode.
+
+    Parameters:
+    - config_file_name: str
+        The configuration file.
+    - cache_directory: str
+        The directory of the cache.
+    - cold: bool
+        Empty the cache first.
+
+    Returns:
+    - dict: The result of measure_startup.
+    """
+    cache_directories = {
+        "PYTHONPYCACHEPREFIX": os.path.join(cache_directory, "pycache"),
+    }
+    if cold:
+        for directory in cache_directories.values():
+            shutil.rmtree(directory, ignore_errors=True)
+    package_directory = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    environment = dict(os.environ, **cache_directories)
+    environment["PYTHONPATH"] = os.pathsep.join(
+        [package_directory] + [path for path in [os.environ.get("PYTHONPATH")] if path]
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        result_file_name = os.path.join(directory, "startup.json")
+        subprocess.run(
+            [sys.executable, "-m", "timspeak.performance_utilities.startup", config_file_name, result_file_name],
+            env=environment,
+            check=True,
+        )
+        with open(result_file_name, "r") as result_file:
+            return json.load(result_file)
+
+
+def benchmark_startup(
+    config_file_name: str,
+    output_file_name: str = "timspeak_startup.json",
+    cache_directory: str = None,
+    runs: list = None,
+    logger=None,
+) -> dict:
+    """
+    Measure the startup of the execution pipeline in new processes, with cold
+    or warm caches.
+
+    Parameters:
+    - config_file_name: str
+        The configuration file.
+    - output_file_name: str
+        (Default: timspeak_startup.json)
+        The JSON file in which the results are written.
+    - cache_directory: str
+        (Default: a temporary directory)
+        The directory of the bytecode cache, which is kept to compare with
+        warm caches of earlier runs.
+    - runs: list
+        (Default: ["cold", "warm"])
+        The runs, in order: "cold" empties the cache first, "warm" keeps
+        it.
+    - logger: logging.Logger
+        (Default: None)
+        The logger of the results.
+
+    Returns:
+    - dict: The result of measure_startup for every run.
+    """
+    runs = runs or ["cold", "warm"]
+    results = {}
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        if cache_directory is None:
+            cache_directory = temporary_directory
+        for run_index, run_name in enumerate(runs):
+            result = run_startup_process(config_file_name, cache_directory, run_name == "cold")
+            results[f"{run_index}_{run_name}"] = result
+            if logger is not None:
+                logger.info(
+                    f"{run_name} startup: {result['total_s']:.2f} s, of which imports {result['import_s']:.2f} s, "
+                    f"pipeline {result['pipeline_s']:.2f} s (compiling {result['compile_s']:.2f} s)"
+                )
+    with open(output_file_name, "w") as results_file:
+        json.dump(results, results_file, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    with open(sys.argv[2], "w") as result_file:
+        json.dump(measure_startup(sys.argv[1]), result_file)
@@ -0,0 +1,156 @@
+# builtin
+import os
+import json
+import time
+import threading
+import contextlib
+
+
+TRACE_LOCK = threading.Lock()
+TRACE_EVENTS = None
+TRACE_START_TIME = 0
+
+
+def is_tracing() -> bool:
+    return TRACE_EVENTS is not None
+
+
+def start_tracing() -> None:
+    """
+    Start recording spans, which can be saved with stop_tracing as a
+    Chrome Trace Event file for chrome://tracing or Perfetto.
+    """
+    global TRACE_EVENTS
+    global TRACE_START_TIME
+    with TRACE_LOCK:
+        TRACE_EVENTS = []
+        TRACE_START_TIME = time.perf_counter_ns()
+
+
+def stop_tracing(file_name: str = None) -> list:
+    """
+    Stop recording spans.
+
+    Parameters:
+    - file_name: str
+        (Default: None)
+        The JSON file in which the recorded events are saved. None means
+        they are not saved.
+
+    Returns:
+    - list: The recorded trace events.
+    """
+    global TRACE_EVENTS
+    with TRACE_LOCK:
+        trace_events = TRACE_EVENTS
+        TRACE_EVENTS = None
+    if trace_events is None:
+        return []
+    if file_name is not None:
+        with open(file_name, "w") as trace_file:
+            json.dump(
+                {"traceEvents": trace_events, "displayTimeUnit": "ms"},
+                trace_file
+            )
+    return trace_events
+
+
+def get_timestamp() -> float:
+    """
+    Get the time (in microseconds) since tracing started.
+    """
+    return (time.perf_counter_ns() - TRACE_START_TIME) / 1000
+
+
+def add_event(event: dict) -> None:
+    event.setdefault("pid", os.getpid())
+    event.setdefault("tid", threading.get_ident())
+    with TRACE_LOCK:
+        if TRACE_EVENTS is not None:
+            TRACE_EVENTS.append(event)
+
+
+def add_span(
+    name: str,
+    category: str,
+    start_time: float,
+    end_time: float = None,
+    **args,
+) -> None:
+    """
+    Record a span of the current thread.
+
+    Parameters:
+    - name: str
+        The name of the span.
+    - category: str
+        The category of the span, e.g. "stage", "parallel" or "output".
+    - start_time: float
+        The start of the span (see get_timestamp).
+    - end_time: float
+        (Default: now)
+        The end of the span (see get_timestamp).
+    - args:
+        Values shown with the span.
+    """
+    if not is_tracing():
+        return
+    if end_time is None:
+        end_time = get_timestamp()
+    add_event(
+        {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start_time,
+            "dur": end_time - start_time,
+            "args": args,
+        }
+    )
+
+
+def add_counter(name: str, **values) -> None:
+    """
+    Record the current values of a counter, shown as a graph over time.
+    """
+    if not is_tracing():
+        return
+    add_event(
+        {
+            "name": name,
+            "ph": "C",
+            "ts": get_timestamp(),
+            "args": values,
+        }
+    )
+
+
+def name_thread(thread_name: str) -> None:
+    """
+    Name the current thread in the trace.
+    """
+    if not is_tracing():
+        return
+    add_event(
+        {
+            "name": "thread_name",
+            "ph": "M",
+            "args": {"name": thread_name},
+        }
+    )
+
+
+@contextlib.contextmanager
+def span(name: str, category: str, **args):
+    """
+    Record the time spent within this context as a span of the current
+    thread. Does nothing if tracing is not started.
+    """
+    if not is_tracing():
+        yield
+        return
+    start_time = get_timestamp()
+    try:
+        yield
+    finally:
+        add_span(name, category, start_time, **args)
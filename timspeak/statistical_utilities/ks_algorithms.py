@@ -9,6 +9,7 @@ import alphatims.dia_data
 # local
 import timspeak.performance_utilities.compiling
 import timspeak.performance_utilities.multiprocessing
+import timspeak.performance_utilities.memory
 import timspeak.data_handlers.indexing
 import timspeak.peak_picker_algorithms.cluster.clusters_stats
 
@@ -219,11 +220,12 @@ class XICCreator:
                                  self.cluster3d_stats.rt_upper_boundaries - self.cluster3d_stats.rt_lower_boundaries
                          ) // self.dia_data.cycle.shape[1] + 1
         xic_indptr = np.cumsum(xic_indptr)
-        xics = np.zeros(xic_indptr[-1])
+        xics = timspeak.performance_utilities.memory.zeros(xic_indptr[-1])
         timspeak.performance_utilities.multiprocessing.parallel(self.create_xic_per_cluster)(
             range(len(self.cluster3d_stats)),
             xic_indptr,
             xics,
+            costs=np.diff(self.index3d.indptr),
         )
         return xics, xic_indptr
 
@@ -339,11 +341,12 @@ class MobilogramCreator:
                                         self.cluster3d_stats.im_upper_boundaries - self.cluster3d_stats.im_lower_boundaries
                                 ) + 1
         mobilogram_indptr = np.cumsum(mobilogram_indptr)
-        mobilograms = np.zeros(mobilogram_indptr[-1])
+        mobilograms = timspeak.performance_utilities.memory.zeros(mobilogram_indptr[-1])
         timspeak.performance_utilities.multiprocessing.parallel(self.create_mobilogram_per_cluster)(
             range(len(self.cluster3d_stats)),
             mobilogram_indptr,
             mobilograms,
+            costs=np.diff(self.index3d.indptr),
         )
         return mobilograms, mobilogram_indptr
 
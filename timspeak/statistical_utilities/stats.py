@@ -51,7 +51,8 @@ class StatsCalculator(abc.ABC):
         )
         timspeak.performance_utilities.multiprocessing.parallel(self._calculate_per_cluster)(
             range(self.index.size),
-            buffer_array
+            buffer_array,
+            costs=np.diff(self.index.indptr),
         )
         return buffer_array
 